@@ -6,11 +6,13 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import config
+from app.utils.write_behind import WriteBehindWriter
 import os
 
 # Initialize extensions
 db = SQLAlchemy()
 login_manager = LoginManager()
+history_writer = WriteBehindWriter(db)
 
 def create_app(config_name='default'):
     """Application factory pattern"""
@@ -24,6 +26,11 @@ def create_app(config_name='default'):
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
+    history_writer.init_app(app)
+
+    # Engines, indexes and caches shared by every request
+    from app.modules.services import init_services
+    init_services(app)
 
     # Create upload folder if it doesn't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -42,8 +49,26 @@ def create_app(config_name='default'):
         """Inject featured brands into all templates"""
         return dict(featured_brands=app.config['FEATURED_BRANDS'])
 
-    # Create database tables
+    from app.utils.pagination import next_page_url
+    app.add_template_global(next_page_url)
+
+    # Create database tables, and columns added to existing ones since
     with app.app_context():
         db.create_all()
 
+        from app.models import Comparison, Phone, PhoneSpecification
+        from app.modules.catalog import PARSED_SPEC_COLUMNS, backfill_spec_columns
+        from app.utils.schema import add_missing_columns, add_missing_indexes
+        add_missing_columns(db, Comparison.__table__, ['phone_ids'])
+        add_missing_columns(db, Phone.__table__, ['source_url', 'content_hash'])
+
+        # Parsed specification columns are read by the catalog snapshot and warm_cache below
+        if add_missing_columns(db, PhoneSpecification.__table__, PARSED_SPEC_COLUMNS):
+            backfill_spec_columns()
+        add_missing_indexes(db, PhoneSpecification.__table__)
+
+        # Precompute the most often compared pairs
+        from app.modules.services import get_comparison_engine
+        get_comparison_engine().warm_cache(app.config['COMPARISON_CACHE_WARM_PAIRS'])
+
     return app
@@ -3,7 +3,7 @@ Database Models Package
 Contains all database models for DialSmart
 """
 from app.models.user import User, UserPreference
-from app.models.phone import Phone, PhoneSpecification
+from app.models.phone import Phone, PhoneSpecification, PhoneSimilarity
 from app.models.brand import Brand
 from app.models.recommendation import Recommendation, Comparison, ChatHistory
 
@@ -12,6 +12,7 @@ __all__ = [
     'UserPreference',
     'Phone',
     'PhoneSpecification',
+    'PhoneSimilarity',
     'Brand',
     'Recommendation',
     'Comparison',
@@ -30,16 +30,13 @@ class Brand(db.Model):
 
     def get_phone_count(self):
         """Get number of active phones for this brand"""
-        return self.phones.filter_by(is_active=True).count()
+        from app.modules.catalog_stats import get_catalog_stats
+        return get_catalog_stats().phone_count(self.id)
 
     def get_price_range(self):
         """Get min and max price for brand's phones"""
-        active_phones = self.phones.filter_by(is_active=True).all()
-        if not active_phones:
-            return (0, 0)
-
-        prices = [phone.price for phone in active_phones]
-        return (min(prices), max(prices))
+        from app.modules.catalog_stats import get_catalog_stats
+        return get_catalog_stats().price_range(self.id)
 
     def __repr__(self):
         return f'<Brand {self.name}>'
@@ -3,11 +3,24 @@ Phone Model
 Handles smartphone data and specifications
 """
 from app import db
+from app.utils.helpers import parse_gb_options, parse_charging_watts
 from datetime import datetime
 
 class Phone(db.Model):
     """Main phone model"""
     __tablename__ = 'phones'
+    __table_args__ = (
+        # Listing pages filter active phones by brand and price, then sort
+        db.Index('ix_phones_active_brand_price', 'is_active', 'brand_id', 'price'),
+        db.Index('ix_phones_active_brand_created', 'is_active', 'brand_id', 'created_at'),
+        db.Index('ix_phones_active_brand_name', 'is_active', 'brand_id', 'model_name'),
+        db.Index('ix_phones_active_price', 'is_active', 'price'),
+        db.Index('ix_phones_active_created', 'is_active', 'created_at'),
+        db.Index('ix_phones_active_name', 'is_active', 'model_name'),
+        # Admin phone list (all phones, newest first)
+        db.Index('ix_phones_brand_created', 'brand_id', 'created_at'),
+        db.Index('ix_phones_created', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     brand_id = db.Column(db.Integer, db.ForeignKey('brands.id'), nullable=False)
@@ -21,6 +34,10 @@ class Phone(db.Model):
     main_image = db.Column(db.String(255))
     gallery_images = db.Column(db.Text)  # JSON string of image URLs
 
+    # Catalog source (set by the dataset importer)
+    source_url = db.Column(db.String(255), index=True)
+    content_hash = db.Column(db.String(40))  # SHA-1 of the parsed source row
+
     # Status and availability
     is_active = db.Column(db.Boolean, default=True, index=True)
     availability_status = db.Column(db.String(50), default='Available')  # Available, Out of Stock, Pre-order
@@ -76,7 +93,7 @@ class PhoneSpecification(db.Model):
     camera_features = db.Column(db.Text)  # JSON string of features
 
     # Battery specifications
-    battery_capacity = db.Column(db.Integer)  # in mAh
+    battery_capacity = db.Column(db.Integer, index=True)  # in mAh
     charging_speed = db.Column(db.String(50))  # "33W Fast Charging"
     wireless_charging = db.Column(db.Boolean, default=False)
 
@@ -98,5 +115,55 @@ class PhoneSpecification(db.Model):
     dimensions = db.Column(db.String(50))  # "160.5 x 74.8 x 8.4 mm"
     colors_available = db.Column(db.String(200))  # "Black, White, Blue"
 
+    # Parsed from the option strings above, kept in sync on every write
+    min_ram_gb = db.Column(db.Integer, index=True)
+    max_ram_gb = db.Column(db.Integer, index=True)
+    max_storage_gb = db.Column(db.Integer, index=True)  # 1TB is stored as 1024
+    charging_watts = db.Column(db.Integer, index=True)  # Wired charging only
+
+    @staticmethod
+    def parse_spec_columns(ram_options, storage_options, charging_speed):
+        """Get the parsed column values for the given option strings"""
+        ram_values = parse_gb_options(ram_options)
+        storage_values = parse_gb_options(storage_options)
+
+        return {
+            'min_ram_gb': min(ram_values) if ram_values else None,
+            'max_ram_gb': max(ram_values) if ram_values else None,
+            'max_storage_gb': max(storage_values) if storage_values else None,
+            'charging_watts': parse_charging_watts(charging_speed)
+        }
+
+    def update_parsed_columns(self):
+        """Re-parse RAM, storage and charging columns from the option strings"""
+        parsed = self.parse_spec_columns(self.ram_options, self.storage_options, self.charging_speed)
+        for name, value in parsed.items():
+            setattr(self, name, value)
+
     def __repr__(self):
         return f'<PhoneSpecification for Phone {self.phone_id}>'
+
+
+
+class PhoneSimilarity(db.Model):
+    """Precomputed nearest neighbours of a phone by specification"""
+    __tablename__ = 'phone_similarities'
+    __table_args__ = (
+        db.UniqueConstraint('phone_id', 'rank', name='uq_phone_similarities_phone_rank'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_id = db.Column(db.Integer, db.ForeignKey('phones.id', ondelete='CASCADE'), nullable=False)
+    similar_phone_id = db.Column(db.Integer, db.ForeignKey('phones.id', ondelete='CASCADE'), nullable=False, index=True)
+    rank = db.Column(db.Integer, nullable=False)  # 1 = most similar
+    distance = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<PhoneSimilarity {self.phone_id} -> {self.similar_phone_id}>'
+
+
+@db.event.listens_for(PhoneSpecification, 'before_insert')
+@db.event.listens_for(PhoneSpecification, 'before_update')
+def _sync_parsed_columns(mapper, connection, target):
+    """Keep the parsed spec columns in sync with the option strings"""
+    target.update_parsed_columns()
@@ -4,6 +4,7 @@ Handles AI recommendations, comparisons, and chat history
 """
 from app import db
 from datetime import datetime
+import json
 
 class Recommendation(db.Model):
     """User recommendation history"""
@@ -45,6 +46,7 @@ class Comparison(db.Model):
     # Phones being compared
     phone1_id = db.Column(db.Integer, db.ForeignKey('phones.id'), nullable=False)
     phone2_id = db.Column(db.Integer, db.ForeignKey('phones.id'), nullable=False)
+    phone_ids = db.Column(db.Text)  # JSON list of every compared phone ID, in order
 
     # Comparison metadata
     is_saved = db.Column(db.Boolean, default=False)
@@ -57,8 +59,14 @@ class Comparison(db.Model):
     phone1 = db.relationship('Phone', foreign_keys=[phone1_id], backref='comparisons_as_phone1')
     phone2 = db.relationship('Phone', foreign_keys=[phone2_id], backref='comparisons_as_phone2')
 
+    def get_phone_ids(self):
+        """IDs of every compared phone, in order"""
+        if self.phone_ids:
+            return json.loads(self.phone_ids)
+        return [self.phone1_id, self.phone2_id]
+
     def __repr__(self):
-        return f'<Comparison {self.id}: Phone {self.phone1_id} vs Phone {self.phone2_id}>'
+        return f'<Comparison {self.id}: Phones {" vs ".join(str(phone_id) for phone_id in self.get_phone_ids())}>'
 
 
 class ChatHistory(db.Model):
@@ -77,8 +85,9 @@ class ChatHistory(db.Model):
     session_id = db.Column(db.String(100))  # To group conversations
     intent = db.Column(db.String(100))  # Detected user intent
 
-    # Metadata (JSON stored as string)
-    metadata = db.Column(db.Text)  # Additional context like recommended phone IDs
+    # Metadata (JSON stored as string). "metadata" is reserved on declarative
+    # models, so the attribute is renamed while the column keeps its name.
+    chat_metadata = db.Column('metadata', db.Text)  # Additional context like recommended phone IDs
 
     # Timestamp
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
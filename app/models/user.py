@@ -30,7 +30,7 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -5,5 +5,9 @@ Contains AI engine, chatbot, and comparison modules
 from app.modules.ai_engine import AIRecommendationEngine
 from app.modules.chatbot import ChatbotEngine
 from app.modules.comparison import PhoneComparison
+from app.modules.services import get_chatbot, get_comparison_engine, get_recommendation_engine
 
-__all__ = ['AIRecommendationEngine', 'ChatbotEngine', 'PhoneComparison']
+__all__ = [
+    'AIRecommendationEngine', 'ChatbotEngine', 'PhoneComparison',
+    'get_chatbot', 'get_comparison_engine', 'get_recommendation_engine'
+]
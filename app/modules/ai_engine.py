@@ -2,25 +2,63 @@
 AI Recommendation Engine
 Machine learning-based phone recommendation system
 """
-from app import db
-from app.models import Phone, PhoneSpecification, UserPreference, Recommendation
-from app.utils.helpers import calculate_match_score, generate_recommendation_reasoning
+from app import db, history_writer
+from app.models import Phone, UserPreference, Recommendation
+from app.modules.catalog import get_catalog_snapshot, get_phones_by_ids
+from app.modules.entities import ChatCriteria
+from app.modules.price_index import get_price_index
+from app.modules.scoring import (PREFERENCE_FIELDS, calculate_match_scores, preference_matrix,
+                                 preference_vector, top_n_indices)
+from app.modules.similarity import get_similar_phone_ids
+from app.modules.usage_rankings import get_usage_rankings
+from app.utils.helpers import generate_recommendation_reasoning
+import numpy as np
+import hashlib
 import json
 
+def get_recommendation_cache():
+    """Get the recommendation result cache of the current application"""
+    from app.modules.services import get_services
+    return get_services().recommendation_cache
+
+def recommendation_cache_key(user_prefs, top_n, min_score, generation):
+    """
+    Canonical cache key for a recommendation request
+
+    Only the preference fields that affect scoring and reasoning are
+    included, with numbers normalized so 2000 and 2000.0 share a key.
+    """
+    def normalize(value):
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float)):
+            return float(value)
+        return str(value)
+
+    payload = json.dumps({
+        'prefs': {field: normalize(getattr(user_prefs, field)) for field in PREFERENCE_FIELDS},
+        'top_n': top_n,
+        'min_score': min_score,
+        'generation': generation
+    }, sort_keys=True)
+
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
 class AIRecommendationEngine:
     """AI-powered recommendation engine for smartphones"""
 
     def __init__(self):
         self.min_match_threshold = 50  # Minimum match percentage to recommend
 
-    def get_recommendations(self, user_id, criteria=None, top_n=3):
+    def get_recommendations(self, user_id, criteria=None, top_n=3, candidate_ids=None):
         """
         Get top N phone recommendations for a user
 
         Args:
             user_id: User ID to get recommendations for
-            criteria: Optional dictionary of criteria to override user preferences
+            criteria: Optional criteria dictionary or ChatCriteria to override user preferences
             top_n: Number of recommendations to return
+            candidate_ids: Optional phone IDs to score instead of the whole catalog
 
         Returns:
             List of recommended phones with match scores
@@ -41,44 +79,161 @@ class AIRecommendationEngine:
             # Create default preferences if none exist
             user_prefs = self._create_default_preferences(user_id)
 
-        # Get all active phones with their specifications
-        phones = Phone.query.filter_by(is_active=True).all()
+        snapshot = get_catalog_snapshot()
 
-        # Calculate match scores for each phone
-        recommendations = []
-        for phone in phones:
-            phone_specs = PhoneSpecification.query.filter_by(phone_id=phone.id).first()
+        # Identical preferences against the same catalog give the same result
+        cache = get_recommendation_cache()
+        cache_key = recommendation_cache_key(
+            user_prefs, top_n, self.min_match_threshold, cache.generation(snapshot.version)
+        )
+        cached = cache.get(cache_key) if candidate_ids is None else None
 
-            # Calculate match score
-            match_score = calculate_match_score(user_prefs, phone, phone_specs)
+        if cached is not None:
+            scored = [(match_score, phone_id) for phone_id, match_score, _ in cached]
+            reasoning = {phone_id: text for phone_id, _, text in cached}
+        else:
+            if candidate_ids is not None:
+                snapshot = snapshot.take(snapshot.rows_of(candidate_ids))
 
-            # Only include if above threshold
-            if match_score >= self.min_match_threshold:
-                reasoning = generate_recommendation_reasoning(
-                    match_score, user_prefs, phone, phone_specs
-                )
+            # Score the catalog snapshot, or just the candidates, in one vectorized pass
+            scores = calculate_match_scores(snapshot, preference_vector(user_prefs))
+            best = top_n_indices(scores, top_n, min_score=self.min_match_threshold)
 
-                recommendations.append({
-                    'phone': phone,
-                    'specifications': phone_specs,
-                    'match_score': match_score,
-                    'reasoning': reasoning
-                })
+            scored = list(zip(scores[best].tolist(), snapshot.phone_ids[best].tolist()))
+            reasoning = None
 
-        # Sort by match score (descending)
-        recommendations.sort(key=lambda x: x['match_score'], reverse=True)
+        # Load only the recommended phones from the database
+        phones = get_phones_by_ids([phone_id for _, phone_id in scored])
+        phones_by_id = {phone.id: phone for phone in phones}
+
+        recommendations = self._build_recommendations(scored, user_prefs, phones_by_id, reasoning)
+
+        if cached is None and candidate_ids is None:
+            cache.set(cache_key, [
+                [rec['phone'].id, rec['match_score'], rec['reasoning']] for rec in recommendations
+            ])
 
         # Save recommendations to database if using actual user preferences
         if not criteria and user_prefs and hasattr(user_prefs, 'user_id'):
-            self._save_recommendations(user_id, recommendations[:top_n], user_prefs)
+            self._save_recommendations(user_id, recommendations, user_prefs)
+
+        return recommendations
 
-        return recommendations[:top_n]
+    def get_recommendations_batch(self, items, top_n=3):
+        """
+        Get top N recommendations for many users or criteria sets at once
+
+        All preference sets are scored against the catalog in one vectorized
+        pass, and the recommendations for user ids are queued for the
+        history table in one batch.
+
+        Args:
+            items: List of user IDs and/or criteria dictionaries or ChatCriteria
+            top_n: Number of recommendations per item
+
+        Returns:
+            List of recommendation lists, aligned with items
+        """
+        from app.models import User
+
+        user_ids = {item for item in items if not isinstance(item, (dict, ChatCriteria))}
+        existing_users = set()
+        stored_prefs = {}
+        if user_ids:
+            existing_users = {
+                row.id for row in db.session.query(User.id).filter(User.id.in_(user_ids))
+            }
+            stored_prefs = {
+                prefs.user_id: prefs
+                for prefs in UserPreference.query.filter(UserPreference.user_id.in_(user_ids))
+            }
+
+        # Resolve a preference object for every item that can be scored
+        prefs_list = []
+        positions = []
+        for position, item in enumerate(items):
+            if isinstance(item, (dict, ChatCriteria)):
+                prefs_list.append(self._create_temp_preferences(item))
+            elif item in existing_users:
+                prefs_list.append(stored_prefs.get(item) or self._create_temp_preferences({}))
+            else:
+                continue
+            positions.append(position)
+
+        results = [[] for _ in items]
+        if not prefs_list:
+            return results
+
+        # Score every preference set against the whole catalog at once
+        snapshot = get_catalog_snapshot()
+        scores = calculate_match_scores(snapshot, preference_matrix(prefs_list))
+
+        scored_rows = []
+        for row_scores in scores:
+            best = top_n_indices(row_scores, top_n, min_score=self.min_match_threshold)
+            scored_rows.append(list(zip(row_scores[best].tolist(), snapshot.phone_ids[best].tolist())))
+
+        # Load all recommended phones with one query
+        phone_ids = {phone_id for scored in scored_rows for _, phone_id in scored}
+        phones_by_id = {phone.id: phone for phone in get_phones_by_ids(list(phone_ids))}
+
+        history = []
+        for position, user_prefs, scored in zip(positions, prefs_list, scored_rows):
+            recommendations = self._build_recommendations(scored, user_prefs, phones_by_id)
+            results[position] = recommendations
+
+            item = items[position]
+            if not isinstance(item, (dict, ChatCriteria)):
+                user_criteria = json.dumps(self._criteria_dict(user_prefs))
+                history.extend({
+                    'user_id': item,
+                    'phone_id': rec['phone'].id,
+                    'match_percentage': rec['match_score'],
+                    'reasoning': rec['reasoning'],
+                    'user_criteria': user_criteria
+                } for rec in recommendations)
+
+        if history:
+            history_writer.enqueue(Recommendation, history)
+
+        return results
+
+    def _build_recommendations(self, scored, user_prefs, phones_by_id, reasoning=None):
+        """
+        Turn (match_score, phone_id) pairs into recommendation dictionaries
+
+        reasoning optionally maps phone IDs to already generated reasoning.
+        """
+        recommendations = []
+        for match_score, phone_id in scored:
+            phone = phones_by_id.get(phone_id)
+            if not phone:
+                continue
+
+            if reasoning and phone_id in reasoning:
+                text = reasoning[phone_id]
+            else:
+                text = generate_recommendation_reasoning(
+                    match_score, user_prefs, phone, phone.specifications
+                )
+
+            recommendations.append({
+                'phone': phone,
+                'specifications': phone.specifications,
+                'match_score': match_score,
+                'reasoning': text
+            })
+
+        return recommendations
 
     def _create_temp_preferences(self, criteria):
-        """Create temporary preference object from criteria dictionary"""
+        """Create temporary preference object from a criteria dictionary or ChatCriteria"""
         class TempPreference:
             pass
 
+        if isinstance(criteria, ChatCriteria):
+            criteria = criteria.preferences()
+
         prefs = TempPreference()
         prefs.min_budget = criteria.get('min_budget', 500)
         prefs.max_budget = criteria.get('max_budget', 5000)
@@ -116,9 +271,9 @@ class AIRecommendationEngine:
         db.session.commit()
         return prefs
 
-    def _save_recommendations(self, user_id, recommendations, user_prefs):
-        """Save recommendations to database"""
-        criteria_dict = {
+    def _criteria_dict(self, user_prefs):
+        """Criteria stored alongside saved recommendations"""
+        return {
             'min_budget': user_prefs.min_budget,
             'max_budget': user_prefs.max_budget,
             'min_ram': user_prefs.min_ram,
@@ -128,123 +283,88 @@ class AIRecommendationEngine:
             'requires_5g': user_prefs.requires_5g
         }
 
-        for rec in recommendations:
-            recommendation = Recommendation(
-                user_id=user_id,
-                phone_id=rec['phone'].id,
-                match_percentage=rec['match_score'],
-                reasoning=rec['reasoning'],
-                user_criteria=json.dumps(criteria_dict)
-            )
-            db.session.add(recommendation)
-
-        db.session.commit()
+    def _save_recommendations(self, user_id, recommendations, user_prefs):
+        """Queue recommendations for the history table"""
+        user_criteria = json.dumps(self._criteria_dict(user_prefs))
+
+        # Written in the background, so the request does not wait for the commit
+        history_writer.enqueue(Recommendation, [{
+            'user_id': user_id,
+            'phone_id': rec['phone'].id,
+            'match_percentage': rec['match_score'],
+            'reasoning': rec['reasoning'],
+            'user_criteria': user_criteria
+        } for rec in recommendations])
 
     def get_budget_recommendations(self, budget_range, top_n=5):
         """Get top phones within a specific budget range"""
         min_price, max_price = budget_range
 
-        phones = Phone.query.filter(
-            Phone.is_active == True,
-            Phone.price >= min_price,
-            Phone.price <= max_price
-        ).order_by(Phone.price.desc()).limit(top_n).all()
-
-        results = []
-        for phone in phones:
-            specs = PhoneSpecification.query.filter_by(phone_id=phone.id).first()
-            results.append({
-                'phone': phone,
-                'specifications': specs
-            })
+        # Most expensive first, straight from the sorted price index
+        phone_ids = get_price_index().most_expensive_in_range(min_price, max_price, top_n)
 
-        return results
+        return self._load_results(phone_ids)
 
     def get_phones_by_usage(self, usage_type, budget_range=None, top_n=5):
         """Get phones optimized for specific usage types"""
-        query = Phone.query.filter_by(is_active=True)
+        # Usage scores are ranked once per catalog version
+        ranking = get_usage_rankings().get(usage_type)
 
         if budget_range:
             min_price, max_price = budget_range
-            query = query.filter(Phone.price >= min_price, Phone.price <= max_price)
+            phone_ids, scores = ranking.top(top_n, min_price=min_price, max_price=max_price)
+        else:
+            phone_ids, scores = ranking.top(top_n)
 
-        phones = query.all()
-        results = []
+        usage_scores = dict(zip(phone_ids.tolist(), scores.tolist()))
 
-        for phone in phones:
-            specs = PhoneSpecification.query.filter_by(phone_id=phone.id).first()
-            if not specs:
-                continue
-
-            score = 0
-
-            # Score based on usage type
-            if usage_type == 'Gaming':
-                # High RAM, good processor, high refresh rate
-                ram_values = [int(r.replace('GB', '')) for r in (specs.ram_options or '').split(',') if 'GB' in r]
-                if ram_values:
-                    score += max(ram_values) * 10
-                score += (specs.refresh_rate or 60) / 10
-                score += specs.battery_capacity / 100 if specs.battery_capacity else 0
-
-            elif usage_type == 'Photography':
-                # High camera MP, good front camera
-                score += (specs.rear_camera_main or 0) * 2
-                score += (specs.front_camera_mp or 0)
-
-            elif usage_type == 'Business' or usage_type == 'Work':
-                # Good battery, decent specs
-                score += specs.battery_capacity / 100 if specs.battery_capacity else 0
-                ram_values = [int(r.replace('GB', '')) for r in (specs.ram_options or '').split(',') if 'GB' in r]
-                if ram_values:
-                    score += max(ram_values) * 5
-
-            elif usage_type == 'Entertainment':
-                # Large screen, good battery
-                score += (specs.screen_size or 0) * 20
-                score += specs.battery_capacity / 100 if specs.battery_capacity else 0
-
-            else:  # Social Media and general use
-                # Balanced specs, good camera
-                score += (specs.rear_camera_main or 0)
-                score += specs.battery_capacity / 200 if specs.battery_capacity else 0
-
-            results.append({
-                'phone': phone,
-                'specifications': specs,
-                'usage_score': score
-            })
+        results = self._load_results(phone_ids)
+        for result in results:
+            result['usage_score'] = usage_scores[result['phone'].id]
 
-        # Sort by usage score
-        results.sort(key=lambda x: x['usage_score'], reverse=True)
-
-        return results[:top_n]
+        return results
 
     def get_similar_phones(self, phone_id, top_n=3):
         """Get phones similar to a given phone"""
-        reference_phone = Phone.query.get(phone_id)
-        if not reference_phone:
-            return []
-
-        reference_specs = PhoneSpecification.query.filter_by(phone_id=phone_id).first()
+        # Nearest neighbours by specification, precomputed in the similarity index
+        similar_ids = get_similar_phone_ids(phone_id, top_n=top_n)
+        if similar_ids:
+            return self._load_results(np.array(similar_ids))
+
+        # Phones outside the index (e.g. inactive ones, or every phone before
+        # flask build-similarity-index has run) fall back to a price band
+        return self._similar_by_price(phone_id, top_n)
+
+    def _similar_by_price(self, phone_id, top_n):
+        """Get phones within ±30% of a phone's price"""
+        snapshot = get_catalog_snapshot()
+
+        position = snapshot.position(phone_id)
+        if position is not None:
+            reference_price = snapshot.price[position]
+        else:
+            reference_phone = Phone.query.get(phone_id)
+            if not reference_phone:
+                return []
+            reference_price = reference_phone.price
 
         # Find phones in similar price range (±30%)
-        price_min = reference_phone.price * 0.7
-        price_max = reference_phone.price * 1.3
-
-        similar_phones = Phone.query.filter(
-            Phone.is_active == True,
-            Phone.id != phone_id,
-            Phone.price >= price_min,
-            Phone.price <= price_max
-        ).all()
-
-        results = []
-        for phone in similar_phones:
-            specs = PhoneSpecification.query.filter_by(phone_id=phone.id).first()
-            results.append({
-                'phone': phone,
-                'specifications': specs
-            })
+        price_min = reference_price * 0.7
+        price_max = reference_price * 1.3
+
+        similar = np.flatnonzero(
+            (snapshot.phone_ids != phone_id) &
+            (snapshot.price >= price_min) &
+            (snapshot.price <= price_max)
+        )[:top_n]
+
+        return self._load_results(snapshot.phone_ids[similar])
+
+    def _load_results(self, phone_ids):
+        """Load phones for a list of snapshot ids in one query, keeping their order"""
+        phones = get_phones_by_ids(phone_ids.tolist())
 
-        return results[:top_n]
+        return [{
+            'phone': phone,
+            'specifications': phone.specifications
+        } for phone in phones]
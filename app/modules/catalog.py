@@ -0,0 +1,412 @@
+"""
+Phone Catalog Module
+Eager-loaded catalog queries and the in-memory catalog snapshot
+shared by the recommendation features
+"""
+from flask import has_app_context
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Phone, PhoneSpecification
+from app.utils.pagination import keyset_order, keyset_order_by, keyset_paginate
+from app.utils.schema import add_missing_columns
+from collections import deque
+import threading
+import numpy as np
+
+# Catalog version of this process, bumped on every catalog write made in it.
+# Other worker processes keep their own version and change log, so the
+# snapshot and every cache keyed on the version assume a single process.
+_catalog_version = 0
+_snapshot = None
+_change_log = deque(maxlen=1000)  # (version, changed phone ids or None for all)
+_lock = threading.Lock()
+
+def catalog_query(active_only=True):
+    """
+    Build a phone query that loads specifications and brand in the same SELECT
+
+    Both relationships are many-to-one from the phone's side, so a joined
+    eager load fetches the whole candidate set in a single round-trip
+    instead of one extra query per phone.
+    """
+    query = Phone.query.options(
+        joinedload(Phone.specifications),
+        joinedload(Phone.brand)
+    )
+
+    if active_only:
+        query = query.filter(Phone.is_active == True)
+
+    return query
+
+def get_catalog_phones(*filters, order_by=None, limit=None, active_only=True):
+    """
+    Fetch phones with their specifications and brand in one query
+
+    Args:
+        *filters: Optional SQLAlchemy filter expressions
+        order_by: Optional ordering expression
+        limit: Optional maximum number of phones
+        active_only: Only return active phones
+
+    Returns:
+        List of Phone objects with specifications and brand loaded
+    """
+    query = catalog_query(active_only=active_only)
+
+    if filters:
+        query = query.filter(*filters)
+
+    if order_by is not None:
+        query = query.order_by(order_by)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query.all()
+
+def get_phones_by_ids(phone_ids, active_only=False):
+    """
+    Fetch the given phones in one query, preserving the order of phone_ids
+
+    Ids that do not exist are skipped.
+    """
+    if not phone_ids:
+        return []
+
+    phone_ids = [int(phone_id) for phone_id in phone_ids]
+    phones = get_catalog_phones(Phone.id.in_(phone_ids), active_only=active_only)
+    phones_by_id = {phone.id: phone for phone in phones}
+
+    return [phones_by_id[phone_id] for phone_id in phone_ids if phone_id in phones_by_id]
+
+# Listing sort options, each backed by a composite index on phones. The
+# id tie-breaker makes every ordering unique so it can be keyset-paginated.
+PHONE_SORTS = {
+    'price_asc': keyset_order(Phone.price, Phone.id),
+    'price_desc': keyset_order(Phone.price, Phone.id, descending=True),
+    'name': keyset_order(Phone.model_name, Phone.id),
+    'created_at': keyset_order(Phone.created_at, Phone.id, descending=True)
+}
+
+def phone_listing_query(brand_ids=None, min_price=None, max_price=None, min_ram=None, min_storage=None,
+                        requires_5g=False, min_battery=None, sort_by=None, active_only=True):
+    """
+    Build the phone listing query shared by the browse, brand, filter and admin pages
+
+    Filters are applied in the column order of the composite indexes on
+    phones (is_active, brand_id, then price or the sort column), so every
+    combination can be answered from an index. Check with
+    `flask check-query-plans` after changing this query.
+
+    Args:
+        brand_ids: Optional list of brand IDs
+        min_price: Optional minimum price
+        max_price: Optional maximum price
+        min_ram: Optional minimum RAM in GB
+        min_storage: Optional minimum storage in GB
+        requires_5g: Only list 5G phones
+        min_battery: Optional minimum battery capacity in mAh
+        sort_by: Key of PHONE_SORTS, or None for no ordering
+        active_only: Only list active phones
+
+    Returns:
+        Phone query
+    """
+    query = Phone.query
+
+    if active_only:
+        query = query.filter(Phone.is_active == True)
+
+    if brand_ids:
+        if len(brand_ids) == 1:
+            query = query.filter(Phone.brand_id == brand_ids[0])
+        else:
+            query = query.filter(Phone.brand_id.in_(brand_ids))
+
+    if min_price:
+        query = query.filter(Phone.price >= min_price)
+
+    if max_price:
+        query = query.filter(Phone.price <= max_price)
+
+    # Specification filters are range predicates on indexed columns. As a
+    # semi-join they are answered from those indexes; a join would walk the
+    # phones index and look each phone's specifications up by phone_id.
+    spec_filters = []
+
+    if min_ram:
+        spec_filters.append(PhoneSpecification.max_ram_gb >= min_ram)
+
+    if min_storage:
+        spec_filters.append(PhoneSpecification.max_storage_gb >= min_storage)
+
+    if requires_5g:
+        spec_filters.append(PhoneSpecification.has_5g == True)
+
+    if min_battery:
+        spec_filters.append(PhoneSpecification.battery_capacity >= min_battery)
+
+    if spec_filters:
+        query = query.filter(Phone.id.in_(
+            db.session.query(PhoneSpecification.phone_id).filter(*spec_filters)
+        ))
+
+    if sort_by is not None:
+        query = query.order_by(*keyset_order_by(phone_sort(sort_by)))
+
+    return query
+
+def phone_sort(sort_by):
+    """Get the PHONE_SORTS ordering for a sort key, newest first by default"""
+    return PHONE_SORTS.get(sort_by, PHONE_SORTS['created_at'])
+
+def paginate_phone_listing(query, sort_by, page=1, per_page=12, cursor=None, with_total=False):
+    """
+    Paginate an unsorted phone listing query
+
+    Uses page numbers by default. When a cursor is given (an empty string
+    for the first page), seeks past the previous page instead, which
+    avoids the COUNT(*) and OFFSET of page-number pagination.
+
+    Returns:
+        Flask-SQLAlchemy Pagination, or KeysetPage in cursor mode
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    order = phone_sort(sort_by)
+
+    if cursor is None:
+        return query.order_by(*keyset_order_by(order)).paginate(page=page, per_page=per_page, error_out=False)
+
+    return keyset_paginate(query, order, cursor=cursor, per_page=per_page,
+                           with_total=with_total, count_key=get_catalog_version())
+
+
+class CatalogSnapshot:
+    """
+    Columnar, read-only view of the active catalog
+
+    Each attribute is a NumPy array with one entry per active phone, in
+    phone id order. Missing numeric specifications are stored as NaN so
+    they can be told apart from a real zero.
+    """
+
+    COLUMNS = (
+        'phone_ids', 'brand_ids', 'price', 'has_specs', 'max_ram', 'max_storage',
+        'camera_mp', 'front_camera_mp', 'battery', 'screen_size', 'refresh_rate', 'has_5g',
+        'processor_brand'
+    )
+
+    def __init__(self, columns, version):
+        self.version = version
+
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+
+        self._positions = {int(phone_id): i for i, phone_id in enumerate(self.phone_ids)}
+
+    def __len__(self):
+        return len(self.phone_ids)
+
+    def position(self, phone_id):
+        """Return the row index of a phone, or None if it is not in the snapshot"""
+        return self._positions.get(phone_id)
+
+    def rows_of(self, phone_ids):
+        """Row indexes of the given phones, skipping any not in the snapshot"""
+        phone_ids = np.asarray(phone_ids, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.phone_ids, phone_ids), max(len(self.phone_ids) - 1, 0))
+        if len(self.phone_ids) == 0:
+            return rows[:0]
+        return rows[self.phone_ids[rows] == phone_ids]
+
+    def take(self, rows):
+        """Return a snapshot of only the given rows, at the same version"""
+        return CatalogSnapshot({name: getattr(self, name)[rows] for name in self.COLUMNS}, self.version)
+
+    @classmethod
+    def build(cls, version):
+        """Load the active catalog with a single column projection query"""
+        return cls(_columns_from_rows(_snapshot_query().all()), version)
+
+    def patch(self, phone_ids, version):
+        """
+        Return a new snapshot with only the given phones reloaded
+
+        Phones that were deactivated or deleted drop out, new phones are
+        added, and every other row is reused as-is.
+        """
+        phone_ids = list(phone_ids)
+        rows = _snapshot_query().filter(Phone.id.in_(phone_ids)).all()
+        fresh = _columns_from_rows(rows)
+
+        keep = ~np.isin(self.phone_ids, phone_ids)
+        merged = {
+            name: np.concatenate([getattr(self, name)[keep], fresh[name]])
+            for name in self.COLUMNS
+        }
+
+        order = np.argsort(merged['phone_ids'], kind='stable')
+        return CatalogSnapshot({name: column[order] for name, column in merged.items()}, version)
+
+
+def _snapshot_query():
+    """Column projection of the active catalog used to build snapshots"""
+    return db.session.query(
+        Phone.id,
+        Phone.brand_id,
+        Phone.price,
+        PhoneSpecification.id.label('spec_id'),
+        PhoneSpecification.max_ram_gb,
+        PhoneSpecification.max_storage_gb,
+        PhoneSpecification.rear_camera_main,
+        PhoneSpecification.front_camera_mp,
+        PhoneSpecification.battery_capacity,
+        PhoneSpecification.screen_size,
+        PhoneSpecification.refresh_rate,
+        PhoneSpecification.has_5g,
+        PhoneSpecification.processor_brand
+    ).outerjoin(PhoneSpecification, PhoneSpecification.phone_id == Phone.id)\
+     .filter(Phone.is_active == True)\
+     .order_by(Phone.id)
+
+def _columns_from_rows(rows):
+    """Turn snapshot query rows into NumPy columns"""
+    return {
+        'phone_ids': np.array([row.id for row in rows], dtype=np.int64),
+        'brand_ids': np.array([row.brand_id for row in rows], dtype=np.int64),
+        'price': np.array([row.price for row in rows], dtype=np.float64),
+        'has_specs': np.array([row.spec_id is not None for row in rows], dtype=bool),
+        'max_ram': _float_column(rows, 'max_ram_gb'),
+        'max_storage': _float_column(rows, 'max_storage_gb'),
+        'camera_mp': _float_column(rows, 'rear_camera_main'),
+        'front_camera_mp': _float_column(rows, 'front_camera_mp'),
+        'battery': _float_column(rows, 'battery_capacity'),
+        'screen_size': _float_column(rows, 'screen_size'),
+        'refresh_rate': _float_column(rows, 'refresh_rate'),
+        'has_5g': np.array([bool(row.has_5g) for row in rows], dtype=bool),
+        'processor_brand': np.array([row.processor_brand or '' for row in rows], dtype=object)
+    }
+
+def _float_column(rows, name):
+    values = [getattr(row, name) for row in rows]
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+# Columns of PhoneSpecification parsed from its option strings
+PARSED_SPEC_COLUMNS = ('min_ram_gb', 'max_ram_gb', 'max_storage_gb', 'charging_watts')
+
+def backfill_spec_columns():
+    """
+    Fill the parsed RAM, storage and charging columns for every specification
+
+    Adds the columns (and their indexes) to databases created before they
+    existed, then updates only the rows whose parsed values changed.
+
+    Returns:
+        Number of specifications updated
+    """
+    add_missing_columns(db, PhoneSpecification.__table__, PARSED_SPEC_COLUMNS)
+
+    rows = db.session.query(
+        PhoneSpecification.id,
+        PhoneSpecification.phone_id,
+        PhoneSpecification.ram_options,
+        PhoneSpecification.storage_options,
+        PhoneSpecification.charging_speed,
+        *(getattr(PhoneSpecification, name) for name in PARSED_SPEC_COLUMNS)
+    ).all()
+
+    updates = []
+    phone_ids = []
+    for row in rows:
+        parsed = PhoneSpecification.parse_spec_columns(row.ram_options, row.storage_options, row.charging_speed)
+        if any(getattr(row, name) != value for name, value in parsed.items()):
+            updates.append(dict(parsed, id=row.id))
+            phone_ids.append(row.phone_id)
+
+    if updates:
+        db.session.execute(update(PhoneSpecification), updates)
+        db.session.commit()
+        invalidate_catalog(phone_ids)
+
+    return len(updates)
+
+def get_catalog_version():
+    """Get the current catalog version"""
+    return _catalog_version
+
+def invalidate_catalog(phone_ids=None):
+    """
+    Mark the catalog as changed after phones are added, edited or deleted
+
+    Args:
+        phone_ids: Ids of the phones that changed. When given, the next
+            snapshot read only reloads those phones; otherwise the whole
+            snapshot is rebuilt.
+    """
+    global _catalog_version
+
+    with _lock:
+        _catalog_version += 1
+
+        changed = None if phone_ids is None else frozenset(int(phone_id) for phone_id in phone_ids)
+        _change_log.append((_catalog_version, changed))
+
+    # A shared recommendation cache outlives this process's version
+    if has_app_context():
+        from app.modules.services import get_services
+        get_services().recommendation_cache.invalidate()
+
+def get_catalog_changes(since_version):
+    """
+    Get the phones changed after a catalog version
+
+    Lets in-memory structures derived from the catalog refresh only the
+    phones that changed since they were built.
+
+    Returns:
+        Set of phone IDs, or None if everything must be reloaded
+    """
+    with _lock:
+        return _changes_since(since_version)
+
+def _changes_since(since_version):
+    if since_version == _catalog_version:
+        return set()
+
+    # The log no longer reaches back that far
+    if not _change_log or _change_log[0][0] > since_version + 1:
+        return None
+
+    phone_ids = set()
+    for version, changed in _change_log:
+        if version <= since_version:
+            continue
+        if changed is None:
+            return None
+        phone_ids.update(changed)
+
+    return phone_ids
+
+def get_catalog_snapshot():
+    """Get the catalog snapshot, refreshing it if the catalog version moved"""
+    global _snapshot
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == _catalog_version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None:
+            _snapshot = CatalogSnapshot.build(_catalog_version)
+        elif _snapshot.version != _catalog_version:
+            changed = _changes_since(_snapshot.version)
+            if changed is None:
+                _snapshot = CatalogSnapshot.build(_catalog_version)
+            else:
+                _snapshot = _snapshot.patch(changed, _catalog_version)
+
+        return _snapshot
@@ -0,0 +1,450 @@
+"""
+Catalog Import Module
+Streams the phone dataset CSV into the Phone and PhoneSpecification tables
+"""
+from app import db
+from app.models import Brand, Phone, PhoneSpecification
+from app.modules.catalog import invalidate_catalog
+from app.utils.helpers import parse_charging_watts
+from sqlalchemy import insert, update
+from datetime import datetime
+import csv
+import hashlib
+import json
+import re
+import time
+
+# Brands whose model names are not prefixed with the brand ("iPhone 15")
+UNPREFIXED_BRANDS = {'apple'}
+
+# Chipset keywords mapped to processor brand, checked in order
+PROCESSOR_BRANDS = [
+    ('snapdragon', 'Qualcomm'),
+    ('qualcomm', 'Qualcomm'),
+    ('dimensity', 'MediaTek'),
+    ('helio', 'MediaTek'),
+    ('mediate', 'MediaTek'),
+    ('exynos', 'Samsung'),
+    ('kirin', 'HiSilicon'),
+    ('hisilicon', 'HiSilicon'),
+    ('tensor', 'Google'),
+    ('apple', 'Apple'),
+    ('unisoc', 'Unisoc'),
+    ('xring', 'Xiaomi')
+]
+
+_PRICE_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)')
+_SCREEN_SIZE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*inch', re.IGNORECASE)
+_REFRESH_RATE_RE = re.compile(r'(\d+)\s*Hz', re.IGNORECASE)
+_RESOLUTION_RE = re.compile(r'(\d+)\s*x\s*(\d+)')
+_CAPACITY_RE = re.compile(r'(\d+)\s*(GB|TB)\b', re.IGNORECASE)
+_CAMERA_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:MP|-megapixel)', re.IGNORECASE)
+_BATTERY_RE = re.compile(r'(\d+)\s*mAh', re.IGNORECASE)
+_WEIGHT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*g\b')
+_BLUETOOTH_RE = re.compile(r'^\s*(\d\.\d)')
+_WATER_RESISTANCE_RE = re.compile(r'\bIP\d{2}\b')
+_CHIPSET_PROCESS_RE = re.compile(r'\s*\(\d+\s*nm\)')
+
+def parse_price(value):
+    """Parse "MYR 3,899" or "RM 12,188" into a float"""
+    match = _PRICE_RE.search(value or '')
+    return float(match.group(1).replace(',', '')) if match else None
+
+def parse_date(value):
+    """Parse an ISO "YYYY-MM-DD" date"""
+    try:
+        return datetime.strptime((value or '').strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def parse_screen_size(value):
+    """Parse "6.7 inches, 110.2 cm2" into 6.7"""
+    match = _SCREEN_SIZE_RE.search(value or '')
+    return float(match.group(1)) if match else None
+
+def parse_refresh_rate(value):
+    """Parse the refresh rate from a display description, defaulting to 60Hz"""
+    match = _REFRESH_RATE_RE.search(value or '')
+    return int(match.group(1)) if match else 60
+
+def parse_resolution(value):
+    """Parse "1290 x 2796 pixels, 19.59 ratio" into 1290x2796"""
+    match = _RESOLUTION_RE.search(value or '')
+    return f"{match.group(1)}x{match.group(2)}" if match else None
+
+def parse_capacity_options(value, units=('GB', 'TB')):
+    """
+    Normalize a capacity list like "256GB / 512GB / 1TB NVMe"
+
+    Returns:
+        String like "256GB, 512GB, 1TB" (smallest first), or None
+    """
+    sizes = {}
+    for amount, unit in _CAPACITY_RE.findall(value or ''):
+        unit = unit.upper()
+        if unit not in units:
+            continue
+        amount = int(amount)
+        size_gb = amount * 1024 if unit == 'TB' else amount
+        sizes[size_gb] = f"{amount}{unit}"
+
+    if not sizes:
+        return None
+    return ', '.join(sizes[size] for size in sorted(sizes))
+
+def parse_megapixels(value):
+    """Parse the first camera resolution, e.g. "48 MP, f/1.6, ..." into 48"""
+    match = _CAMERA_RE.search(value or '')
+    return int(float(match.group(1))) if match else None
+
+def parse_battery(value):
+    """Parse "4383 mAh" into 4383"""
+    match = _BATTERY_RE.search(value or '')
+    return int(match.group(1)) if match else None
+
+def parse_weight(value):
+    """Parse "201 g (7.09 oz)" into 201"""
+    match = _WEIGHT_RE.search(value or '')
+    return int(float(match.group(1))) if match else None
+
+def parse_bluetooth_version(value):
+    """Parse "5.3, A2DP, LE" into 5.3"""
+    match = _BLUETOOTH_RE.match(value or '')
+    return match.group(1) if match else None
+
+def parse_water_resistance(value):
+    """Find an IP rating such as IP68"""
+    match = _WATER_RESISTANCE_RE.search(value or '')
+    return match.group(0) if match else None
+
+def parse_wifi_standard(value):
+    """Turn "Wi-Fi 802.11 a/b/g/n/ac/6" into WiFi 6"""
+    value = (value or '').lower()
+    if not value.startswith('wi-fi'):
+        return None
+
+    standards = value.split(',')[0].split('/')
+    if '7' in standards:
+        return 'WiFi 7'
+    if '6e' in standards:
+        return 'WiFi 6E'
+    if '6' in standards:
+        return 'WiFi 6'
+    if any(standard.endswith('ac') for standard in standards):
+        return 'WiFi 5'
+    return 'WiFi 4'
+
+def parse_processor_brand(chipset):
+    """Derive the processor brand from a chipset name"""
+    chipset = (chipset or '').lower()
+    for keyword, brand in PROCESSOR_BRANDS:
+        if keyword in chipset:
+            return brand
+    return None
+
+def _text(value, length):
+    """Strip a free-text field and clip it to the column length"""
+    value = (value or '').strip()
+    return value[:length] if value else None
+
+def parse_catalog_row(row):
+    """
+    Parse one dataset row into Phone and PhoneSpecification column values
+
+    Returns:
+        Tuple of (brand_name, phone_fields, spec_fields), or None if the
+        row has no brand, model or price
+    """
+    brand_name = (row.get('Brand') or '').strip()
+    model = (row.get('Model') or '').strip()
+    price = parse_price(row.get('Price'))
+
+    if not brand_name or not model or price is None:
+        return None
+
+    if brand_name.lower() in UNPREFIXED_BRANDS or model.lower().startswith(brand_name.lower()):
+        model_name = model
+    else:
+        model_name = f"{brand_name} {model}"
+
+    image_url = (row.get('Image URL') or '').strip()
+    source_url = (row.get('URL') or '').strip()
+
+    phone_fields = {
+        'model_name': model_name[:150],
+        'price': price,
+        'main_image': image_url[:255] if image_url.startswith('http') else None,
+        'availability_status': _text(row.get('Status'), 50) or 'Available',
+        'release_date': parse_date(row.get('Date')),
+        'source_url': source_url[:255] if source_url.startswith('http') else None,
+        'is_active': True
+    }
+
+    chipset = _CHIPSET_PROCESS_RE.sub('', row.get('Chipset') or '')
+    display_type = row.get('Display Type') or ''
+    fast_charging = row.get('Fast Charging') or ''
+    watts = parse_charging_watts(fast_charging)
+    sensors = f"{row.get('Sensors') or ''} {row.get('URL') or ''}".lower()
+
+    spec_fields = {
+        'screen_size': parse_screen_size(row.get('Screen Size')),
+        'screen_resolution': parse_resolution(row.get('Resolution')),
+        'screen_type': _text(display_type.split(',')[0], 50),
+        'refresh_rate': parse_refresh_rate(display_type),
+        'processor': _text(chipset, 100),
+        'processor_brand': parse_processor_brand(chipset),
+        'ram_options': parse_capacity_options(row.get('RAM'), units=('GB',)),
+        'storage_options': parse_capacity_options(row.get('Storage')),
+        'expandable_storage': (row.get('Card Slot') or '').lower().startswith('microsd'),
+        'rear_camera': _text(row.get('Rear Camera'), 100),
+        'rear_camera_main': parse_megapixels(row.get('Rear Camera')),
+        'front_camera': _text(row.get('Front Camera'), 50),
+        'front_camera_mp': parse_megapixels(row.get('Front Camera')),
+        'battery_capacity': parse_battery(row.get('Battery Capacity')) or parse_battery(row.get('Battery')),
+        'charging_speed': f"{watts}W Fast Charging" if watts else None,
+        'wireless_charging': 'wireless' in f"{row.get('Wireless Charging') or ''} {fast_charging}".lower(),
+        'has_5g': bool((row.get('5G Networks') or '').strip()) or '5G' in (row.get('Technology') or ''),
+        'wifi_standard': parse_wifi_standard(row.get('Wi-Fi')),
+        'bluetooth_version': parse_bluetooth_version(row.get('Bluetooth')),
+        'nfc': (row.get('NFC') or '').strip().lower().startswith('yes'),
+        'operating_system': _text((row.get('OS') or '').split(',')[0], 50),
+        'fingerprint_sensor': 'fingerprint' in sensors,
+        'face_unlock': 'face' in sensors,
+        'water_resistance': parse_water_resistance(f"{row.get('Body Material') or ''} {row.get('Protection') or ''}"),
+        'dual_sim': 'dual' in (row.get('SIM') or '').lower(),
+        'weight': parse_weight(row.get('Weight')),
+        'dimensions': _text((row.get('Dimensions') or '').split('(')[0], 50),
+        'colors_available': _text(row.get('Color'), 200)
+    }
+
+    phone_fields['content_hash'] = row_content_hash(brand_name, phone_fields, spec_fields)
+
+    # Bulk statements skip the model events, so fill the parsed columns here
+    spec_fields.update(PhoneSpecification.parse_spec_columns(
+        spec_fields['ram_options'], spec_fields['storage_options'], spec_fields['charging_speed']
+    ))
+
+    return brand_name, phone_fields, spec_fields
+
+def row_content_hash(brand_name, phone_fields, spec_fields):
+    """SHA-1 of a parsed row, used by sync to detect changed phones"""
+    payload = json.dumps([brand_name, phone_fields, spec_fields], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class CatalogImporter:
+    """Bulk importer for the phone dataset CSV"""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+
+    def import_csv(self, path):
+        """
+        Import every new phone in a dataset CSV in a single transaction
+
+        Phones that already exist (same brand and model name) are skipped.
+
+        Args:
+            path: Path to the CSV file
+
+        Returns:
+            Dictionary with row counts and elapsed time
+        """
+        started = time.perf_counter()
+        stats = {'rows': 0, 'inserted': 0, 'skipped': 0, 'invalid': 0}
+
+        existing = {
+            (brand_id, model_name.lower())
+            for brand_id, model_name in db.session.query(Phone.brand_id, Phone.model_name)
+        }
+
+        try:
+            batch = []
+            for phone_fields, spec_fields in self._parse_csv(path, stats):
+                key = (phone_fields['brand_id'], phone_fields['model_name'].lower())
+                if key in existing:
+                    stats['skipped'] += 1
+                    continue
+                existing.add(key)
+
+                batch.append((phone_fields, spec_fields))
+                if len(batch) >= self.batch_size:
+                    stats['inserted'] += len(self._insert_batch(batch))
+                    batch = []
+
+            if batch:
+                stats['inserted'] += len(self._insert_batch(batch))
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if stats['inserted']:
+            invalidate_catalog()
+
+        stats['elapsed'] = time.perf_counter() - started
+        return stats
+
+    def sync_csv(self, path):
+        """
+        Incrementally sync the catalog with a dataset CSV
+
+        Rows are matched to phones by source URL, then by brand and model
+        name. Only phones whose source row hash changed are updated, new
+        rows are inserted, and imported phones missing from the file are
+        deactivated. Phones added by hand (no content hash) are never
+        deactivated.
+
+        Args:
+            path: Path to the CSV file
+
+        Returns:
+            Dictionary with row counts, elapsed time and changed phone ids
+        """
+        started = time.perf_counter()
+        stats = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+                 'deactivated': 0, 'skipped': 0, 'invalid': 0}
+
+        existing = db.session.query(
+            Phone.id,
+            Phone.brand_id,
+            Phone.model_name,
+            Phone.source_url,
+            Phone.content_hash,
+            Phone.is_active,
+            PhoneSpecification.id.label('spec_id')
+        ).outerjoin(PhoneSpecification, PhoneSpecification.phone_id == Phone.id).all()
+
+        by_url = {row.source_url: row for row in existing if row.source_url}
+        by_name = {(row.brand_id, row.model_name.lower()): row for row in existing}
+
+        now = datetime.utcnow()
+        seen_keys = set()
+        seen_ids = set()
+        changed_ids = []
+        phone_updates = []
+        spec_updates = []
+        spec_inserts = []
+
+        try:
+            batch = []
+            for phone_fields, spec_fields in self._parse_csv(path, stats):
+                key = (phone_fields['brand_id'], phone_fields['model_name'].lower())
+                current = by_url.get(phone_fields['source_url']) or by_name.get(key)
+
+                if key in seen_keys or (current and current.id in seen_ids):
+                    stats['skipped'] += 1
+                    continue
+                seen_keys.add(key)
+
+                if current is None:
+                    batch.append((phone_fields, spec_fields))
+                    if len(batch) >= self.batch_size:
+                        changed_ids.extend(self._insert_batch(batch))
+                        batch = []
+                    continue
+
+                seen_ids.add(current.id)
+                if current.content_hash == phone_fields['content_hash'] and current.is_active:
+                    stats['unchanged'] += 1
+                    continue
+
+                phone_updates.append(dict(phone_fields, id=current.id, updated_at=now))
+                if current.spec_id:
+                    spec_updates.append(dict(spec_fields, id=current.spec_id))
+                else:
+                    spec_inserts.append(dict(spec_fields, phone_id=current.id))
+                changed_ids.append(current.id)
+
+            if batch:
+                changed_ids.extend(self._insert_batch(batch))
+            stats['inserted'] = len(changed_ids) - len(phone_updates)
+            stats['updated'] = len(phone_updates)
+
+            # Deactivate imported phones that are no longer in the source
+            missing_ids = [
+                row.id for row in existing
+                if row.content_hash and row.is_active and row.id not in seen_ids
+            ]
+            stats['deactivated'] = len(missing_ids)
+            changed_ids.extend(missing_ids)
+
+            if phone_updates:
+                db.session.execute(update(Phone), phone_updates)
+            if spec_updates:
+                db.session.execute(update(PhoneSpecification), spec_updates)
+            if spec_inserts:
+                db.session.execute(insert(PhoneSpecification), spec_inserts)
+            if missing_ids:
+                db.session.execute(update(Phone), [
+                    {'id': phone_id, 'is_active': False, 'updated_at': now}
+                    for phone_id in missing_ids
+                ])
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Only the touched phones are reloaded into the catalog snapshot
+        if changed_ids:
+            invalidate_catalog(changed_ids)
+
+        stats['changed_ids'] = changed_ids
+        stats['elapsed'] = time.perf_counter() - started
+        return stats
+
+    def _parse_csv(self, path, stats):
+        """Stream parsed (phone_fields, spec_fields) rows from a dataset CSV"""
+        brand_ids = {brand.name.lower(): brand.id for brand in Brand.query.all()}
+
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            for row in csv.DictReader(csv_file):
+                stats['rows'] += 1
+
+                parsed = parse_catalog_row(row)
+                if not parsed:
+                    stats['invalid'] += 1
+                    continue
+
+                brand_name, phone_fields, spec_fields = parsed
+                phone_fields['brand_id'] = self._resolve_brand(brand_ids, brand_name)
+                yield phone_fields, spec_fields
+
+    def _resolve_brand(self, brand_ids, brand_name):
+        """Get the id of a brand, creating the brand on first use"""
+        brand_id = brand_ids.get(brand_name.lower())
+        if brand_id is None:
+            brand = Brand(name=brand_name)
+            db.session.add(brand)
+            db.session.flush()
+            brand_id = brand_ids[brand_name.lower()] = brand.id
+        return brand_id
+
+    def _insert_batch(self, batch):
+        """
+        Insert a batch of phones and their specifications with executemany
+
+        Returns:
+            List of the new phone ids
+        """
+        phone_rows = [phone_fields for phone_fields, _ in batch]
+        # render_nulls keeps rows with different missing fields in one executemany
+        phone_ids = db.session.scalars(
+            insert(Phone).returning(Phone.id, sort_by_parameter_order=True),
+            phone_rows,
+            execution_options={'render_nulls': True}
+        ).all()
+
+        spec_rows = []
+        for phone_id, (_, spec_fields) in zip(phone_ids, batch):
+            spec_fields['phone_id'] = phone_id
+            spec_rows.append(spec_fields)
+        db.session.execute(
+            insert(PhoneSpecification),
+            spec_rows,
+            execution_options={'render_nulls': True}
+        )
+
+        return phone_ids
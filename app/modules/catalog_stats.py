@@ -0,0 +1,52 @@
+"""
+Catalog Statistics Module
+Per-brand phone counts and price ranges from grouped queries, cached in memory
+"""
+from sqlalchemy import func
+from app import db
+from app.models import Phone, Brand
+from app.modules.catalog import get_catalog_version
+
+class CatalogStats:
+    """Aggregates of the active catalog, computed with two queries"""
+
+    def __init__(self, version):
+        self.version = version
+
+        rows = db.session.query(
+            Phone.brand_id,
+            func.count(Phone.id),
+            func.min(Phone.price),
+            func.max(Phone.price)
+        ).filter(Phone.is_active == True)\
+         .group_by(Phone.brand_id)\
+         .all()
+
+        # brand id -> (phone count, min price, max price)
+        self.brands = {brand_id: (count, min_price, max_price) for brand_id, count, min_price, max_price in rows}
+
+        self.total_phones = sum(count for count, _, _ in self.brands.values())
+        self.min_price = min((min_price for _, min_price, _ in self.brands.values()), default=0)
+        self.max_price = max((max_price for _, _, max_price in self.brands.values()), default=0)
+        self.total_brands = Brand.query.filter_by(is_active=True).count()
+
+    def phone_count(self, brand_id):
+        """Number of active phones of a brand"""
+        return self.brands.get(brand_id, (0, 0, 0))[0]
+
+    def price_range(self, brand_id):
+        """(min, max) price of a brand's active phones, or (0, 0) if it has none"""
+        _, min_price, max_price = self.brands.get(brand_id, (0, 0, 0))
+        return (min_price, max_price)
+
+def get_catalog_stats():
+    """Get the catalog statistics, recomputing them after catalog or brand writes"""
+    from app.modules.services import get_services
+
+    version = get_catalog_version()
+    return get_services().versioned('catalog_stats', version, lambda: CatalogStats(version))
+
+def invalidate_catalog_stats():
+    """Drop the cached statistics after brands are added or edited"""
+    from app.modules.services import get_services
+    get_services().discard('catalog_stats')
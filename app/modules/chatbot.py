@@ -2,28 +2,24 @@
 Chatbot Engine
 NLP-powered conversational assistant for phone recommendations
 """
-from app import db
+from app import history_writer
 from app.models import ChatHistory, Phone, Brand
 from app.modules.ai_engine import AIRecommendationEngine
-import re
+from app.modules.catalog import get_catalog_snapshot
+from app.modules.conversation import (PHONE_INTENTS, ConversationContext, ConversationStore, candidate_phone_ids,
+                                      follow_up)
+from app.modules.entities import extract_entities
+from app.modules.intents import IntentMatcher
 import json
 from datetime import datetime
 
 class ChatbotEngine:
     """Conversational AI chatbot for DialSmart"""
 
-    def __init__(self):
-        self.ai_engine = AIRecommendationEngine()
-        self.intents = {
-            'greeting': ['hello', 'hi', 'hey', 'good morning', 'good afternoon'],
-            'budget_query': ['budget', 'price', 'cost', 'cheap', 'affordable', 'expensive', 'rm'],
-            'recommendation': ['recommend', 'suggest', 'find', 'looking for', 'need', 'want'],
-            'comparison': ['compare', 'difference', 'vs', 'versus', 'better'],
-            'specification': ['specs', 'specification', 'camera', 'battery', 'ram', 'storage', 'screen'],
-            'brand_query': ['brand', 'samsung', 'apple', 'iphone', 'xiaomi', 'huawei'],
-            'help': ['help', 'how', 'what can you do'],
-            'usage_type': ['gaming', 'photography', 'camera', 'business', 'work', 'social media', 'entertainment']
-        }
+    def __init__(self, ai_engine=None, contexts=None):
+        self.ai_engine = ai_engine or AIRecommendationEngine()
+        self.intent_matcher = IntentMatcher()
+        self.contexts = contexts if contexts is not None else ConversationStore()
 
     def process_message(self, user_id, message, session_id=None):
         """
@@ -37,38 +33,153 @@ class ChatbotEngine:
         Returns:
             Dictionary with response and metadata
         """
-        # Detect intent
-        intent = self._detect_intent(message.lower())
+        # Detect intent and criteria, continuing the session's earlier turns
+        turn, candidate_ids = self._read_message(user_id, message, session_id)
 
         # Generate response based on intent
-        response_data = self._generate_response(user_id, message, intent)
+        response_data = self._generate_response(user_id, message, turn.intent, turn.criteria, candidate_ids)
+        self._remember(user_id, session_id, turn, response_data)
 
         # Save to chat history
         self._save_chat_history(
             user_id=user_id,
             message=message,
             response=response_data['response'],
-            intent=intent,
+            intent=turn.intent,
             session_id=session_id,
             metadata=response_data.get('metadata', {})
         )
 
         return response_data
 
+    def stream_message(self, user_id, message, session_id=None):
+        """
+        Process user message as a stream of events
+
+        The intent and quick replies are yielded before any phone is looked
+        up, then each phone as soon as the engine has ranked it, then the
+        complete response. The turn is saved to chat history once the
+        complete response has been built, whether or not the client reads it.
+
+        Args:
+            user_id: User ID
+            message: User's message text
+            session_id: Optional session ID for conversation grouping
+
+        Yields:
+            (event, data) pairs: one 'intent', any number of 'phone', one 'message'
+        """
+        turn, candidate_ids = self._read_message(user_id, message, session_id)
+        plan = self._plan_response(user_id, turn.intent, turn.criteria, candidate_ids)
+
+        yield 'intent', {
+            'intent': turn.intent,
+            'quick_replies': plan.get('quick_replies', []),
+            'action': plan.get('action')
+        }
+
+        phone_list = []
+        lines = []
+        for line, phone in plan.get('phones', ()):
+            lines.append(line)
+            phone_list.append(phone)
+            yield 'phone', phone
+
+        response_data = self._finish_response(plan, lines, phone_list)
+        self._remember(user_id, session_id, turn, response_data)
+
+        # Saved even if the client disconnects and the generator is closed at this yield
+        try:
+            yield 'message', response_data
+        finally:
+            self._save_chat_history(
+                user_id=user_id,
+                message=message,
+                response=response_data['response'],
+                intent=turn.intent,
+                session_id=session_id,
+                metadata=response_data.get('metadata', {})
+            )
+
+    def _read_message(self, user_id, message, session_id):
+        """
+        Detect the intent and criteria of a message within its session
+
+        Sessions are kept per user, so a session id sent by another user
+        never reads this user's context. Criteria carry over from the
+        session's earlier turns. A follow-up
+        recommendation narrows the candidates kept from the previous turn
+        instead of filtering the whole catalog again, and only those
+        candidates are ranked.
+
+        Returns:
+            Tuple of (ConversationContext for this turn, candidate phone IDs to rank or None)
+        """
+        context = self.contexts.get((user_id, session_id)) if session_id else None
+        intent, criteria = follow_up(context, self._detect_intent(message.lower()), extract_entities(message))
+        turn = ConversationContext(intent, criteria)
+
+        if intent == 'recommendation' and criteria:
+            snapshot = get_catalog_snapshot()
+            turn.candidate_ids = candidate_phone_ids(snapshot, criteria, context)
+            turn.version = snapshot.version
+
+        # With no phone meeting every criterion, rank the whole catalog for the closest matches
+        if context is None or turn.candidate_ids is None or len(turn.candidate_ids) == 0:
+            return turn, None
+        return turn, turn.candidate_ids
+
+    def _remember(self, user_id, session_id, turn, response_data):
+        """Keep a turn that listed phones as the context of the user's session"""
+        if session_id and turn.intent in PHONE_INTENTS:
+            turn.phone_ids = tuple(phone['id'] for phone in response_data.get('metadata', {}).get('phones', []))
+            self.contexts.set((user_id, session_id), turn)
+
     def _detect_intent(self, message):
         """Detect user intent from message"""
-        message_lower = message.lower()
+        return self.intent_matcher.detect(message)
 
-        # Check each intent
-        for intent, keywords in self.intents.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    return intent
+    def rank_intents(self, message):
+        """Get every matching intent with its confidence, best first"""
+        return self.intent_matcher.rank(message)
 
-        return 'general'
+    def _generate_response(self, user_id, message, intent, criteria=None, candidate_ids=None):
+        """Generate appropriate response based on intent and the message's ChatCriteria"""
+        if criteria is None:
+            criteria = extract_entities(message)
 
-    def _generate_response(self, user_id, message, intent):
-        """Generate appropriate response based on intent"""
+        plan = self._plan_response(user_id, intent, criteria, candidate_ids)
+
+        lines = []
+        phone_list = []
+        for line, phone in plan.get('phones', ()):
+            lines.append(line)
+            phone_list.append(phone)
+
+        return self._finish_response(plan, lines, phone_list)
+
+    def _finish_response(self, plan, lines, phone_list):
+        """Assemble the response dictionary of a plan from the phones it produced"""
+        if 'phones' not in plan:
+            return plan
+
+        if not phone_list:
+            return {'response': plan['empty'], 'type': 'text'}
+
+        return {
+            'response': plan['response'] + ''.join(lines),
+            'type': 'recommendation',
+            'metadata': dict(plan.get('metadata', {}), phones=phone_list)
+        }
+
+    def _plan_response(self, user_id, intent, criteria, candidate_ids=None):
+        """
+        Describe the response for an intent without looking up any phones
+
+        Intents that answer with phones get a 'phones' generator of
+        (response line, phone dictionary) pairs, the 'response' text that
+        precedes the phones, and the 'empty' text to use if there are none.
+        """
 
         if intent == 'greeting':
             return {
@@ -78,34 +189,24 @@ class ChatbotEngine:
             }
 
         elif intent == 'budget_query':
-            # Extract budget from message
-            budget = self._extract_budget(message)
+            budget = criteria.budget
             if budget:
                 min_budget, max_budget = budget
-                phones = self.ai_engine.get_budget_recommendations((min_budget, max_budget), top_n=3)
 
-                if phones:
-                    response = f"Here are the top phones within RM{min_budget} - RM{max_budget}:\n\n"
-                    phone_list = []
-                    for item in phones:
+                def phones():
+                    for item in self.ai_engine.get_budget_recommendations((min_budget, max_budget), top_n=3):
                         phone = item['phone']
-                        response += f"📱 {phone.model_name} - RM{phone.price:,.2f}\n"
-                        phone_list.append({
+                        yield f"📱 {phone.model_name} - RM{phone.price:,.2f}\n", {
                             'id': phone.id,
                             'name': phone.model_name,
                             'price': phone.price
-                        })
+                        }
 
-                    return {
-                        'response': response,
-                        'type': 'recommendation',
-                        'metadata': {'phones': phone_list}
-                    }
-                else:
-                    return {
-                        'response': f"I couldn't find phones in that exact range. Would you like to adjust your budget?",
-                        'type': 'text'
-                    }
+                return {
+                    'response': f"Here are the top phones within RM{min_budget} - RM{max_budget}:\n\n",
+                    'phones': phones(),
+                    'empty': "I couldn't find phones in that exact range. Would you like to adjust your budget?"
+                }
             else:
                 return {
                     'response': "What's your budget range? For example, 'I'm looking for phones under RM2000'",
@@ -113,104 +214,79 @@ class ChatbotEngine:
                 }
 
         elif intent == 'recommendation':
-            # Check for specific criteria in message
-            criteria = self._extract_criteria(message)
-
-            # Get recommendations
-            recommendations = self.ai_engine.get_recommendations(user_id, criteria=criteria, top_n=3)
-
-            if recommendations:
-                response = "Based on your needs, I recommend:\n\n"
-                phone_list = []
-
+            def phones():
+                # Criteria in the message override the stored preferences
+                recommendations = self.ai_engine.get_recommendations(
+                    user_id, criteria=criteria, top_n=3, candidate_ids=candidate_ids
+                )
                 for rec in recommendations:
                     phone = rec['phone']
-                    response += f"📱 {phone.model_name}\n"
-                    response += f"   💰 RM{phone.price:,.2f}\n"
-                    response += f"   ✨ {rec['match_score']}% match\n"
-                    response += f"   {rec['reasoning'][:100]}...\n\n"
+                    line = f"📱 {phone.model_name}\n"
+                    line += f"   💰 RM{phone.price:,.2f}\n"
+                    line += f"   ✨ {rec['match_score']}% match\n"
+                    line += f"   {rec['reasoning'][:100]}...\n\n"
 
-                    phone_list.append({
+                    yield line, {
                         'id': phone.id,
                         'name': phone.model_name,
                         'price': phone.price,
                         'match_score': rec['match_score']
-                    })
+                    }
 
-                return {
-                    'response': response,
-                    'type': 'recommendation',
-                    'metadata': {'phones': phone_list}
-                }
-            else:
-                return {
-                    'response': "Let me help you find the perfect phone. What's your budget and what will you primarily use it for?",
-                    'type': 'text'
-                }
+            return {
+                'response': "Based on your needs, I recommend:\n\n",
+                'phones': phones(),
+                'empty': "Let me help you find the perfect phone. What's your budget and what will you primarily use it for?"
+            }
 
         elif intent == 'usage_type':
-            # Detect usage type
-            usage = self._detect_usage_type(message)
+            usage = criteria.usage
+            empty = "What will you primarily use your phone for? Gaming, photography, business, or entertainment?"
             if usage:
-                budget = self._extract_budget(message)
-                phones = self.ai_engine.get_phones_by_usage(usage, budget, top_n=3)
-
-                if phones:
-                    response = f"Great choice! Here are the best phones for {usage}:\n\n"
-                    phone_list = []
-
-                    for item in phones:
+                def phones():
+                    for item in self.ai_engine.get_phones_by_usage(usage, criteria.budget, top_n=3):
                         phone = item['phone']
-                        response += f"📱 {phone.model_name} - RM{phone.price:,.2f}\n"
-                        phone_list.append({
+                        yield f"📱 {phone.model_name} - RM{phone.price:,.2f}\n", {
                             'id': phone.id,
                             'name': phone.model_name,
                             'price': phone.price
-                        })
+                        }
 
-                    return {
-                        'response': response,
-                        'type': 'recommendation',
-                        'metadata': {'phones': phone_list, 'usage': usage}
-                    }
+                return {
+                    'response': f"Great choice! Here are the best phones for {usage}:\n\n",
+                    'phones': phones(),
+                    'empty': empty,
+                    'metadata': {'usage': usage}
+                }
 
-            return {
-                'response': "What will you primarily use your phone for? Gaming, photography, business, or entertainment?",
-                'type': 'text'
-            }
+            return {'response': empty, 'type': 'text'}
 
         elif intent == 'brand_query':
-            # Extract brand name
-            brand_name = self._extract_brand(message)
+            empty = "Which brand are you interested in? We have Samsung, Apple, Xiaomi, Huawei, and more!"
+            brand_name = criteria.brand
             if brand_name:
                 brand = Brand.query.filter(Brand.name.ilike(f"%{brand_name}%")).first()
                 if brand:
-                    phones = Phone.query.filter_by(brand_id=brand.id, is_active=True).limit(5).all()
-                    response = f"Here are some popular {brand.name} phones:\n\n"
-
-                    phone_list = []
-                    for phone in phones:
-                        response += f"📱 {phone.model_name} - RM{phone.price:,.2f}\n"
-                        phone_list.append({
-                            'id': phone.id,
-                            'name': phone.model_name,
-                            'price': phone.price
-                        })
+                    def phones():
+                        for phone in Phone.query.filter_by(brand_id=brand.id, is_active=True).limit(5):
+                            yield f"📱 {phone.model_name} - RM{phone.price:,.2f}\n", {
+                                'id': phone.id,
+                                'name': phone.model_name,
+                                'price': phone.price
+                            }
 
                     return {
-                        'response': response,
-                        'type': 'recommendation',
-                        'metadata': {'phones': phone_list, 'brand': brand.name}
+                        'response': f"Here are some popular {brand.name} phones:\n\n",
+                        'phones': phones(),
+                        'empty': empty,
+                        'metadata': {'brand': brand.name}
                     }
 
-            return {
-                'response': "Which brand are you interested in? We have Samsung, Apple, Xiaomi, Huawei, and more!",
-                'type': 'text'
-            }
+            return {'response': empty, 'type': 'text'}
 
         elif intent == 'comparison':
             return {
-                'response': "I can help you compare phones! Please go to the Compare page and select two phones you'd like to compare side-by-side.",
+                'response': "I can help you compare phones! Please go to the Compare page and select the phones you'd like to compare side-by-side.",
                 'type': 'text',
                 'action': 'redirect_compare'
             }
@@ -241,111 +317,43 @@ Just ask me anything like:
                 'quick_replies': ['Find a phone', 'Budget options', 'Popular brands']
             }
 
-    def _extract_budget(self, message):
-        """Extract budget range from message"""
-        # Look for patterns like "RM1000", "1000", "under 2000", "between 1000 and 2000"
-        patterns = [
-            r'rm\s*(\d+)\s*(?:to|-|and)\s*rm\s*(\d+)',  # RM1000 to RM2000
-            r'(\d+)\s*(?:to|-|and)\s*(\d+)',  # 1000 to 2000
-            r'under\s*rm?\s*(\d+)',  # under RM2000
-            r'below\s*rm?\s*(\d+)',  # below 2000
-            r'rm\s*(\d+)',  # RM2000
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, message.lower())
-            if match:
-                if 'under' in message.lower() or 'below' in message.lower():
-                    max_budget = int(match.group(1))
-                    return (500, max_budget)
-                elif len(match.groups()) == 2:
-                    return (int(match.group(1)), int(match.group(2)))
-                else:
-                    # Single value mentioned
-                    value = int(match.group(1))
-                    # Assume it's max budget
-                    return (500, value)
-
-        return None
-
-    def _extract_criteria(self, message):
-        """Extract phone criteria from message"""
-        criteria = {}
-
-        # Extract budget
-        budget = self._extract_budget(message)
-        if budget:
-            criteria['min_budget'], criteria['max_budget'] = budget
-
-        # Check for 5G mention
-        if '5g' in message.lower():
-            criteria['requires_5g'] = True
-
-        # Check for RAM mention
-        ram_match = re.search(r'(\d+)\s*gb\s*ram', message.lower())
-        if ram_match:
-            criteria['min_ram'] = int(ram_match.group(1))
-
-        # Check for storage mention
-        storage_match = re.search(r'(\d+)\s*gb\s*storage', message.lower())
-        if storage_match:
-            criteria['min_storage'] = int(storage_match.group(1))
-
-        # Check for camera mention
-        camera_match = re.search(r'(\d+)\s*mp', message.lower())
-        if camera_match:
-            criteria['min_camera'] = int(camera_match.group(1))
-
-        return criteria if criteria else None
-
-    def _detect_usage_type(self, message):
-        """Detect usage type from message"""
-        message_lower = message.lower()
-
-        if 'gam' in message_lower:
-            return 'Gaming'
-        elif 'photo' in message_lower or 'camera' in message_lower:
-            return 'Photography'
-        elif 'business' in message_lower or 'work' in message_lower:
-            return 'Business'
-        elif 'social' in message_lower:
-            return 'Social Media'
-        elif 'entertainment' in message_lower or 'video' in message_lower or 'movie' in message_lower:
-            return 'Entertainment'
-
-        return None
-
-    def _extract_brand(self, message):
-        """Extract brand name from message"""
-        brands = ['Samsung', 'Apple', 'iPhone', 'Xiaomi', 'Huawei', 'Nokia', 'Lenovo', 'Honor', 'Oppo', 'Realme', 'Vivo']
-
-        message_lower = message.lower()
-        for brand in brands:
-            if brand.lower() in message_lower:
-                if brand.lower() == 'iphone':
-                    return 'Apple'
-                return brand
-
-        return None
-
     def _save_chat_history(self, user_id, message, response, intent, session_id, metadata):
-        """Save conversation to database"""
-        chat = ChatHistory(
-            user_id=user_id,
-            message=message,
-            response=response,
-            intent=intent,
-            session_id=session_id or datetime.utcnow().strftime('%Y%m%d%H%M%S'),
-            metadata=json.dumps(metadata) if metadata else None
-        )
-        db.session.add(chat)
-        db.session.commit()
+        """Queue a conversation turn for the chat history table"""
+        now = datetime.utcnow()
+
+        # Messages without a session are grouped per user and day
+        history_writer.enqueue(ChatHistory, [{
+            'user_id': user_id,
+            'message': message,
+            'response': response,
+            'intent': intent,
+            'session_id': session_id or f'{user_id}-{now:%Y%m%d}',
+            'chat_metadata': json.dumps(metadata) if metadata else None,
+            'created_at': now
+        }])
 
     def get_chat_history(self, user_id, session_id=None, limit=50):
-        """Retrieve chat history for a user"""
+        """Retrieve chat history for a user, including turns not yet written"""
+        # Read before the table: a turn committed in between is then seen
+        # twice rather than not at all, and the copy from the table is kept
+        pending = [
+            row for row in history_writer.pending(ChatHistory)
+            if row['user_id'] == user_id and (not session_id or row['session_id'] == session_id)
+        ]
+
         query = ChatHistory.query.filter_by(user_id=user_id)
 
         if session_id:
             query = query.filter_by(session_id=session_id)
 
-        return query.order_by(ChatHistory.created_at.desc()).limit(limit).all()
+        history = query.order_by(ChatHistory.created_at.desc()).limit(limit).all()
+
+        written = {(chat.session_id, chat.created_at, chat.message) for chat in history}
+        pending = [
+            ChatHistory(**row) for row in pending
+            if (row['session_id'], row['created_at'], row['message']) not in written
+        ]
+        if pending:
+            history = sorted(history + pending, key=lambda chat: chat.created_at, reverse=True)[:limit]
+
+        return history
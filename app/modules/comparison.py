@@ -1,273 +1,313 @@
 """
 Phone Comparison Module
-Handles side-by-side phone comparisons
+Handles side-by-side comparisons of two or more phones
 """
+from sqlalchemy import case, func, or_
 from app import db
-from app.models import Phone, PhoneSpecification, Comparison
+from app.models import Comparison
+from app.modules.catalog import get_catalog_version, get_phones_by_ids
+import json
+import numpy as np
+
+def _text(value):
+    return value or 'N/A'
+
+def _unit(suffix):
+    return lambda value: f"{value}{suffix}" if value else 'N/A'
+
+def _yes_no(value):
+    return '✓ Yes' if value else '✗ No'
+
+def _price(value):
+    return f"RM {value:,.2f}"
+
+
+class ComparisonAttribute:
+    """
+    One row of the comparison table
+
+    Args:
+        key: Key of the row in the comparison table
+        label: Row label shown to the user
+        extractor: Function of (phone, specs) giving the value the row is ranked on
+        better: 'higher' or 'lower' for rows with a winner, None for the rest
+        formatter: Function turning the shown value into text
+        weight: Points a phone earns towards the overall winner for being best on this row
+        display: Optional function of (phone, specs) giving the value to show, if not the ranked one
+        spec: Whether the row comes from the phone's specifications
+    """
+
+    def __init__(self, key, label, extractor, better=None, formatter=_text, weight=0, display=None, spec=True):
+        self.key = key
+        self.label = label
+        self.extractor = extractor
+        self.better = better
+        self.formatter = formatter
+        self.weight = weight
+        self.display = display or extractor
+        self.spec = spec
+
+    def value(self, phone, specs):
+        """Value of a phone on this row, or None if it is unknown"""
+        if self.spec and specs is None:
+            return None
+        return self.extractor(phone, specs)
+
+    def text(self, phone, specs):
+        """Formatted value of a phone on this row"""
+        if self.spec and specs is None:
+            return self.formatter(None)
+        return self.formatter(self.display(phone, specs))
+
+
+# Rows of the comparison table, in display order. The weights count the
+# price, screen, refresh rate, main camera, battery and 5G rows towards
+# the overall winner.
+COMPARISON_ATTRIBUTES = (
+    ComparisonAttribute('price', 'Price', lambda phone, specs: phone.price, 'lower', _price, weight=1, spec=False),
+    ComparisonAttribute('brand', 'Brand', lambda phone, specs: phone.brand.name if phone.brand else None, spec=False),
+    ComparisonAttribute('screen_size', 'Screen Size', lambda phone, specs: specs.screen_size, 'higher', _unit('"'),
+                        weight=1),
+    ComparisonAttribute('resolution', 'Resolution', lambda phone, specs: specs.screen_resolution),
+    ComparisonAttribute('screen_type', 'Display Type', lambda phone, specs: specs.screen_type),
+    ComparisonAttribute('refresh_rate', 'Refresh Rate', lambda phone, specs: specs.refresh_rate, 'higher', _unit('Hz'),
+                        weight=1),
+    ComparisonAttribute('processor', 'Processor', lambda phone, specs: specs.processor),
+    ComparisonAttribute('ram', 'RAM', lambda phone, specs: specs.ram_options),
+    ComparisonAttribute('storage', 'Storage', lambda phone, specs: specs.storage_options),
+    ComparisonAttribute('rear_camera', 'Rear Camera', lambda phone, specs: specs.rear_camera_main, 'higher', weight=1,
+                        display=lambda phone, specs: specs.rear_camera),
+    ComparisonAttribute('front_camera', 'Front Camera', lambda phone, specs: specs.front_camera_mp, 'higher',
+                        display=lambda phone, specs: specs.front_camera),
+    ComparisonAttribute('battery', 'Battery Capacity', lambda phone, specs: specs.battery_capacity, 'higher',
+                        _unit('mAh'), weight=1),
+    ComparisonAttribute('charging', 'Charging', lambda phone, specs: specs.charging_speed),
+    ComparisonAttribute('wireless_charging', 'Wireless Charging', lambda phone, specs: specs.wireless_charging,
+                        'higher', _yes_no),
+    ComparisonAttribute('5g', '5G Support', lambda phone, specs: specs.has_5g, 'higher', _yes_no, weight=1),
+    ComparisonAttribute('nfc', 'NFC', lambda phone, specs: specs.nfc, 'higher', _yes_no),
+    ComparisonAttribute('os', 'Operating System', lambda phone, specs: specs.operating_system),
+    ComparisonAttribute('fingerprint', 'Fingerprint Sensor', lambda phone, specs: specs.fingerprint_sensor,
+                        formatter=_yes_no),
+    ComparisonAttribute('water_resistance', 'Water Resistance', lambda phone, specs: specs.water_resistance),
+    ComparisonAttribute('weight', 'Weight', lambda phone, specs: specs.weight, 'lower', _unit('g'))
+)
+
 
 class PhoneComparison:
-    """Phone comparison functionality"""
-
-    def __init__(self):
-        self.comparison_categories = [
-            'price',
-            'display',
-            'performance',
-            'camera',
-            'battery',
-            'connectivity',
-            'features'
-        ]
+    """
+    Phone comparison functionality
+
+    With a cache, comparison tables are kept by the sorted tuple of phone
+    IDs and the catalog version, so a set of phones compared in any order
+    is built once and its columns reordered for each request.
+    """
+
+    def __init__(self, attributes=COMPARISON_ATTRIBUTES, cache=None):
+        self.attributes = attributes
+        self.cache = cache
 
     def compare_phones(self, phone1_id, phone2_id, user_id=None):
+        """Compare two phones side-by-side"""
+        return self.compare([phone1_id, phone2_id], user_id)
+
+    def compare(self, phone_ids, user_id=None):
         """
-        Compare two phones side-by-side
+        Compare two or more phones side-by-side
 
         Args:
-            phone1_id: ID of first phone
-            phone2_id: ID of second phone
+            phone_ids: IDs of the phones, in column order
             user_id: Optional user ID to save comparison
 
         Returns:
-            Dictionary with comparison data
+            Dictionary with the phones (as 'phones' and as 'phone1',
+            'phone2', ...), the comparison table and the overall winner,
+            or None if fewer than two distinct phones were found
         """
-        phone1 = Phone.query.get(phone1_id)
-        phone2 = Phone.query.get(phone2_id)
+        phone_ids = [int(phone_id) for phone_id in phone_ids]
+        if len(phone_ids) < 2 or len(set(phone_ids)) != len(phone_ids):
+            return None
 
-        if not phone1 or not phone2:
+        # Phones with their brand and specifications in one query
+        phones = get_phones_by_ids(phone_ids)
+        if len(phones) != len(phone_ids):
             return None
 
-        specs1 = PhoneSpecification.query.filter_by(phone_id=phone1_id).first()
-        specs2 = PhoneSpecification.query.filter_by(phone_id=phone2_id).first()
+        table, points = self._comparison_table(phones)
 
-        # Build comparison data
         comparison_data = {
-            'phone1': {
-                'info': phone1,
-                'specs': specs1
-            },
-            'phone2': {
-                'info': phone2,
-                'specs': specs2
-            },
-            'comparison': self._build_comparison_table(phone1, specs1, phone2, specs2),
-            'winner': self._determine_winner(phone1, specs1, phone2, specs2)
+            'phones': [{'info': phone, 'specs': phone.specifications} for phone in phones],
+            'comparison': table,
+            'winner': self._determine_winner(phones, points)
         }
+        for column, entry in enumerate(comparison_data['phones'], 1):
+            comparison_data[f'phone{column}'] = entry
 
         # Save comparison if user_id provided
         if user_id:
-            self._save_comparison(user_id, phone1_id, phone2_id)
+            self._save_comparison(user_id, phone_ids)
 
         return comparison_data
 
-    def _build_comparison_table(self, phone1, specs1, phone2, specs2):
-        """Build detailed comparison table"""
-        comparison = {
-            'price': {
-                'label': 'Price',
-                'phone1': f"RM {phone1.price:,.2f}",
-                'phone2': f"RM {phone2.price:,.2f}",
-                'winner': 1 if phone1.price < phone2.price else 2,
-                'difference': abs(phone1.price - phone2.price)
-            },
-            'brand': {
-                'label': 'Brand',
-                'phone1': phone1.brand.name if phone1.brand else 'N/A',
-                'phone2': phone2.brand.name if phone2.brand else 'N/A',
-                'winner': None
-            }
+    def _comparison_table(self, phones):
+        """Get the comparison table and points of the phones, from the cache when possible"""
+        if self.cache is None:
+            return self._build_comparison_table(phones, [phone.specifications for phone in phones])
+
+        # Column c of the cached table is column order[c] of the request
+        order = sorted(range(len(phones)), key=lambda column: phones[column].id)
+        key = (tuple(phones[column].id for column in order), get_catalog_version())
+
+        cached = self.cache.get(key)
+        if cached is None:
+            sorted_phones = [phones[column] for column in order]
+            table, points = self._build_comparison_table(
+                sorted_phones, [phone.specifications for phone in sorted_phones]
+            )
+            cached = (table, points.tolist())
+            self.cache.set(key, cached)
+
+        table, points = cached
+        positions = [0] * len(order)
+        for position, column in enumerate(order):
+            positions[column] = position
+
+        return self._reorder_table(table, order, positions), np.array(points)[positions]
+
+    def _reorder_table(self, table, order, positions):
+        """Copy of a cached comparison table with its phone columns back in request order"""
+        reordered = {}
+        for key, entry in table.items():
+            values = [entry['values'][position] for position in positions]
+            reordered_entry = dict(entry, values=values)
+
+            if entry['ranks'] is not None:
+                reordered_entry['ranks'] = [entry['ranks'][position] for position in positions]
+            if entry['winner'] is not None:
+                reordered_entry['winner'] = order[entry['winner'] - 1] + 1
+
+            for column, text in enumerate(values, 1):
+                reordered_entry[f'phone{column}'] = text
+            reordered[key] = reordered_entry
+
+        return reordered
+
+    def _build_comparison_table(self, phones, specs):
+        """
+        Build detailed comparison table
+
+        Every ranked row is compared across all phones at once. A row's
+        winner is the single phone with the best known value; phones with
+        equal values share a rank, and unknown values rank last.
+
+        Returns:
+            Tuple of (table keyed by attribute, array of overall points per phone)
+        """
+        # Specification rows are shown when any phone has specifications
+        attributes = [
+            attribute for attribute in self.attributes
+            if not attribute.spec or any(phone_specs is not None for phone_specs in specs)
+        ]
+        ranked = [attribute for attribute in attributes if attribute.better]
+
+        values = np.array([
+            [attribute.value(phone, phone_specs) for phone, phone_specs in zip(phones, specs)]
+            for attribute in ranked
+        ], dtype=np.float64).reshape(len(ranked), len(phones))
+        known = ~np.isnan(values)
+
+        # Higher is better once lower-is-better rows are negated
+        signs = np.array([1.0 if attribute.better == 'higher' else -1.0 for attribute in ranked]).reshape(-1, 1)
+        scores = np.where(known, values * signs, -np.inf)
+
+        is_best = known & (scores == scores.max(axis=1, keepdims=True))
+        best_counts = is_best.sum(axis=1)
+        ranks = 1 + (scores[:, np.newaxis, :] > scores[:, :, np.newaxis]).sum(axis=2)
+        winners = np.where(best_counts == 1, is_best.argmax(axis=1) + 1, 0)
+
+        # A row on which every phone ties decides nothing
+        weights = np.array([attribute.weight for attribute in ranked], dtype=np.float64).reshape(-1, 1)
+        points = (weights * (is_best & (best_counts < len(phones)).reshape(-1, 1))).sum(axis=0)
+
+        rows = {attribute.key: row for row, attribute in enumerate(ranked)}
+        comparison = {}
+        for attribute in attributes:
+            texts = [attribute.text(phone, phone_specs) for phone, phone_specs in zip(phones, specs)]
+            entry = {'label': attribute.label, 'values': texts, 'ranks': None, 'winner': None}
+
+            row = rows.get(attribute.key)
+            if row is not None:
+                entry['ranks'] = ranks[row].tolist()
+                entry['winner'] = int(winners[row]) or None
+
+            for column, text in enumerate(texts, 1):
+                entry[f'phone{column}'] = text
+            comparison[attribute.key] = entry
+
+        if 'price' in comparison:
+            prices = [phone.price for phone in phones]
+            comparison['price']['difference'] = max(prices) - min(prices)
+
+        return comparison, points
+
+    def _determine_winner(self, phones, points):
+        """Determine overall winner from the weighted points of every phone"""
+        top = points.max()
+        leaders = np.flatnonzero(points == top)
+
+        if len(leaders) == 1:
+            leader = int(leaders[0])
+            return {'phone': leader + 1, 'name': phones[leader].model_name, 'score': float(top),
+                    'scores': points.tolist()}
+
+        return {'phone': None, 'name': 'Tie', 'score': float(top), 'scores': points.tolist()}
+
+    def warm_cache(self, top_k):
+        """
+        Precompute the tables of the most often compared phone pairs
+
+        Pairs are counted in either order from the comparisons table;
+        comparisons of three or more phones are left out.
+
+        Args:
+            top_k: Number of pairs to precompute
+
+        Returns:
+            Number of pairs now cached
+        """
+        if self.cache is None or top_k <= 0:
+            return 0
+
+        first = case((Comparison.phone1_id < Comparison.phone2_id, Comparison.phone1_id), else_=Comparison.phone2_id)
+        second = case((Comparison.phone1_id < Comparison.phone2_id, Comparison.phone2_id), else_=Comparison.phone1_id)
+        pairs = db.session.query(first, second)\
+            .filter(or_(Comparison.phone_ids.is_(None), ~Comparison.phone_ids.like('%,%,%')))\
+            .group_by(first, second)\
+            .order_by(func.count().desc(), first, second)\
+            .limit(top_k)\
+            .all()
+
+        # Every phone of every pair in one query
+        phones_by_id = {
+            phone.id: phone
+            for phone in get_phones_by_ids(sorted({phone_id for pair in pairs for phone_id in pair}))
         }
 
-        # Display comparisons
-        if specs1 and specs2:
-            comparison['screen_size'] = {
-                'label': 'Screen Size',
-                'phone1': f"{specs1.screen_size}\"" if specs1.screen_size else 'N/A',
-                'phone2': f"{specs2.screen_size}\"" if specs2.screen_size else 'N/A',
-                'winner': 1 if (specs1.screen_size or 0) > (specs2.screen_size or 0) else 2
-            }
-
-            comparison['resolution'] = {
-                'label': 'Resolution',
-                'phone1': specs1.screen_resolution or 'N/A',
-                'phone2': specs2.screen_resolution or 'N/A',
-                'winner': None
-            }
-
-            comparison['screen_type'] = {
-                'label': 'Display Type',
-                'phone1': specs1.screen_type or 'N/A',
-                'phone2': specs2.screen_type or 'N/A',
-                'winner': None
-            }
-
-            comparison['refresh_rate'] = {
-                'label': 'Refresh Rate',
-                'phone1': f"{specs1.refresh_rate}Hz" if specs1.refresh_rate else 'N/A',
-                'phone2': f"{specs2.refresh_rate}Hz" if specs2.refresh_rate else 'N/A',
-                'winner': 1 if (specs1.refresh_rate or 0) > (specs2.refresh_rate or 0) else 2
-            }
-
-            # Performance comparisons
-            comparison['processor'] = {
-                'label': 'Processor',
-                'phone1': specs1.processor or 'N/A',
-                'phone2': specs2.processor or 'N/A',
-                'winner': None
-            }
-
-            comparison['ram'] = {
-                'label': 'RAM',
-                'phone1': specs1.ram_options or 'N/A',
-                'phone2': specs2.ram_options or 'N/A',
-                'winner': None
-            }
-
-            comparison['storage'] = {
-                'label': 'Storage',
-                'phone1': specs1.storage_options or 'N/A',
-                'phone2': specs2.storage_options or 'N/A',
-                'winner': None
-            }
-
-            # Camera comparisons
-            comparison['rear_camera'] = {
-                'label': 'Rear Camera',
-                'phone1': specs1.rear_camera or 'N/A',
-                'phone2': specs2.rear_camera or 'N/A',
-                'winner': 1 if (specs1.rear_camera_main or 0) > (specs2.rear_camera_main or 0) else 2
-            }
-
-            comparison['front_camera'] = {
-                'label': 'Front Camera',
-                'phone1': specs1.front_camera or 'N/A',
-                'phone2': specs2.front_camera or 'N/A',
-                'winner': 1 if (specs1.front_camera_mp or 0) > (specs2.front_camera_mp or 0) else 2
-            }
-
-            # Battery comparisons
-            comparison['battery'] = {
-                'label': 'Battery Capacity',
-                'phone1': f"{specs1.battery_capacity}mAh" if specs1.battery_capacity else 'N/A',
-                'phone2': f"{specs2.battery_capacity}mAh" if specs2.battery_capacity else 'N/A',
-                'winner': 1 if (specs1.battery_capacity or 0) > (specs2.battery_capacity or 0) else 2
-            }
-
-            comparison['charging'] = {
-                'label': 'Charging',
-                'phone1': specs1.charging_speed or 'N/A',
-                'phone2': specs2.charging_speed or 'N/A',
-                'winner': None
-            }
-
-            comparison['wireless_charging'] = {
-                'label': 'Wireless Charging',
-                'phone1': '✓ Yes' if specs1.wireless_charging else '✗ No',
-                'phone2': '✓ Yes' if specs2.wireless_charging else '✗ No',
-                'winner': 1 if specs1.wireless_charging else 2 if specs2.wireless_charging else None
-            }
-
-            # Connectivity comparisons
-            comparison['5g'] = {
-                'label': '5G Support',
-                'phone1': '✓ Yes' if specs1.has_5g else '✗ No',
-                'phone2': '✓ Yes' if specs2.has_5g else '✗ No',
-                'winner': 1 if specs1.has_5g else 2 if specs2.has_5g else None
-            }
-
-            comparison['nfc'] = {
-                'label': 'NFC',
-                'phone1': '✓ Yes' if specs1.nfc else '✗ No',
-                'phone2': '✓ Yes' if specs2.nfc else '✗ No',
-                'winner': 1 if specs1.nfc else 2 if specs2.nfc else None
-            }
-
-            # Additional features
-            comparison['os'] = {
-                'label': 'Operating System',
-                'phone1': specs1.operating_system or 'N/A',
-                'phone2': specs2.operating_system or 'N/A',
-                'winner': None
-            }
-
-            comparison['fingerprint'] = {
-                'label': 'Fingerprint Sensor',
-                'phone1': '✓ Yes' if specs1.fingerprint_sensor else '✗ No',
-                'phone2': '✓ Yes' if specs2.fingerprint_sensor else '✗ No',
-                'winner': None
-            }
-
-            comparison['water_resistance'] = {
-                'label': 'Water Resistance',
-                'phone1': specs1.water_resistance or 'N/A',
-                'phone2': specs2.water_resistance or 'N/A',
-                'winner': None
-            }
-
-            comparison['weight'] = {
-                'label': 'Weight',
-                'phone1': f"{specs1.weight}g" if specs1.weight else 'N/A',
-                'phone2': f"{specs2.weight}g" if specs2.weight else 'N/A',
-                'winner': 1 if (specs1.weight or 999) < (specs2.weight or 999) else 2
-            }
-
-        return comparison
-
-    def _determine_winner(self, phone1, specs1, phone2, specs2):
-        """Determine overall winner based on multiple factors"""
-        phone1_score = 0
-        phone2_score = 0
-
-        # Price (lower is better)
-        if phone1.price < phone2.price:
-            phone1_score += 1
-        else:
-            phone2_score += 1
-
-        if specs1 and specs2:
-            # Screen size
-            if (specs1.screen_size or 0) > (specs2.screen_size or 0):
-                phone1_score += 1
-            elif (specs2.screen_size or 0) > (specs1.screen_size or 0):
-                phone2_score += 1
-
-            # Camera
-            if (specs1.rear_camera_main or 0) > (specs2.rear_camera_main or 0):
-                phone1_score += 1
-            elif (specs2.rear_camera_main or 0) > (specs1.rear_camera_main or 0):
-                phone2_score += 1
-
-            # Battery
-            if (specs1.battery_capacity or 0) > (specs2.battery_capacity or 0):
-                phone1_score += 1
-            elif (specs2.battery_capacity or 0) > (specs1.battery_capacity or 0):
-                phone2_score += 1
-
-            # 5G
-            if specs1.has_5g and not specs2.has_5g:
-                phone1_score += 1
-            elif specs2.has_5g and not specs1.has_5g:
-                phone2_score += 1
-
-            # Refresh rate
-            if (specs1.refresh_rate or 0) > (specs2.refresh_rate or 0):
-                phone1_score += 1
-            elif (specs2.refresh_rate or 0) > (specs1.refresh_rate or 0):
-                phone2_score += 1
-
-        if phone1_score > phone2_score:
-            return {'phone': 1, 'name': phone1.model_name, 'score': phone1_score}
-        elif phone2_score > phone1_score:
-            return {'phone': 2, 'name': phone2.model_name, 'score': phone2_score}
-        else:
-            return {'phone': None, 'name': 'Tie', 'score': phone1_score}
-
-    def _save_comparison(self, user_id, phone1_id, phone2_id):
+        warmed = 0
+        for pair in pairs:
+            if pair[0] != pair[1] and pair[0] in phones_by_id and pair[1] in phones_by_id:
+                self._comparison_table([phones_by_id[pair[0]], phones_by_id[pair[1]]])
+                warmed += 1
+
+        return warmed
+
+    def _save_comparison(self, user_id, phone_ids):
         """Save comparison to database"""
         comparison = Comparison(
             user_id=user_id,
-            phone1_id=phone1_id,
-            phone2_id=phone2_id
+            phone1_id=phone_ids[0],
+            phone2_id=phone_ids[1],
+            phone_ids=json.dumps(phone_ids)
         )
         db.session.add(comparison)
         db.session.commit()
@@ -279,12 +319,21 @@ class PhoneComparison:
             .limit(limit)\
             .all()
 
+        # Every compared phone in one query
+        phone_ids = {phone_id for comp in comparisons for phone_id in comp.get_phone_ids()}
+        phones_by_id = {phone.id: phone for phone in get_phones_by_ids(sorted(phone_ids))}
+
         results = []
         for comp in comparisons:
+            phones = [phones_by_id[phone_id] for phone_id in comp.get_phone_ids() if phone_id in phones_by_id]
+            if len(phones) < 2:
+                continue
+
             results.append({
                 'id': comp.id,
-                'phone1': comp.phone1,
-                'phone2': comp.phone2,
+                'phones': phones,
+                'phone1': phones[0],
+                'phone2': phones[1],
                 'created_at': comp.created_at,
                 'is_saved': comp.is_saved
             })
@@ -0,0 +1,202 @@
+"""
+Conversation Context Module
+Per-session chatbot memory of criteria and candidate phones, bounded by age, count and size
+"""
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from typing import Optional
+from app.modules.entities import ChatCriteria
+import threading
+import time
+import numpy as np
+
+# Rough fixed cost of one context besides its phone id arrays
+CONTEXT_OVERHEAD_BYTES = 1024
+
+# Intents whose reply lists phones, and so can be followed up
+PHONE_INTENTS = ('budget_query', 'recommendation', 'usage_type', 'brand_query')
+
+# Intents a bare follow-up such as "with 5G" or "under RM1500" is detected as
+FOLLOW_UP_INTENTS = ('general', 'specification', 'budget_query')
+
+
+@dataclass
+class ConversationContext:
+    """What a chat session has asked for so far"""
+
+    intent: str
+    criteria: ChatCriteria
+    phone_ids: tuple = ()
+    candidate_ids: Optional[np.ndarray] = None
+    version: Optional[int] = None
+    touched: float = field(default_factory=time.monotonic)
+
+    def size(self):
+        """Approximate memory held by the context, in bytes"""
+        candidates = 0 if self.candidate_ids is None else self.candidate_ids.nbytes
+        return CONTEXT_OVERHEAD_BYTES + candidates + 8 * len(self.phone_ids)
+
+
+def follow_up(context, intent, criteria):
+    """
+    Resolve a message against the context of the earlier turns
+
+    A message that only adds criteria ("with 5G", "under RM1500") continues
+    the earlier turn: new specifications make it a recommendation, a new
+    usage or brand switches to that listing, and a new budget alone reruns
+    the earlier intent. Phone intents inherit every criterion the message
+    does not replace.
+
+    Returns:
+        Tuple of (intent, criteria)
+    """
+    if context is None:
+        return intent, criteria
+
+    if intent in FOLLOW_UP_INTENTS and criteria.mentions_anything() and context.intent in PHONE_INTENTS:
+        if criteria.preferences().keys() - {'min_budget', 'max_budget'}:
+            intent = 'recommendation'
+        elif criteria.usage is not None:
+            intent = 'usage_type'
+        elif criteria.brand is not None:
+            intent = 'brand_query'
+        else:
+            intent = context.intent
+
+    if intent in PHONE_INTENTS:
+        criteria = criteria.merge(context.criteria)
+
+    return intent, criteria
+
+def candidate_phone_ids(snapshot, criteria, context=None):
+    """
+    IDs of the phones in a snapshot that meet every stated criterion
+
+    When the context holds candidates from the same catalog version and
+    the criteria only narrow its criteria, just those candidates are
+    filtered; otherwise the whole snapshot is.
+    """
+    if (context is not None and context.candidate_ids is not None and
+            context.version == snapshot.version and criteria.narrows(context.criteria)):
+        rows = snapshot.rows_of(context.candidate_ids)
+    else:
+        rows = np.arange(len(snapshot))
+
+    keep = np.ones(len(rows), dtype=bool)
+
+    if criteria.budget is not None:
+        price = snapshot.price[rows]
+        keep &= (criteria.min_budget <= price) & (price <= criteria.max_budget)
+
+    # NaN compares as False, so phones missing a specification drop out
+    for name, column in (('min_ram', 'max_ram'), ('min_storage', 'max_storage'),
+                         ('min_camera', 'camera_mp'), ('min_battery', 'battery')):
+        required = getattr(criteria, name)
+        if required is not None:
+            keep &= getattr(snapshot, column)[rows] >= required
+
+    if criteria.requires_5g:
+        keep &= snapshot.has_5g[rows]
+
+    return snapshot.phone_ids[rows[keep]]
+
+
+class ConversationStore:
+    """
+    Thread-safe in-process store of conversation contexts
+
+    Contexts are keyed by (user id, session id), since session ids come
+    from the client and two users may send the same one.
+
+    Contexts expire ttl seconds after their last use. Beyond maxsize
+    sessions or max_bytes of contexts, the least recently used are
+    evicted first.
+    """
+
+    def __init__(self, maxsize=10000, ttl=1800, max_bytes=32 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get the context of a key, or None if it has none or it expired"""
+        now = time.monotonic()
+
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None and now - context.touched > self.ttl:
+                self._remove(key)
+                context = None
+
+            if context is None:
+                self.misses += 1
+                return None
+
+            context.touched = now
+            self._contexts.move_to_end(key)
+            self.hits += 1
+            return context
+
+    def set(self, key, context):
+        """Store the context of a key, evicting expired and least recently used ones"""
+        now = time.monotonic()
+        context.touched = now
+
+        with self._lock:
+            if key in self._contexts:
+                self._remove(key)
+
+            self._contexts[key] = context
+            self.bytes += context.size()
+
+            # Oldest first, so expired contexts are all at the front
+            while self._contexts:
+                oldest_key, oldest = next(iter(self._contexts.items()))
+                expired = now - oldest.touched > self.ttl
+                if not (expired or len(self._contexts) > self.maxsize or self.bytes > self.max_bytes):
+                    break
+                if oldest_key == key:
+                    break
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Forget the context of a key"""
+        with self._lock:
+            if key in self._contexts:
+                self._remove(key)
+
+    def clear(self):
+        """Remove every context and reset the counters"""
+        with self._lock:
+            self._contexts.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Get the size, memory use, hit, miss and eviction counts of the store"""
+        return {
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _remove(self, key):
+        """Drop a context and its bytes; the lock must be held"""
+        self.bytes -= self._contexts.pop(key).size()
+
+    def __len__(self):
+        return len(self._contexts)
@@ -0,0 +1,224 @@
+"""
+Chatbot Entity Extraction
+Single-pass extraction of budget, specification, brand and usage criteria from a message
+"""
+from dataclasses import dataclass, fields
+from typing import Optional
+import re
+
+# Budget bounds assumed when a message only gives one side
+DEFAULT_MIN_BUDGET = 500
+DEFAULT_MAX_BUDGET = 10000
+
+# Bare numbers below this are model numbers ("iPhone 15"), not prices
+MIN_BARE_PRICE = 100
+
+# Unlabelled GB amounts up to this size are RAM, larger ones storage
+MAX_UNLABELLED_RAM_GB = 24
+
+BRAND_ALIASES = {
+    'samsung': 'Samsung',
+    'apple': 'Apple',
+    'iphone': 'Apple',
+    'iphones': 'Apple',
+    'xiaomi': 'Xiaomi',
+    'huawei': 'Huawei',
+    'nokia': 'Nokia',
+    'lenovo': 'Lenovo',
+    'honor': 'Honor',
+    'oppo': 'Oppo',
+    'realme': 'Realme',
+    'vivo': 'Vivo'
+}
+
+# Word prefixes per usage type, in priority order when several are mentioned
+USAGE_PREFIXES = (
+    ('Gaming', ('gam',)),
+    ('Photography', ('photo', 'camera')),
+    ('Business', ('business', 'work')),
+    ('Social Media', ('social',)),
+    ('Entertainment', ('entertainment', 'video', 'movie'))
+)
+
+UPPER_BOUND_WORDS = {'under', 'below', 'within', 'max', 'maximum', 'less', 'cheaper', 'upto', 'up'}
+LOWER_BOUND_WORDS = {'above', 'over', 'min', 'minimum', 'least', 'more', 'from', 'starting'}
+RANGE_WORDS = {'to', 'and'}
+RAM_WORDS = {'ram', 'memory'}
+STORAGE_WORDS = {'storage', 'rom', 'internal'}
+
+# One token per number (with its unit), word or dash
+_TOKEN_RE = re.compile(
+    r'(?P<number>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*'
+    r'(?P<unit>k|gb|tb|mp|mah|hz|g|w|inch|inches)?(?![a-z])'
+    r'|(?P<word>[a-z]+)'
+    r'|(?P<dash>-)'
+)
+
+
+@dataclass
+class ChatCriteria:
+    """Phone criteria found in a chatbot message"""
+
+    min_budget: Optional[int] = None
+    max_budget: Optional[int] = None
+    min_ram: Optional[int] = None
+    min_storage: Optional[int] = None
+    min_camera: Optional[int] = None
+    min_battery: Optional[int] = None
+    requires_5g: bool = False
+    brand: Optional[str] = None
+    usage: Optional[str] = None
+
+    # Fields that map onto UserPreference attributes
+    PREFERENCE_FIELDS = (
+        'min_budget', 'max_budget', 'min_ram', 'min_storage', 'min_camera', 'min_battery', 'requires_5g'
+    )
+
+    @property
+    def budget(self):
+        """(min, max) budget, or None if the message named no price"""
+        if self.max_budget is None:
+            return None
+        return (self.min_budget, self.max_budget)
+
+    def preferences(self):
+        """Preference values mentioned in the message, for AIRecommendationEngine"""
+        values = {}
+        for name in self.PREFERENCE_FIELDS:
+            value = getattr(self, name)
+            if value is not None and value is not False:
+                values[name] = value
+        return values
+
+    def __bool__(self):
+        return bool(self.preferences())
+
+    def mentions_anything(self):
+        """Whether the message named any criterion, brand or usage"""
+        return bool(self) or self.brand is not None or self.usage is not None
+
+    def merge(self, earlier):
+        """
+        Combine with the criteria of an earlier turn
+
+        Anything this message names wins, and everything else is carried
+        over. The budget is carried or replaced as a whole.
+        """
+        merged = ChatCriteria(**{
+            name: getattr(self, name) if getattr(self, name) not in (None, False) else getattr(earlier, name)
+            for name in (field.name for field in fields(self))
+        })
+        if self.budget is not None:
+            merged.min_budget, merged.max_budget = self.min_budget, self.max_budget
+        return merged
+
+    def narrows(self, earlier):
+        """Whether every phone matching these criteria also matches the earlier ones"""
+        if earlier.budget is not None:
+            if self.budget is None or self.min_budget < earlier.min_budget or self.max_budget > earlier.max_budget:
+                return False
+
+        for name in ('min_ram', 'min_storage', 'min_camera', 'min_battery'):
+            required = getattr(earlier, name)
+            if required is not None and (getattr(self, name) or 0) < required:
+                return False
+
+        return self.requires_5g or not earlier.requires_5g
+
+
+def extract_entities(message):
+    """
+    Extract every criterion from a message in one pass over its tokens
+
+    Budgets may be written as "RM2000", "RM2k", "2,000", "under 2000",
+    "above RM1500", or a range such as "between 1000 and 2000" or
+    "1k-2k". Bare numbers below MIN_BARE_PRICE are ignored as model
+    numbers.
+
+    Returns:
+        ChatCriteria
+    """
+    criteria = ChatCriteria()
+    tokens = [
+        (match.lastgroup if match.lastgroup != 'unit' else 'number', match)
+        for match in _TOKEN_RE.finditer(message.lower())
+    ]
+
+    amounts = []  # (amount, bound word before it, range word since the previous amount)
+    bound = None
+    ranged = False
+    money = False
+    usage_rank = None
+
+    for i, (kind, match) in enumerate(tokens):
+        if kind == 'word':
+            word = match.group('word')
+
+            if word == 'rm':
+                money = True
+            elif word in UPPER_BOUND_WORDS:
+                bound = 'max'
+            elif word in LOWER_BOUND_WORDS:
+                bound = 'min'
+            elif word == 'between' or (word in RANGE_WORDS and amounts):
+                ranged = True
+
+            if criteria.brand is None and word in BRAND_ALIASES:
+                criteria.brand = BRAND_ALIASES[word]
+
+            for rank, (usage, prefixes) in enumerate(USAGE_PREFIXES):
+                if (usage_rank is None or rank < usage_rank) and word.startswith(prefixes):
+                    criteria.usage, usage_rank = usage, rank
+                    break
+
+        elif kind == 'dash':
+            if amounts:
+                ranged = True
+
+        else:
+            value = float(match.group('number').replace(',', ''))
+            unit = match.group('unit')
+            next_word = _next_word(tokens, i)
+
+            if unit == 'g' and value == 5:
+                criteria.requires_5g = True
+            elif unit in ('gb', 'tb'):
+                gb = int(value * 1024 if unit == 'tb' else value)
+                if next_word in RAM_WORDS or (next_word not in STORAGE_WORDS and gb <= MAX_UNLABELLED_RAM_GB):
+                    criteria.min_ram = criteria.min_ram or gb
+                else:
+                    criteria.min_storage = criteria.min_storage or gb
+            elif unit == 'mp':
+                criteria.min_camera = criteria.min_camera or int(value)
+            elif unit == 'mah':
+                criteria.min_battery = criteria.min_battery or int(value)
+            elif unit == 'k' or (unit is None and (money or value >= MIN_BARE_PRICE)):
+                amount = int(value * 1000) if unit == 'k' else int(value)
+                amounts.append((amount, bound, ranged))
+                bound = None
+                ranged = False
+
+            money = False
+
+    _resolve_budget(criteria, amounts)
+    return criteria
+
+def _next_word(tokens, i):
+    """The word token right after position i, if any"""
+    if i + 1 < len(tokens) and tokens[i + 1][0] == 'word':
+        return tokens[i + 1][1].group('word')
+    return None
+
+def _resolve_budget(criteria, amounts):
+    """Turn the amounts found in a message into a budget range"""
+    if not amounts:
+        return
+
+    if len(amounts) >= 2 and amounts[1][2]:
+        low, high = sorted((amounts[0][0], amounts[1][0]))
+        criteria.min_budget, criteria.max_budget = low, high
+    elif amounts[0][1] == 'min':
+        criteria.min_budget, criteria.max_budget = amounts[0][0], DEFAULT_MAX_BUDGET
+    else:
+        # A single price, or an upper bound, is the most the user will spend
+        criteria.min_budget, criteria.max_budget = DEFAULT_MIN_BUDGET, amounts[0][0]
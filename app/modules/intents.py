@@ -0,0 +1,289 @@
+"""
+Intent Matcher
+Scores every chatbot intent from the keywords of a message, resolved once per distinct word
+"""
+import re
+import threading
+
+# Intent keywords as (keyword, weight). A trailing * matches any word
+# ending, so 'recommend*' also matches 'recommended'. Specific intents
+# weigh more than generic modifiers such as a price or "best", so
+# "best camera phone under RM2000" is a usage question with a budget
+# rather than a plain budget question. Ties go to the intent listed first.
+INTENT_KEYWORDS = {
+    'usage_type': [
+        ('gaming', 1.5), ('gamer*', 1.5), ('photograph*', 1.5), ('photo*', 1.5), ('camera*', 1.5),
+        ('business', 1.5), ('work', 1.5), ('social media', 1.5), ('entertainment', 1.5),
+        ('video*', 1.5), ('movie*', 1.5)
+    ],
+    'comparison': [
+        ('compar*', 2.0), ('vs', 2.0), ('versus', 2.0), ('difference', 1.5), ('better', 1.5)
+    ],
+    'brand_query': [
+        ('brand*', 1.0), ('samsung', 1.25), ('apple', 1.25), ('iphone*', 1.25), ('xiaomi', 1.25),
+        ('huawei', 1.25)
+    ],
+    'recommendation': [
+        ('recommend*', 1.5), ('suggest*', 1.5), ('looking for', 1.0), ('find', 0.75), ('need', 0.5),
+        ('want', 0.5), ('best', 0.5)
+    ],
+    'budget_query': [
+        ('budget*', 1.5), ('cheap*', 1.0), ('affordable', 1.0), ('expensive', 1.0), ('price*', 0.75),
+        ('cost*', 0.75), ('rm', 0.75), ('under', 0.25), ('below', 0.25)
+    ],
+    'specification': [
+        ('spec', 1.5), ('specs', 1.5), ('specification*', 1.5), ('battery', 0.75), ('ram', 0.75),
+        ('storage', 0.75), ('screen', 0.75)
+    ],
+    'help': [
+        ('what can you do', 2.0), ('how does', 2.0), ('how do i', 2.0), ('help', 1.5), ('how', 0.5)
+    ],
+    'greeting': [
+        ('hello', 0.5), ('hi', 0.5), ('hey', 0.5), ('good morning', 0.5), ('good afternoon', 0.5),
+        ('good evening', 0.5)
+    ]
+}
+
+DEFAULT_INTENT = 'general'
+
+# Extra score for each further keyword of an intent beyond its strongest one
+SUPPORT_WEIGHT = 0.1
+
+_LETTERS_RE = re.compile(r'[a-z]+')
+
+_NO_MATCH = ({}, DEFAULT_INTENT)
+
+# Result of a token set holding every word of a phrase, which only the text can confirm
+_CHECK_PHRASES = object()
+
+class IntentMatcher:
+    """
+    Keyword intent classifier working on the distinct tokens of a message
+
+    Keywords only match whole words: letters may not touch either side, so
+    'hi' does not match inside 'this', while 'rm' still matches the start
+    of 'rm2000'. An intent scores its strongest keyword plus
+    SUPPORT_WEIGHT for each other distinct keyword it matched.
+
+    Each whitespace-separated token is resolved to its keywords once, the
+    first time any message contains it, and the scores of each set of
+    keyword tokens are kept. A new message is then classified with a
+    split and a few set operations in C, whatever its wording around the
+    keywords. Only messages holding every word of a multi-word keyword
+    such as 'social media' are checked against a phrase regex. Up to
+    vocabulary_size tokens are remembered before starting over.
+
+    Results of the last cache_size distinct messages are also remembered,
+    since quick replies send the same few messages over and over.
+
+    One matcher is shared by every request. Lookups take no lock; the
+    memos are only written on a miss, under one lock. A lookup that races
+    a reset still gets a correct result, since a result depends only on
+    the tokens and never on what the memos held.
+    """
+
+    def __init__(self, intent_keywords=None, cache_size=1024, vocabulary_size=10000):
+        intent_keywords = intent_keywords or INTENT_KEYWORDS
+        self.cache_size = cache_size
+        self.vocabulary_size = vocabulary_size
+        self._message_results = {}
+        self._lock = threading.Lock()
+        self._result = self._cached_result if cache_size else self._message_result
+
+        self.intents = tuple(intent_keywords)
+        self._priority = {intent: i for i, intent in enumerate(self.intents)}
+
+        # keyword -> [(intent, weight)], since a keyword may serve several intents
+        self._words = {}
+        self._prefixes = {}
+        self._phrases = {}
+        for intent, keywords in intent_keywords.items():
+            for keyword, weight in keywords:
+                if keyword.endswith('*'):
+                    self._prefixes.setdefault(keyword[:-1], []).append((intent, weight))
+                elif ' ' in keyword:
+                    self._phrases.setdefault(keyword, []).append((intent, weight))
+                else:
+                    self._words.setdefault(keyword, []).append((intent, weight))
+
+        # Longest first, so 'photograph' wins over 'photo' and 'how does' over 'how'
+        self._prefix_order = sorted(self._prefixes, key=len, reverse=True)
+        self._any_prefix = tuple(self._prefix_order)
+        self._phrase_words = [frozenset(phrase.split()) for phrase in self._phrases]
+        self._phrase_vocabulary = frozenset().union(*self._phrase_words)
+        self._whole_words = frozenset(self._words) | self._phrase_vocabulary
+        self._phrase_keywords = frozenset(
+            word for word in self._phrase_vocabulary if self._keyword_matches(word) is not None
+        )
+        # Phrases, and the keywords inside them on their own, so one scan tells
+        # whether 'how' also appears outside 'how does'
+        self._phrase_pattern = re.compile(r'(?<![a-z])(?:' + '|'.join(
+            re.escape(keyword).replace(r'\ ', r'\s+')
+            for keyword in sorted([*self._phrases, *self._phrase_keywords], key=len, reverse=True)
+        ) + r')(?![a-z])')
+
+        self._significant = set()  # tokens holding a keyword or phrase word
+        self._insignificant = set()
+        self._token_words = {}  # significant token -> its keyword and phrase words
+        self._results = {}  # frozenset of significant tokens -> (scores, best intent)
+
+    def rank(self, message):
+        """
+        Score every intent for a message
+
+        Returns:
+            List of (intent, confidence) pairs, best first. Confidences
+            are each intent's share of the total score. A message that
+            matches no keyword gives [('general', 1.0)].
+        """
+        scores = self._result(message)[0]
+        if not scores:
+            return [(DEFAULT_INTENT, 1.0)]
+
+        total = sum(scores.values())
+        ranked = sorted(scores, key=lambda intent: (-scores[intent], self._priority[intent]))
+        return [(intent, round(scores[intent] / total, 4)) for intent in ranked]
+
+    def detect(self, message):
+        """Get the best intent for a message"""
+        return self._result(message)[1]
+
+    def _cached_result(self, message):
+        """_message_result behind the cache of recent messages"""
+        result = self._message_results.get(message)
+        if result is None:
+            result = self._message_result(message)
+
+            with self._lock:
+                if len(self._message_results) >= self.cache_size:
+                    self._message_results.clear()
+                self._message_results[message] = result
+
+        return result
+
+    def _message_result(self, message):
+        """(scores of every matched intent, best intent) of a message"""
+        text = message.lower()
+        key = frozenset(text.split()) - self._insignificant
+        if not key:
+            return _NO_MATCH
+
+        if not key <= self._significant:
+            with self._lock:
+                self._learn(key - self._significant)
+            key = key - self._insignificant
+
+        result = self._results.get(key)
+        if result is None:
+            with self._lock:
+                result = self._store(key, self._resolve(key) if key else _NO_MATCH)
+
+        if result is _CHECK_PHRASES:
+            phrase_key = (key, tuple(self._phrase_pattern.findall(text)))
+            result = self._results.get(phrase_key)
+            if result is None:
+                with self._lock:
+                    result = self._store(phrase_key, self._score_phrases(key, phrase_key[1]))
+
+        return result
+
+    def clear(self):
+        """Forget every remembered token, token set and message"""
+        with self._lock:
+            self._significant.clear()
+            self._insignificant.clear()
+            self._token_words.clear()
+            self._results.clear()
+            self._message_results.clear()
+
+    def _store(self, key, result):
+        """Keep the result of a token set, starting over when full; the lock must be held"""
+        if len(self._results) >= self.vocabulary_size:
+            self._results.clear()
+        self._results[key] = result
+        return result
+
+    def _learn(self, tokens):
+        """Sort tokens not seen before into significant and insignificant ones; the lock must be held"""
+        if len(self._significant) + len(self._insignificant) >= self.vocabulary_size:
+            self._significant.clear()
+            self._insignificant.clear()
+            self._token_words.clear()
+            self._results.clear()
+
+        whole_words = self._whole_words
+        for token in tokens:
+            # Most new tokens are a plain word that is no keyword, known without a regex
+            if token.isalpha() and token.isascii() and token not in whole_words and not token.startswith(self._any_prefix):
+                self._insignificant.add(token)
+            elif self._words_in(token):
+                self._significant.add(token)
+            else:
+                self._insignificant.add(token)
+
+    def _words_in(self, token):
+        """Keyword and phrase words in a token, by its letter runs"""
+        words = self._token_words.get(token)
+        if words is None:
+            words = frozenset(
+                word for word in _LETTERS_RE.findall(token)
+                if word in self._phrase_vocabulary or self._keyword_matches(word) is not None
+            )
+            if words:
+                self._token_words[token] = words
+        return words
+
+    def _words_of(self, tokens):
+        return set().union(*(self._words_in(token) for token in tokens))
+
+    def _keyword_matches(self, word):
+        """(intent, weight) pairs of a word, by exact keyword or longest prefix, or None"""
+        matches = self._words.get(word)
+        if matches is None and word.startswith(self._any_prefix):
+            for prefix in self._prefix_order:
+                if word.startswith(prefix):
+                    return self._prefixes[prefix]
+        return matches
+
+    def _score_phrases(self, tokens, found):
+        """Score a token set with the phrases and phrase keywords found in its text"""
+        found = [' '.join(match.split()) for match in found]
+        phrases = [match for match in found if match in self._phrases]
+
+        # A phrase consumes its words, so 'how does' alone does not also count as 'how'
+        consumed = {word for phrase in phrases for word in phrase.split()} - set(found)
+        return self._score(self._words_of(tokens) - consumed, phrases)
+
+    def _resolve(self, tokens):
+        """Result of a set of significant tokens, or _CHECK_PHRASES if the text must be checked"""
+        words = self._words_of(tokens)
+        if any(phrase_words <= words for phrase_words in self._phrase_words):
+            return _CHECK_PHRASES
+        return self._score(words, ())
+
+    def _score(self, words, phrases):
+        """Score the keywords among words, with the phrases found in the text"""
+        hits = {}
+        for word in words:
+            matches = self._keyword_matches(word)
+            if matches is not None:
+                hits[word] = matches
+
+        for phrase in phrases:
+            hits[phrase] = self._phrases[phrase]
+
+        if not hits:
+            return _NO_MATCH
+
+        matched = {}  # intent -> (strongest weight, number of other keywords)
+        for matches in hits.values():
+            for intent, weight in matches:
+                entry = matched.get(intent)
+                if entry is None:
+                    matched[intent] = (weight, 0)
+                else:
+                    matched[intent] = (max(entry[0], weight), entry[1] + 1)
+
+        scores = {intent: strongest + SUPPORT_WEIGHT * others for intent, (strongest, others) in matched.items()}
+        best = min(scores, key=lambda intent: (-scores[intent], self._priority[intent]))
+        return scores, best
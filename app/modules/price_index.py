@@ -0,0 +1,88 @@
+"""
+Price Index Module
+Sorted in-memory price index for price-range lookups and per-tier price aggregates
+"""
+from flask import current_app
+from app.modules.catalog import get_catalog_snapshot
+import numpy as np
+
+def price_aggregates(prices):
+    """Count, min, max and median of an ascending price array"""
+    if len(prices) == 0:
+        return {'count': 0, 'min': 0, 'max': 0, 'median': 0}
+
+    return {
+        'count': int(len(prices)),
+        'min': float(prices[0]),
+        'max': float(prices[-1]),
+        'median': float(np.median(prices))
+    }
+
+
+class PriceIndex:
+    """
+    Active phones sorted by (price, phone id)
+
+    Range lookups are binary searches on the sorted prices. Price
+    aggregates for the whole catalog and every price tier of
+    Config.PRICE_RANGES are computed once when the index is built. A phone
+    belongs to the highest tier whose lower bound it reaches, as in
+    Phone.get_price_category. Per-brand counts and price ranges live in
+    catalog_stats.
+    """
+
+    def __init__(self, snapshot, price_ranges):
+        order = np.lexsort((snapshot.phone_ids, snapshot.price))
+
+        self.version = snapshot.version
+        self.prices = snapshot.price[order]
+        self.phone_ids = snapshot.phone_ids[order]
+
+        # Tier lower bounds, lowest first
+        tiers = sorted(price_ranges.items(), key=lambda item: item[1][0])
+        tier_bounds = np.array([bounds[0] for _, bounds in tiers], dtype=np.float64)
+        tier_of = np.maximum(np.searchsorted(tier_bounds, self.prices, side='right') - 1, 0)
+
+        self.overall = price_aggregates(self.prices)
+        self.tiers = {
+            name: price_aggregates(self.prices[tier_of == tier])
+            for tier, (name, _) in enumerate(tiers)
+        }
+
+    def __len__(self):
+        return len(self.prices)
+
+    def range_slice(self, min_price=None, max_price=None):
+        """Positions [start, end) of the phones priced within the inclusive range"""
+        start = 0 if min_price is None else int(np.searchsorted(self.prices, min_price, side='left'))
+        end = len(self.prices) if max_price is None else int(np.searchsorted(self.prices, max_price, side='right'))
+        return start, max(start, end)
+
+    def most_expensive_in_range(self, min_price, max_price, top_n):
+        """
+        IDs of the top N most expensive phones within the range
+
+        Phones with the same price are ordered by phone id.
+        """
+        start, end = self.range_slice(min_price, max_price)
+        if top_n <= 0 or start == end:
+            return self.phone_ids[:0]
+
+        # Widen the tail to every phone tied with the cheapest one kept
+        tail = max(start, end - top_n)
+        tail = max(start, int(np.searchsorted(self.prices, self.prices[tail], side='left')))
+
+        prices = self.prices[tail:end]
+        phone_ids = self.phone_ids[tail:end]
+        return phone_ids[np.lexsort((phone_ids, -prices))][:top_n]
+
+
+def get_price_index():
+    """Get the price index for the current catalog version"""
+    from app.modules.services import get_services
+
+    snapshot = get_catalog_snapshot()
+    return get_services().versioned(
+        'price_index', snapshot.version,
+        lambda: PriceIndex(snapshot, current_app.config['PRICE_RANGES'])
+    )
@@ -0,0 +1,139 @@
+"""
+Query Plan Checks
+Runs EXPLAIN QUERY PLAN for every listing query and reports full table scans
+"""
+from itertools import product
+from datetime import datetime
+from app import db
+from app.models import Phone, User, Recommendation
+from app.modules.catalog import PHONE_SORTS, phone_listing_query, phone_sort
+from app.utils.pagination import encode_cursor, keyset_order, keyset_query
+
+def listing_queries(brand_id, min_price, max_price):
+    """
+    Build every listing query variant used by the site
+
+    Args:
+        brand_id: Brand ID to filter by
+        min_price: Lower price bound
+        max_price: Upper price bound
+
+    Returns:
+        List of (name, query) tuples
+    """
+    queries = []
+    price_filters = {
+        'all prices': {},
+        'min price': {'min_price': min_price},
+        'price range': {'min_price': min_price, 'max_price': max_price}
+    }
+
+    # Browse and brand pages
+    for (price_name, prices), sort_by in product(price_filters.items(), PHONE_SORTS):
+        queries.append((
+            f"browse, {price_name}, sort {sort_by}",
+            phone_listing_query(sort_by=sort_by, **prices)
+        ))
+        queries.append((
+            f"browse by brand, {price_name}, sort {sort_by}",
+            phone_listing_query(brand_ids=[brand_id], sort_by=sort_by, **prices)
+        ))
+
+    # Cursor mode: every sort seeking past a previous page
+    cursor_values = {
+        'price_asc': [min_price, 1],
+        'price_desc': [max_price, 1],
+        'name': ['M', 1],
+        'created_at': [datetime.utcnow(), 1]
+    }
+    for sort_by, values in cursor_values.items():
+        cursor = encode_cursor(values)
+        queries.append((
+            f"browse next page, sort {sort_by}",
+            keyset_query(phone_listing_query(), phone_sort(sort_by), cursor)
+        ))
+        queries.append((
+            f"browse by brand next page, sort {sort_by}",
+            keyset_query(phone_listing_query(brand_ids=[brand_id]), phone_sort(sort_by), cursor)
+        ))
+
+    # /api/phones/filter, ordered and seeking as paginate_phone_listing does
+    spec_filters = {
+        'no specs': {},
+        'RAM': {'min_ram': 8},
+        'storage': {'min_storage': 256},
+        '5G': {'requires_5g': True},
+        'battery': {'min_battery': 5000},
+        'RAM and 5G': {'min_ram': 8, 'requires_5g': True}
+    }
+    for (spec_name, specs), sort_by in product(spec_filters.items(), PHONE_SORTS):
+        for page_name, cursor in (('', None), (' next page', encode_cursor(cursor_values[sort_by]))):
+            queries.append((
+                f"api filter{page_name}, {spec_name}, sort {sort_by}",
+                keyset_query(phone_listing_query(**specs), phone_sort(sort_by), cursor)
+            ))
+            queries.append((
+                f"api filter by brands, price range{page_name}, {spec_name}, sort {sort_by}",
+                keyset_query(
+                    phone_listing_query(brand_ids=[brand_id, brand_id + 1],
+                                        min_price=min_price, max_price=max_price, **specs),
+                    phone_sort(sort_by), cursor
+                )
+            ))
+
+    # Admin phone list
+    queries.append(("admin phones", phone_listing_query(sort_by='created_at', active_only=False)))
+    queries.append((
+        "admin phones by brand",
+        phone_listing_query(brand_ids=[brand_id], sort_by='created_at', active_only=False)
+    ))
+
+    # Admin user list and activity log, first and next page
+    cursor = encode_cursor([datetime.utcnow(), 1])
+    for name, model in (('admin users', User), ('admin logs', Recommendation)):
+        order = keyset_order(model.created_at, model.id, descending=True)
+        queries.append((name, keyset_query(model.query, order)))
+        queries.append((f"{name} next page", keyset_query(model.query, order, cursor)))
+
+    return queries
+
+def explain_query_plan(query):
+    """Get the EXPLAIN QUERY PLAN detail lines for a query"""
+    statement = query.limit(12).statement.compile(
+        dialect=db.engine.dialect,
+        compile_kwargs={'literal_binds': True}
+    )
+    rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+    return [row[-1] for row in rows]
+
+def is_full_scan(detail):
+    """Check whether a plan line reads a whole table without an index"""
+    return detail.startswith('SCAN ') and ' USING ' not in detail
+
+def check_listing_query_plans():
+    """
+    Explain every listing query against the current database
+
+    Sample filter values are taken from the catalog itself so the planner
+    sees realistic data.
+
+    Returns:
+        List of dictionaries with name, plan and full_scans
+    """
+    brand_id = db.session.query(Phone.brand_id).filter(Phone.is_active == True).limit(1).scalar() or 1
+    prices = sorted(price for price, in db.session.query(Phone.price).filter(Phone.is_active == True))
+    if prices:
+        min_price, max_price = prices[len(prices) // 4], prices[len(prices) * 3 // 4]
+    else:
+        min_price, max_price = 1000, 3000
+
+    results = []
+    for name, query in listing_queries(brand_id, min_price, max_price):
+        plan = explain_query_plan(query)
+        results.append({
+            'name': name,
+            'plan': plan,
+            'full_scans': [detail for detail in plan if is_full_scan(detail)]
+        })
+
+    return results
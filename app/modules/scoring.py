@@ -0,0 +1,140 @@
+"""
+Vectorized Match Scoring
+Batched NumPy version of calculate_match_score over the catalog snapshot
+"""
+import numpy as np
+
+# Preference fields used by the match score
+PREFERENCE_FIELDS = (
+    'min_budget',
+    'max_budget',
+    'min_ram',
+    'min_storage',
+    'min_camera',
+    'min_battery',
+    'requires_5g',
+    'min_screen_size',
+    'max_screen_size'
+)
+
+def preference_vector(user_prefs):
+    """Extract the scoring fields of a preference object into a dictionary"""
+    return {field: getattr(user_prefs, field) for field in PREFERENCE_FIELDS}
+
+def preference_matrix(prefs_list):
+    """
+    Stack several preference objects into column arrays
+
+    Each field becomes an (m, 1) array, so calculate_match_scores
+    broadcasts it against the catalog and returns an (m, n) score matrix.
+    """
+    return {
+        field: np.array([getattr(prefs, field) for prefs in prefs_list]).reshape(-1, 1)
+        for field in PREFERENCE_FIELDS
+    }
+
+def calculate_match_scores(snapshot, prefs):
+    """
+    Calculate the match percentage of every phone in a catalog snapshot
+
+    Uses the same weights as calculate_match_score: budget 30, RAM 10,
+    storage 10, camera 15, battery 15, 5G 10 and screen size 10. Phones
+    without specifications are scored on budget alone.
+
+    Args:
+        snapshot: CatalogSnapshot to score
+        prefs: Dictionary from preference_vector or preference_matrix
+
+    Returns:
+        Array of match percentages (0-100) aligned with snapshot.phone_ids,
+        with one row per preference set when given a preference_matrix
+    """
+    price = snapshot.price
+    min_budget = prefs['min_budget']
+    max_budget = prefs['max_budget']
+
+    # Budget match (weight: 30)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        penalty = np.minimum(30, ((price - max_budget) / max_budget) * 30)
+    over_budget_score = np.maximum(0, 30 - penalty)
+
+    score = np.where(
+        (min_budget <= price) & (price <= max_budget),
+        30.0,
+        np.where(price < min_budget, 20.0, over_budget_score)
+    )
+
+    # Specification matches, added in the same order as calculate_match_score.
+    # NaN compares as False, so missing specifications earn no points.
+    camera = snapshot.camera_mp
+    battery = snapshot.battery
+    screen_size = snapshot.screen_size
+
+    spec_points = (
+        (snapshot.max_ram >= prefs['min_ram']) * 10,
+        (snapshot.max_storage >= prefs['min_storage']) * 10,
+        ((camera > 0) & (camera >= prefs['min_camera'])) * 15,
+        ((battery > 0) & (battery >= prefs['min_battery'])) * 15,
+        (snapshot.has_5g | np.logical_not(prefs['requires_5g'])) * 10,
+        ((screen_size > 0) &
+         (prefs['min_screen_size'] <= screen_size) &
+         (screen_size <= prefs['max_screen_size'])) * 10
+    )
+
+    has_specs = snapshot.has_specs
+    for points in spec_points:
+        score = score + np.where(has_specs, points, 0)
+
+    max_score = np.where(has_specs, 100.0, 30.0)
+
+    return _round_percentages((score / max_score) * 100)
+
+def _round_percentages(values):
+    """
+    Round to 2 decimals exactly like Python's round()
+
+    np.round scales by 100 before rounding, which can land on the other
+    side of a half-cent than round() does, so values close to a half-cent
+    are re-rounded individually.
+    """
+    rounded = np.round(values, 2)
+
+    scaled = values * 100
+    near_half = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    for index in zip(*np.nonzero(near_half)):
+        rounded[index] = round(float(values[index]), 2)
+
+    return rounded
+
+def top_n_indices(scores, top_n, min_score=None):
+    """
+    Get the positions of the top N scores, best first
+
+    Uses argpartition to find the cut-off instead of sorting the whole
+    catalog. Ties keep catalog order, like a stable sort would.
+
+    Args:
+        scores: Array of scores
+        top_n: Number of positions to return
+        min_score: Optional minimum score to be included
+
+    Returns:
+        Array of positions into scores
+    """
+    if min_score is None:
+        candidates = np.arange(len(scores))
+    else:
+        candidates = np.flatnonzero(scores >= min_score)
+
+    if top_n <= 0:
+        return candidates[:0]
+
+    if len(candidates) > top_n:
+        candidate_scores = scores[candidates]
+        best = np.argpartition(-candidate_scores, top_n - 1)[:top_n]
+        cutoff = candidate_scores[best].min()
+        # Keep every tie at the cut-off so the final order is deterministic
+        candidates = candidates[candidate_scores >= cutoff]
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:top_n]
@@ -0,0 +1,341 @@
+"""
+Phone Search Module
+Full-text phone search over model name, brand, processor and operating system
+"""
+from app import db
+from app.models import Phone, PhoneSpecification, Brand
+from app.modules.catalog import get_catalog_changes, get_catalog_version
+from bisect import bisect_left, insort
+import math
+import re
+import sqlite3
+import threading
+
+# Searchable fields and their ranking weights
+SEARCH_FIELDS = ('model_name', 'brand', 'processor', 'operating_system')
+FIELD_WEIGHTS = (4.0, 3.0, 1.5, 1.0)
+
+# BM25 parameters, fixed by the FTS5 bm25() function
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Same terms as the FTS5 unicode61 tokenizer for ASCII text
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric search terms"""
+    return _TOKEN_RE.findall((text or '').lower())
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between two terms, stopping early past max_distance
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return previous[-1]
+
+def fts5_available():
+    """Check whether the sqlite3 module was built with FTS5"""
+    try:
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+        connection.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class PhoneSearchIndex:
+    """
+    In-process search index over the active catalog
+
+    Matching and ranking run on an in-memory SQLite FTS5 table (BM25 with
+    field weights) when the sqlite3 module supports it, and on a pure-Python
+    inverted index otherwise. The FTS5 table lives in its own in-memory
+    database, so it works with any main database. The inverted index
+    computes the same BM25 as FTS5, so both modes return the same phones
+    in the same order.
+
+    Both modes share a term vocabulary used for prefix expansion and typo
+    correction. The index follows catalog changes and re-indexes only the
+    phones that changed. Those changes are tracked per process, so catalog
+    writes made in another worker process are not seen until it restarts.
+    """
+
+    def __init__(self, use_fts5=None):
+        self.version = None
+        self._lock = threading.Lock()
+
+        self._documents = {}  # phone id -> tuple of token lists per field
+        self._lengths = {}  # phone id -> number of tokens over all fields
+        self._total_length = 0
+        self._model_lengths = {}  # phone id -> model name length, for tie-breaking
+        self._postings = {}  # term -> {phone id: occurrences weighted by field}
+        self._terms = []  # sorted vocabulary for prefix lookups
+        self._trigrams = {}  # trigram -> terms containing it, for typo lookups
+
+        if use_fts5 is None:
+            use_fts5 = fts5_available()
+
+        self._fts = None
+        if use_fts5:
+            self._fts = sqlite3.connect(':memory:', check_same_thread=False)
+            self._fts.execute(
+                f"CREATE VIRTUAL TABLE phone_search USING fts5({', '.join(SEARCH_FIELDS)}, "
+                f"tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')"
+            )
+
+    @property
+    def backend(self):
+        """Name of the matching backend in use"""
+        return 'fts5' if self._fts else 'memory'
+
+    def __len__(self):
+        return len(self._documents)
+
+    def search(self, query, limit=10):
+        """
+        Search active phones
+
+        Every query term must match a field, either exactly, as a prefix
+        of an indexed term, or within one or two typos.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results, or None for all
+
+        Returns:
+            List of phone IDs, best match first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            self._sync()
+
+            expansions = [self._expand(token) for token in tokens]
+            if not all(phrases for _, phrases in expansions):
+                return []
+
+            if self._fts:
+                return self._search_fts(tokens, expansions, limit)
+            return self._search_memory(expansions, limit)
+
+    def _expand(self, token):
+        """
+        Get the phrases a query token matches, the way FTS5 matches them
+
+        Returns:
+            Tuple of (prefix, phrases). With prefix, the token is matched as
+            typed or as the start of a term, in one phrase of every such
+            term. Otherwise each typo correction is a phrase of its own.
+            Phrases are tuples of terms, and empty when nothing matches.
+        """
+        start = bisect_left(self._terms, token)
+        terms = []
+        for term in self._terms[start:]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+
+        if terms:
+            return True, [tuple(terms)]
+
+        # Only look for typos when the token matches nothing as typed
+        corrections = []
+        if len(token) >= 4:
+            max_distance = 1 if len(token) < 8 else 2
+            for term in self._typo_candidates(token):
+                if edit_distance(token, term, max_distance) <= max_distance:
+                    corrections.append(term)
+                elif term.startswith(token[:-1]) and len(term) > len(token):
+                    # Typo in the last character of a partly typed word
+                    corrections.append(term)
+
+        return False, [(term,) for term in sorted(corrections)]
+
+    def _typo_candidates(self, token):
+        """Vocabulary terms sharing at least a third of the token's trigrams"""
+        grams = _trigrams(token)
+        counts = {}
+        for gram in grams:
+            for term in self._trigrams.get(gram, ()):
+                counts[term] = counts.get(term, 0) + 1
+
+        needed = max(1, len(grams) // 3)
+        return [term for term, count in counts.items() if count >= needed]
+
+    def _search_fts(self, tokens, expansions, limit):
+        """Match and rank with FTS5 BM25"""
+        groups = []
+        for token, (prefix, phrases) in zip(tokens, expansions):
+            if prefix:
+                groups.append(f'"{token}"*')
+            else:
+                # Typo corrections, matched as typed
+                groups.append('(' + ' OR '.join(f'"{term}"' for term, in phrases) + ')')
+
+        sql = (
+            f"SELECT rowid FROM phone_search WHERE phone_search MATCH ? "
+            f"ORDER BY bm25(phone_search, {', '.join(map(str, FIELD_WEIGHTS))}), length(model_name), rowid"
+        )
+        params = [' AND '.join(groups)]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        return [row[0] for row in self._fts.execute(sql, params)]
+
+    def _search_memory(self, expansions, limit):
+        """Match and rank with the inverted index, scoring as FTS5 bm25() does"""
+        candidates = None
+        for _, phrases in expansions:
+            matched = set()
+            for phrase in phrases:
+                for term in phrase:
+                    matched.update(self._postings[term])
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        total = len(self._documents)
+        average_length = self._total_length / total
+
+        # FTS5 counts every phrase of the query, including each typo correction
+        phrases = []
+        for _, token_phrases in expansions:
+            for phrase in token_phrases:
+                postings = [self._postings[term] for term in phrase]
+                hits = len(set().union(*postings))
+                idf = math.log((total - hits + 0.5) / (hits + 0.5))
+                phrases.append((postings, idf if idf > 0.0 else 1e-6))
+
+        scores = {}
+        for phone_id in candidates:
+            length = self._lengths[phone_id]
+            score = 0.0
+            for postings, idf in phrases:
+                frequency = 0.0
+                for term_postings in postings:
+                    frequency += term_postings.get(phone_id, 0.0)
+                score += idf * (
+                    (frequency * (BM25_K1 + 1.0)) /
+                    (frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+                )
+            scores[phone_id] = score
+
+        ranked = sorted(scores, key=lambda phone_id: (
+            -scores[phone_id], self._model_lengths[phone_id], phone_id
+        ))
+        return ranked if limit is None else ranked[:limit]
+
+    def _sync(self):
+        """Bring the index up to date with the catalog"""
+        version = get_catalog_version()
+        if version == self.version:
+            return
+
+        changed = None if self.version is None else get_catalog_changes(self.version)
+
+        if changed is None:
+            for phone_id in list(self._documents):
+                self._remove(phone_id)
+            self._add_rows(_document_query().all())
+        else:
+            for phone_id in changed:
+                self._remove(phone_id)
+            self._add_rows(_document_query().filter(Phone.id.in_(changed)).all())
+
+        self.version = version
+
+    def _add_rows(self, rows):
+        for row in rows:
+            fields = (row.model_name, row.brand, row.processor, row.operating_system)
+            self._documents[row.id] = tuple(tokenize(value) for value in fields)
+            self._lengths[row.id] = sum(len(tokens) for tokens in self._documents[row.id])
+            self._total_length += self._lengths[row.id]
+            self._model_lengths[row.id] = len(row.model_name or '')
+
+            term_weights = {}
+            for weight, tokens in zip(FIELD_WEIGHTS, self._documents[row.id]):
+                for token in tokens:
+                    term_weights[token] = term_weights.get(token, 0.0) + weight
+
+            for term, weight in term_weights.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    insort(self._terms, term)
+                    for gram in _trigrams(term):
+                        self._trigrams.setdefault(gram, set()).add(term)
+                postings[row.id] = weight
+
+            if self._fts:
+                self._fts.execute(
+                    f"INSERT INTO phone_search (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                    (row.id, *(value or '' for value in fields))
+                )
+
+    def _remove(self, phone_id):
+        fields = self._documents.pop(phone_id, None)
+        if fields is None:
+            return
+
+        self._total_length -= self._lengths.pop(phone_id)
+        self._model_lengths.pop(phone_id, None)
+
+        for term in {token for tokens in fields for token in tokens}:
+            postings = self._postings[term]
+            postings.pop(phone_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+                for gram in _trigrams(term):
+                    self._trigrams[gram].discard(term)
+
+        if self._fts:
+            self._fts.execute("DELETE FROM phone_search WHERE rowid = ?", (phone_id,))
+
+
+def _trigrams(term):
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _document_query():
+    """Searchable fields of every active phone"""
+    return db.session.query(
+        Phone.id,
+        Phone.model_name,
+        Brand.name.label('brand'),
+        PhoneSpecification.processor,
+        PhoneSpecification.operating_system
+    ).join(Brand, Brand.id == Phone.brand_id)\
+     .outerjoin(PhoneSpecification, PhoneSpecification.phone_id == Phone.id)\
+     .filter(Phone.is_active == True)
+
+def get_search_index():
+    """Get the phone search index of the current application"""
+    from app.modules.services import get_services
+    return get_services().search_index
+
+def search_phones(query, limit=10):
+    """Search active phones, returning phone IDs best match first"""
+    return get_search_index().search(query, limit=limit)
@@ -0,0 +1,94 @@
+"""
+Application Services
+App-scoped engines, indexes and caches, created once in create_app
+"""
+from flask import current_app
+from app.modules.ai_engine import AIRecommendationEngine
+from app.modules.chatbot import ChatbotEngine
+from app.modules.comparison import PhoneComparison
+from app.modules.conversation import ConversationStore
+from app.modules.search import PhoneSearchIndex
+from app.modules.usage_rankings import UsageRankings
+from app.utils.cache import LRUCache, create_cache
+import threading
+
+EXTENSION_KEY = 'dialsmart'
+
+class DialSmartServices:
+    """
+    Long-lived services shared by every request of one application
+
+    The engines hold no per-request state, and the indexes and caches
+    guard their own state with locks, so one instance of each is safe to
+    share between threads. Values derived from a catalog version are kept
+    through versioned() and rebuilt once the catalog moves on.
+    """
+
+    def __init__(self, app):
+        config = app.config
+
+        self.recommendation_cache = create_cache(
+            config['RECOMMENDATION_CACHE_BACKEND'],
+            maxsize=config['RECOMMENDATION_CACHE_SIZE'],
+            redis_url=config['RECOMMENDATION_CACHE_REDIS_URL'],
+            namespace='dialsmart:recommendations'
+        )
+        self.search_index = PhoneSearchIndex()
+        self.usage_rankings = UsageRankings()
+        self.conversation_contexts = ConversationStore(
+            maxsize=config['CHAT_CONTEXT_MAX_SESSIONS'],
+            ttl=config['CHAT_CONTEXT_TTL'],
+            max_bytes=config['CHAT_CONTEXT_MAX_BYTES']
+        )
+
+        self.recommendation_engine = AIRecommendationEngine()
+        self.chatbot = ChatbotEngine(self.recommendation_engine, self.conversation_contexts)
+        self.comparison_cache = LRUCache(maxsize=config['COMPARISON_CACHE_SIZE'])
+        self.comparison_engine = PhoneComparison(cache=self.comparison_cache)
+
+        self._versioned = {}
+        self._lock = threading.Lock()
+
+    def versioned(self, name, version, build):
+        """
+        Get a value built for a catalog version, rebuilding it when the version moved
+
+        Args:
+            name: Name the value is kept under
+            version: Version the caller needs
+            build: Function returning a fresh value with a matching version attribute
+        """
+        value = self._versioned.get(name)
+        if value is not None and value.version == version:
+            return value
+
+        with self._lock:
+            value = self._versioned.get(name)
+            if value is None or value.version != version:
+                value = self._versioned[name] = build()
+            return value
+
+    def discard(self, name):
+        """Drop a versioned value so the next read rebuilds it"""
+        with self._lock:
+            self._versioned.pop(name, None)
+
+def init_services(app):
+    """Create the services of an application"""
+    app.extensions[EXTENSION_KEY] = DialSmartServices(app)
+
+def get_services():
+    """Get the services of the current application"""
+    return current_app.extensions[EXTENSION_KEY]
+
+def get_recommendation_engine():
+    """Get the shared recommendation engine"""
+    return get_services().recommendation_engine
+
+def get_chatbot():
+    """Get the shared chatbot engine"""
+    return get_services().chatbot
+
+def get_comparison_engine():
+    """Get the shared comparison engine"""
+    return get_services().comparison_engine
@@ -0,0 +1,179 @@
+"""
+Phone Similarity Index
+Precomputed k-nearest-neighbour "similar phones" over normalized spec vectors
+"""
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models import PhoneSimilarity
+from app.modules.catalog import get_catalog_snapshot
+from app.modules.catalog_import import PROCESSOR_BRANDS
+import numpy as np
+
+# Spec features as (snapshot column, transform, weight, value used when missing).
+# Scaling is fixed rather than fitted to the catalog, so adding or editing a
+# phone never moves the vectors of the others.
+SPEC_FEATURES = (
+    ('price', np.log2, 1.5, 1000.0),  # Doubling the price = 1.5
+    ('max_ram', np.log2, 0.75, 4.0),  # 8GB -> 16GB = 0.75
+    ('max_storage', np.log2, 0.5, 64.0),  # 128GB -> 256GB = 0.5
+    ('camera_mp', np.log2, 0.5, 12.0),  # 50MP -> 100MP = 0.5
+    ('battery', lambda mah: mah / 1000, 0.5, 4000.0),  # 1000mAh = 0.5
+    ('screen_size', lambda inches: inches, 1.0, 6.5),  # 1 inch = 1.0
+    ('refresh_rate', lambda hz: hz / 60, 0.5, 60.0),  # 60Hz -> 120Hz = 0.5
+)
+HAS_5G_WEIGHT = 0.75
+CHIPSET_WEIGHT = 0.5  # Different chipset brands = sqrt(2 * 0.5^2)
+
+CHIPSET_BRANDS = tuple(sorted({brand for _, brand in PROCESSOR_BRANDS}))
+
+def spec_vectors(snapshot):
+    """
+    Embed every phone of a catalog snapshot as a weighted spec vector
+
+    Returns:
+        (n, d) array aligned with snapshot.phone_ids
+    """
+    columns = []
+    for name, transform, weight, missing in SPEC_FEATURES:
+        values = getattr(snapshot, name)
+        values = np.where(np.isnan(values) | (values <= 0), missing, values)
+        columns.append(transform(values) * weight)
+
+    columns.append(snapshot.has_5g.astype(np.float64) * HAS_5G_WEIGHT)
+
+    for brand in CHIPSET_BRANDS:
+        columns.append((snapshot.processor_brand == brand).astype(np.float64) * CHIPSET_WEIGHT)
+
+    return np.column_stack(columns)
+
+def squared_distances(vectors, rows):
+    """Squared distances from the given rows to every vector, as a (len(rows), n) array"""
+    # |a - b|^2 = |a|^2 + |b|^2 - 2ab, without materializing the differences
+    squared_norms = np.einsum('ij,ij->i', vectors, vectors)
+    distances = squared_norms[rows, None] + squared_norms[None, :] - 2 * vectors[rows] @ vectors.T
+    return np.maximum(distances, 0, out=distances)
+
+def nearest_neighbours(vectors, rows, k):
+    """
+    Find the k nearest phones for the given rows in one vectorized pass
+
+    Args:
+        vectors: (n, d) spec vectors of the whole catalog
+        rows: Row positions to find neighbours for
+        k: Number of neighbours per row
+
+    Returns:
+        Tuple of (neighbour positions, distances), both (len(rows), k),
+        closest first
+    """
+    k = min(k, len(vectors) - 1)
+    if k <= 0 or len(rows) == 0:
+        return np.empty((len(rows), 0), dtype=np.int64), np.empty((len(rows), 0))
+
+    distances = squared_distances(vectors, rows)
+    distances[np.arange(len(rows)), rows] = np.inf  # A phone is not its own neighbour
+
+    # Closest first; the stable sort breaks ties by catalog position, so an
+    # incremental update picks the same neighbours as a full rebuild
+    nearest = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+
+    return nearest, np.sqrt(nearest_distances)
+
+def rebuild_similarity_index():
+    """
+    Recompute the neighbours of every active phone
+
+    Returns:
+        Number of phones indexed
+    """
+    snapshot = get_catalog_snapshot()
+
+    db.session.query(PhoneSimilarity).delete(synchronize_session=False)
+    _write_neighbours(snapshot, spec_vectors(snapshot), np.arange(len(snapshot)))
+    db.session.commit()
+
+    return len(snapshot)
+
+def update_similarity_index(phone_ids):
+    """
+    Update the index after the given phones changed
+
+    Besides the changed phones themselves, only phones that listed one of
+    them as a neighbour, or that are now closer to one of them than to
+    their current k-th neighbour, are recomputed.
+
+    Returns:
+        Number of phones whose neighbours were recomputed
+    """
+    snapshot = get_catalog_snapshot()
+    vectors = spec_vectors(snapshot)
+    k = current_app.config['SIMILAR_PHONES_K']
+
+    changed = {int(phone_id) for phone_id in phone_ids}
+    if len(changed) * 4 > len(snapshot):
+        return rebuild_similarity_index()
+
+    affected = set(changed)
+
+    # Current neighbour lists: phone id -> (neighbour ids, k-th distance)
+    current = {}
+    for row in db.session.query(PhoneSimilarity.phone_id, PhoneSimilarity.similar_phone_id,
+                                PhoneSimilarity.distance):
+        neighbours, kth_distance = current.get(row.phone_id, ((), 0.0))
+        current[row.phone_id] = (neighbours + (row.similar_phone_id,), max(kth_distance, row.distance))
+
+    for phone_id, (neighbours, _) in current.items():
+        if changed.intersection(neighbours):
+            affected.add(phone_id)
+
+    changed_rows = [snapshot.position(phone_id) for phone_id in changed]
+    changed_rows = np.array([row for row in changed_rows if row is not None], dtype=np.int64)
+    if len(changed_rows):
+        closest_changed = np.sqrt(squared_distances(vectors, changed_rows).min(axis=0))
+
+        for position, phone_id in enumerate(snapshot.phone_ids.tolist()):
+            neighbours, kth_distance = current.get(phone_id, ((), np.inf))
+            if len(neighbours) < k or closest_changed[position] < kth_distance:
+                affected.add(phone_id)
+
+    db.session.query(PhoneSimilarity)\
+        .filter(PhoneSimilarity.phone_id.in_(affected))\
+        .delete(synchronize_session=False)
+
+    rows = [snapshot.position(phone_id) for phone_id in affected]
+    rows = np.array(sorted(row for row in rows if row is not None), dtype=np.int64)
+    _write_neighbours(snapshot, vectors, rows)
+    db.session.commit()
+
+    return len(rows)
+
+def _write_neighbours(snapshot, vectors, rows):
+    """Insert the neighbour rows of the given snapshot positions"""
+    nearest, distances = nearest_neighbours(vectors, rows, current_app.config['SIMILAR_PHONES_K'])
+    phone_ids = snapshot.phone_ids
+
+    records = [
+        {
+            'phone_id': int(phone_ids[row]),
+            'similar_phone_id': int(phone_ids[neighbour]),
+            'rank': rank,
+            'distance': float(distance)
+        }
+        for row, row_neighbours, row_distances in zip(rows, nearest, distances)
+        for rank, (neighbour, distance) in enumerate(zip(row_neighbours, row_distances), 1)
+    ]
+
+    if records:
+        db.session.execute(insert(PhoneSimilarity), records)
+
+def get_similar_phone_ids(phone_id, top_n=3):
+    """Get the IDs of the phones most similar to a phone, closest first"""
+    rows = db.session.query(PhoneSimilarity.similar_phone_id)\
+        .filter(PhoneSimilarity.phone_id == phone_id)\
+        .order_by(PhoneSimilarity.rank)\
+        .limit(top_n)\
+        .all()
+
+    return [row.similar_phone_id for row in rows]
@@ -0,0 +1,127 @@
+"""
+Usage Rankings Module
+Precomputed per-usage phone rankings with price-sorted budget lookups
+"""
+from app.modules.catalog import get_catalog_snapshot
+import threading
+import numpy as np
+
+USAGE_TYPES = ('Gaming', 'Photography', 'Business', 'Entertainment', 'Social Media')
+
+# Other names for a usage type; anything unknown is ranked as general use
+USAGE_ALIASES = {'Work': 'Business'}
+
+def canonical_usage_type(usage_type):
+    """Map a usage type to the name its ranking is stored under"""
+    usage_type = USAGE_ALIASES.get(usage_type, usage_type)
+    return usage_type if usage_type in USAGE_TYPES else 'Social Media'
+
+def usage_scores(usage_type, snapshot, rows):
+    """Score the given snapshot rows for a usage type"""
+    ram = np.nan_to_num(snapshot.max_ram[rows])
+    rear_camera = np.nan_to_num(snapshot.camera_mp[rows])
+    front_camera = np.nan_to_num(snapshot.front_camera_mp[rows])
+    battery = np.nan_to_num(snapshot.battery[rows])
+    screen_size = np.nan_to_num(snapshot.screen_size[rows])
+    refresh_rate = np.nan_to_num(snapshot.refresh_rate[rows])
+
+    usage_type = canonical_usage_type(usage_type)
+
+    if usage_type == 'Gaming':
+        # High RAM, good processor, high refresh rate
+        return ram * 10 + np.where(refresh_rate > 0, refresh_rate, 60) / 10 + battery / 100
+
+    elif usage_type == 'Photography':
+        # High camera MP, good front camera
+        return rear_camera * 2 + front_camera
+
+    elif usage_type == 'Business':
+        # Good battery, decent specs
+        return battery / 100 + ram * 5
+
+    elif usage_type == 'Entertainment':
+        # Large screen, good battery
+        return screen_size * 20 + battery / 100
+
+    else:  # Social Media and general use
+        # Balanced specs, good camera
+        return rear_camera + battery / 200
+
+
+class UsageRanking:
+    """
+    One usage type's ranking of the phones that have specifications
+
+    Phones are kept in price order for budget lookups, and each carries its
+    place in the overall ranking (best score first, ties by phone id). A
+    budget query is two binary searches for the price slice followed by a
+    partial selection of the best-ranked phones in it.
+    """
+
+    def __init__(self, usage_type, snapshot):
+        rows = np.flatnonzero(snapshot.has_specs)
+        scores = usage_scores(usage_type, snapshot, rows)
+        phone_ids = snapshot.phone_ids[rows]
+
+        by_score = np.lexsort((phone_ids, -scores))
+        ranks = np.empty(len(rows), dtype=np.int64)
+        ranks[by_score] = np.arange(len(rows))
+
+        by_price = np.lexsort((phone_ids, snapshot.price[rows]))
+
+        self.usage_type = usage_type
+        self.ranked_ids = phone_ids[by_score]
+        self.ranked_scores = scores[by_score]
+
+        self._prices = snapshot.price[rows][by_price]
+        self._price_ranks = ranks[by_price]
+
+    def __len__(self):
+        return len(self.ranked_ids)
+
+    def top(self, top_n, min_price=None, max_price=None):
+        """
+        Get the best phones for this usage within an optional price range
+
+        Returns:
+            Tuple of (phone ID array, score array), best first
+        """
+        if min_price is None and max_price is None:
+            return self.ranked_ids[:top_n], self.ranked_scores[:top_n]
+
+        start = 0 if min_price is None else np.searchsorted(self._prices, min_price, side='left')
+        end = len(self._prices) if max_price is None else np.searchsorted(self._prices, max_price, side='right')
+
+        ranks = self._price_ranks[start:end]
+        if len(ranks) > top_n > 0:
+            ranks = np.partition(ranks, top_n - 1)[:top_n]
+        ranks = np.sort(ranks)[:max(top_n, 0)]
+
+        return self.ranked_ids[ranks], self.ranked_scores[ranks]
+
+
+class UsageRankings:
+    """Rankings for every usage type, rebuilt when the catalog version moves"""
+
+    def __init__(self):
+        self.version = None
+        self._rankings = {}
+        self._lock = threading.Lock()
+
+    def get(self, usage_type):
+        """Get the ranking for a usage type, refreshing it if the catalog changed"""
+        snapshot = get_catalog_snapshot()
+
+        with self._lock:
+            if snapshot.version != self.version:
+                self._rankings = {
+                    name: UsageRanking(name, snapshot) for name in USAGE_TYPES
+                }
+                self.version = snapshot.version
+
+            return self._rankings[canonical_usage_type(usage_type)]
+
+def get_usage_rankings():
+    """Get the usage rankings of the current application"""
+    from app.modules.services import get_services
+    return get_services().usage_rankings
@@ -2,12 +2,16 @@
 Admin Routes
 Admin panel for managing phones, brands, users, and system
 """
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
 from flask_login import login_required, current_user
 from functools import wraps
 from app import db
 from app.models import User, Phone, PhoneSpecification, Brand, Recommendation
+from app.modules.catalog import invalidate_catalog, paginate_phone_listing, phone_listing_query
+from app.modules.catalog_stats import get_catalog_stats, invalidate_catalog_stats
+from app.modules.similarity import update_similarity_index
 from app.utils.helpers import save_uploaded_file
+from app.utils.pagination import keyset_order, keyset_order_by, keyset_paginate
 from datetime import datetime, timedelta
 import json
 
@@ -31,8 +35,9 @@ def dashboard():
     """Admin dashboard"""
     # Get statistics
     total_users = User.query.filter_by(is_admin=False).count()
-    total_phones = Phone.query.filter_by(is_active=True).count()
-    total_brands = Brand.query.filter_by(is_active=True).count()
+    catalog_stats = get_catalog_stats()
+    total_phones = catalog_stats.total_phones
+    total_brands = catalog_stats.total_brands
 
     # Today's recommendations
     today = datetime.utcnow().date()
@@ -79,19 +84,22 @@ def dashboard():
 def phones():
     """List all phones"""
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search', '')
     brand_id = request.args.get('brand_id', type=int)
 
-    query = Phone.query
+    query = phone_listing_query(
+        brand_ids=[brand_id] if brand_id else None,
+        active_only=False
+    )
 
     if search:
         query = query.filter(Phone.model_name.ilike(f'%{search}%'))
 
-    if brand_id:
-        query = query.filter_by(brand_id=brand_id)
-
-    phones = query.order_by(Phone.created_at.desc())\
-        .paginate(page=page, per_page=20, error_out=False)
+    try:
+        phones = paginate_phone_listing(query, 'created_at', page=page, per_page=20, cursor=cursor)
+    except ValueError:
+        abort(400)
 
     brands = Brand.query.filter_by(is_active=True).all()
 
@@ -174,6 +182,10 @@ def add_phone():
 
         db.session.add(specs)
         db.session.commit()
+        invalidate_catalog([phone.id])
+
+        # The similar-phones index is stored, so its rows are written in this request
+        update_similarity_index([phone.id])
 
         flash(f'Phone "{model_name}" added successfully.', 'success')
         return redirect(url_for('admin.phones'))
@@ -241,6 +253,11 @@ def edit_phone(phone_id):
         specs.colors_available = request.form.get('colors_available')
 
         db.session.commit()
+        invalidate_catalog([phone_id])
+
+        # Also recomputes the neighbours of phones now closer to this one
+        update_similarity_index([phone_id])
+
         flash(f'Phone "{phone.model_name}" updated successfully.', 'success')
         return redirect(url_for('admin.phones'))
 
@@ -260,6 +277,10 @@ def delete_phone(phone_id):
 
     db.session.delete(phone)
     db.session.commit()
+    invalidate_catalog([phone_id])
+
+    # Phones that listed this one as a neighbour get new ones
+    update_similarity_index([phone_id])
 
     flash(f'Phone "{phone_name}" deleted successfully.', 'success')
     return redirect(url_for('admin.phones'))
@@ -314,6 +335,7 @@ def add_brand():
 
         db.session.add(brand)
         db.session.commit()
+        invalidate_catalog_stats()
 
         flash(f'Brand "{name}" added successfully.', 'success')
         return redirect(url_for('admin.brands'))
@@ -343,6 +365,10 @@ def edit_brand(brand_id):
                     brand.logo_url = f'/static/uploads/brands/{filename}'
 
         db.session.commit()
+        invalidate_catalog_stats()
+
+        # Brand names are shown in search results and comparisons
+        invalidate_catalog([phone_id for (phone_id,) in brand.phones.with_entities(Phone.id)])
         flash(f'Brand "{brand.name}" updated successfully.', 'success')
         return redirect(url_for('admin.brands'))
 
@@ -355,6 +381,7 @@ def edit_brand(brand_id):
 def users():
     """List all users"""
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search', '')
     user_type = request.args.get('type', '')
 
@@ -371,8 +398,15 @@ def users():
     if user_type:
         query = query.filter_by(user_category=user_type)
 
-    users = query.order_by(User.created_at.desc())\
-        .paginate(page=page, per_page=20, error_out=False)
+    order = keyset_order(User.created_at, User.id, descending=True)
+    if cursor is None:
+        users = query.order_by(*keyset_order_by(order))\
+            .paginate(page=page, per_page=20, error_out=False)
+    else:
+        try:
+            users = keyset_paginate(query, order, cursor=cursor, per_page=20)
+        except ValueError:
+            abort(400)
 
     return render_template('admin/users.html',
                          users=users,
@@ -425,9 +459,19 @@ def logs():
     """View system logs"""
     # Get recent recommendations for activity log
     page = request.args.get('page', 1, type=int)
-    recommendations = Recommendation.query\
-        .order_by(Recommendation.created_at.desc())\
-        .paginate(page=page, per_page=50, error_out=False)
+    cursor = request.args.get('cursor')
+
+    # The log only grows, so cursor mode avoids ever deeper OFFSET scans
+    order = keyset_order(Recommendation.created_at, Recommendation.id, descending=True)
+    if cursor is None:
+        recommendations = Recommendation.query\
+            .order_by(*keyset_order_by(order))\
+            .paginate(page=page, per_page=50, error_out=False)
+    else:
+        try:
+            recommendations = keyset_paginate(Recommendation.query, order, cursor=cursor, per_page=50)
+        except ValueError:
+            abort(400)
 
     return render_template('admin/logs.html',
                          recommendations=recommendations)
@@ -2,10 +2,17 @@
 API Routes
 RESTful API endpoints for AJAX requests and chatbot
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from flask_login import login_required, current_user
 from app.models import Phone, PhoneSpecification, Brand
-from app.modules import ChatbotEngine, AIRecommendationEngine
+from app.modules import get_chatbot, get_recommendation_engine
+from app.modules.ai_engine import get_recommendation_cache
+from app.modules.catalog import get_phones_by_ids, paginate_phone_listing, phone_listing_query
+from app.modules.catalog_stats import get_catalog_stats
+from app.modules.phone_picker import get_phone_picker
+from app.modules.price_index import get_price_index
+from app.modules.search import get_search_index
+import json
 import uuid
 
 bp = Blueprint('api', __name__, url_prefix='/api')
@@ -23,7 +30,7 @@ def chat():
         return jsonify({'error': 'Message is required'}), 400
 
     # Process with chatbot engine
-    chatbot = ChatbotEngine()
+    chatbot = get_chatbot()
     response = chatbot.process_message(current_user.id, message, session_id)
 
     return jsonify({
@@ -35,6 +42,40 @@ def chat():
         'session_id': session_id
     })
 
+@bp.route('/chat/stream', methods=['POST'])
+@login_required
+def chat_stream():
+    """Process chatbot message, streaming the reply as Server-Sent Events"""
+    data = request.get_json()
+    message = data.get('message', '')
+    session_id = data.get('session_id') or str(uuid.uuid4())
+
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    chatbot = get_chatbot()
+    user_id = current_user.id
+
+    def generate():
+        for event, payload in chatbot.stream_message(user_id, message, session_id):
+            if event == 'intent':
+                payload = dict(payload, session_id=session_id)
+            elif event == 'message':
+                payload = {
+                    'success': True,
+                    'response': payload['response'],
+                    'type': payload.get('type', 'text'),
+                    'metadata': payload.get('metadata', {}),
+                    'quick_replies': payload.get('quick_replies', []),
+                    'session_id': session_id
+                }
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @bp.route('/chat/history', methods=['GET'])
 @login_required
 def chat_history():
@@ -42,7 +83,7 @@ def chat_history():
     session_id = request.args.get('session_id')
     limit = request.args.get('limit', 50, type=int)
 
-    chatbot = ChatbotEngine()
+    chatbot = get_chatbot()
     history = chatbot.get_chat_history(current_user.id, session_id, limit)
 
     chat_list = [{
@@ -63,15 +104,14 @@ def chat_history():
 def search_phones():
     """Search phones (for autocomplete)"""
     query = request.args.get('q', '')
+    # Clamped so a negative limit cannot mean "everything" or "all but the last"
     limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(limit, current_app.config['SEARCH_MAX_LIMIT']))
 
     if not query:
         return jsonify({'phones': []})
 
-    phones = Phone.query.filter(
-        Phone.is_active == True,
-        Phone.model_name.ilike(f'%{query}%')
-    ).limit(limit).all()
+    phones = get_phones_by_ids(get_search_index().search(query, limit=limit))
 
     phone_list = [{
         'id': phone.id,
@@ -86,6 +126,18 @@ def search_phones():
         'phones': phone_list
     })
 
+# Phone picker endpoint
+@bp.route('/phones/picker', methods=['GET'])
+def phone_picker():
+    """Compact list of every active phone, for browsing in the compare page picker"""
+    picker = get_phone_picker()
+
+    response = Response(picker.body, mimetype='application/json')
+    response.set_etag(picker.etag)
+    # Browsers keep the list but check the ETag before reusing it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 # Phone details endpoint
 @bp.route('/phones/<int:phone_id>', methods=['GET'])
 def get_phone_details(phone_id):
@@ -129,45 +181,104 @@ def get_recommendations():
     """Get AI recommendations"""
     data = request.get_json()
     criteria = data.get('criteria', {})
-    top_n = data.get('top_n', 3)
+    top_n = _requested_top_n(data)
+
+    if top_n is None:
+        return jsonify({'error': 'top_n must be a positive integer'}), 400
 
-    ai_engine = AIRecommendationEngine()
+    ai_engine = get_recommendation_engine()
     recommendations = ai_engine.get_recommendations(
         current_user.id,
         criteria=criteria if criteria else None,
         top_n=top_n
     )
 
-    rec_list = []
-    for rec in recommendations:
-        phone = rec['phone']
-        specs = rec['specifications']
-
-        rec_data = {
-            'phone_id': phone.id,
-            'model_name': phone.model_name,
-            'brand': phone.brand.name if phone.brand else 'Unknown',
-            'price': phone.price,
-            'match_score': rec['match_score'],
-            'reasoning': rec['reasoning'],
-            'main_image': phone.main_image
-        }
+    rec_list = [_serialize_recommendation(rec) for rec in recommendations]
 
-        if specs:
-            rec_data['key_specs'] = {
-                'ram': specs.ram_options,
-                'storage': specs.storage_options,
-                'camera': f"{specs.rear_camera_main}MP" if specs.rear_camera_main else 'N/A',
-                'battery': f"{specs.battery_capacity}mAh" if specs.battery_capacity else 'N/A'
-            }
+    return jsonify({
+        'success': True,
+        'recommendations': rec_list
+    })
 
-        rec_list.append(rec_data)
+@bp.route('/recommendations/cache', methods=['GET'])
+@login_required
+def recommendation_cache_stats():
+    """Get recommendation result cache statistics (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
 
     return jsonify({
         'success': True,
-        'recommendations': rec_list
+        'cache': get_recommendation_cache().stats()
     })
 
+@bp.route('/recommendations/batch', methods=['POST'])
+@login_required
+def get_recommendations_batch():
+    """Get AI recommendations for many users or criteria sets (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    data = request.get_json() or {}
+    items = data.get('items', [])
+    top_n = _requested_top_n(data)
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'A list of user IDs or criteria is required'}), 400
+
+    if top_n is None:
+        return jsonify({'error': 'top_n must be a positive integer'}), 400
+
+    if len(items) > current_app.config['RECOMMENDATION_BATCH_LIMIT']:
+        return jsonify({'error': 'Too many items in one batch'}), 400
+
+    for item in items:
+        if not isinstance(item, (int, dict)) or isinstance(item, bool):
+            return jsonify({'error': 'Items must be user IDs or criteria objects'}), 400
+
+    ai_engine = get_recommendation_engine()
+    results = ai_engine.get_recommendations_batch(items, top_n=top_n)
+
+    return jsonify({
+        'success': True,
+        'results': [{
+            'item': item,
+            'recommendations': [_serialize_recommendation(rec) for rec in recommendations]
+        } for item, recommendations in zip(items, results)]
+    })
+
+def _requested_top_n(data, default=3):
+    """top_n of a request body capped at RECOMMENDATION_MAX_TOP_N, or None unless it is a positive integer"""
+    top_n = data.get('top_n', default)
+    if not isinstance(top_n, int) or isinstance(top_n, bool) or top_n <= 0:
+        return None
+    return min(top_n, current_app.config['RECOMMENDATION_MAX_TOP_N'])
+
+def _serialize_recommendation(rec):
+    """Convert a recommendation dictionary to JSON-friendly data"""
+    phone = rec['phone']
+    specs = rec['specifications']
+
+    rec_data = {
+        'phone_id': phone.id,
+        'model_name': phone.model_name,
+        'brand': phone.brand.name if phone.brand else 'Unknown',
+        'price': phone.price,
+        'match_score': rec['match_score'],
+        'reasoning': rec['reasoning'],
+        'main_image': phone.main_image
+    }
+
+    if specs:
+        rec_data['key_specs'] = {
+            'ram': specs.ram_options,
+            'storage': specs.storage_options,
+            'camera': f"{specs.rear_camera_main}MP" if specs.rear_camera_main else 'N/A',
+            'battery': f"{specs.battery_capacity}mAh" if specs.battery_capacity else 'N/A'
+        }
+
+    return rec_data
+
 # Brands endpoint
 @bp.route('/brands', methods=['GET'])
 def get_brands():
@@ -196,39 +307,36 @@ def filter_phones():
     min_price = data.get('min_price')
     max_price = data.get('max_price')
     min_ram = data.get('min_ram')
+    min_storage = data.get('min_storage')
     has_5g = data.get('has_5g')
     min_battery = data.get('min_battery')
+    sort_by = data.get('sort_by')
     page = data.get('page', 1)
     per_page = data.get('per_page', 12)
+    cursor = data.get('cursor')
 
     # Build query
-    query = Phone.query.filter_by(is_active=True)
-
-    if brand_ids:
-        query = query.filter(Phone.brand_id.in_(brand_ids))
-
-    if min_price:
-        query = query.filter(Phone.price >= min_price)
-
-    if max_price:
-        query = query.filter(Phone.price <= max_price)
-
-    # Join with specifications for advanced filters
-    if min_ram or has_5g or min_battery:
-        query = query.join(PhoneSpecification)
-
-        if min_ram:
-            # This is simplified - in production, parse ram_options properly
-            query = query.filter(PhoneSpecification.ram_options.ilike(f'%{min_ram}GB%'))
-
-        if has_5g:
-            query = query.filter(PhoneSpecification.has_5g == True)
-
-        if min_battery:
-            query = query.filter(PhoneSpecification.battery_capacity >= min_battery)
+    query = phone_listing_query(
+        brand_ids=brand_ids,
+        min_price=min_price,
+        max_price=max_price,
+        min_ram=min_ram,
+        min_storage=min_storage,
+        requires_5g=has_5g,
+        min_battery=min_battery
+    )
 
-    # Paginate
-    phones = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Paginate by page number, or by cursor when one is given
+    try:
+        phones = paginate_phone_listing(
+            query, sort_by,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            with_total=bool(data.get('with_total'))
+        )
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
 
     phone_list = [{
         'id': phone.id,
@@ -238,6 +346,14 @@ def filter_phones():
         'main_image': phone.main_image
     } for phone in phones.items]
 
+    if cursor is not None:
+        return jsonify({
+            'success': True,
+            'phones': phone_list,
+            'next_cursor': phones.next_cursor,
+            'total': phones.total
+        })
+
     return jsonify({
         'success': True,
         'phones': phone_list,
@@ -250,19 +366,19 @@ def filter_phones():
 @bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get quick statistics"""
-    total_phones = Phone.query.filter_by(is_active=True).count()
-    total_brands = Brand.query.filter_by(is_active=True).count()
+    stats = get_catalog_stats()
 
-    # Get price range
-    phones = Phone.query.filter_by(is_active=True).all()
-    prices = [phone.price for phone in phones]
+    # Median and tier aggregates come from the in-memory price index
+    price_index = get_price_index()
 
     return jsonify({
         'success': True,
         'stats': {
-            'total_phones': total_phones,
-            'total_brands': total_brands,
-            'min_price': min(prices) if prices else 0,
-            'max_price': max(prices) if prices else 0
+            'total_phones': stats.total_phones,
+            'total_brands': stats.total_brands,
+            'min_price': stats.min_price,
+            'max_price': stats.max_price,
+            'median_price': price_index.overall['median'],
+            'price_tiers': price_index.tiers
         }
     })
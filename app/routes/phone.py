@@ -2,10 +2,12 @@
 Phone Routes
 Phone details, brand pages, and comparison functionality
 """
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, current_app
 from flask_login import login_required, current_user
 from app.models import Phone, PhoneSpecification, Brand
-from app.modules import PhoneComparison, AIRecommendationEngine
+from app.modules import get_comparison_engine, get_recommendation_engine
+from app.modules.catalog import get_phones_by_ids, paginate_phone_listing, phone_listing_query
+from app.modules.search import search_phones
 
 bp = Blueprint('phone', __name__, url_prefix='/phone')
 
@@ -16,7 +18,7 @@ def details(phone_id):
     specs = PhoneSpecification.query.filter_by(phone_id=phone_id).first()
 
     # Get similar phones
-    ai_engine = AIRecommendationEngine()
+    ai_engine = get_recommendation_engine()
     similar_phones = ai_engine.get_similar_phones(phone_id, top_n=3)
 
     return render_template('phone/details.html',
@@ -32,23 +34,17 @@ def brand_page(brand_id):
     # Get filter parameters
     sort_by = request.args.get('sort_by', 'created_at')
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
 
     # Build query
-    query = Phone.query.filter_by(brand_id=brand_id, is_active=True)
-
-    # Apply sorting
-    if sort_by == 'price_asc':
-        query = query.order_by(Phone.price.asc())
-    elif sort_by == 'price_desc':
-        query = query.order_by(Phone.price.desc())
-    elif sort_by == 'name':
-        query = query.order_by(Phone.model_name.asc())
-    else:  # created_at
-        query = query.order_by(Phone.created_at.desc())
-
-    # Paginate
+    query = phone_listing_query(brand_ids=[brand_id])
+
+    # Paginate by page number, or by cursor when one is given
     per_page = 12
-    phones = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        phones = paginate_phone_listing(query, sort_by, page=page, per_page=per_page, cursor=cursor)
+    except ValueError:
+        abort(400)
 
     # Get brand statistics
     phone_count = brand.get_phone_count()
@@ -61,25 +57,30 @@ def brand_page(brand_id):
                          price_range=price_range,
                          sort_by=sort_by)
 
+def _selected_phone_ids(values, names):
+    """Phone IDs chosen in the given request fields, skipping empty ones"""
+    return [phone_id for phone_id in (values.get(name, type=int) for name in names) if phone_id]
+
 @bp.route('/compare', methods=['GET', 'POST'])
 def compare():
     """Phone comparison page"""
+    max_phones = current_app.config['COMPARE_MAX_PHONES']
+
     if request.method == 'POST':
-        phone1_id = request.form.get('phone1_id', type=int)
-        phone2_id = request.form.get('phone2_id', type=int)
+        phone_ids = _selected_phone_ids(request.form, [f'phone{i}_id' for i in range(1, max_phones + 1)])
 
-        if not phone1_id or not phone2_id:
-            flash('Please select two phones to compare.', 'warning')
+        if len(phone_ids) < 2:
+            flash('Please select at least two phones to compare.', 'warning')
             return redirect(url_for('phone.compare'))
 
-        if phone1_id == phone2_id:
-            flash('Please select two different phones to compare.', 'warning')
+        if len(set(phone_ids)) != len(phone_ids):
+            flash('Please select different phones to compare.', 'warning')
             return redirect(url_for('phone.compare'))
 
         # Perform comparison
-        comparison_engine = PhoneComparison()
+        comparison_engine = get_comparison_engine()
         user_id = current_user.id if current_user.is_authenticated else None
-        comparison_data = comparison_engine.compare_phones(phone1_id, phone2_id, user_id)
+        comparison_data = comparison_engine.compare(phone_ids, user_id)
 
         if not comparison_data:
             flash('Unable to compare selected phones.', 'danger')
@@ -89,34 +90,35 @@ def compare():
                              comparison=comparison_data)
 
     # GET request - show comparison selection
-    phone1_id = request.args.get('phone1', type=int)
-    phone2_id = request.args.get('phone2', type=int)
+    # Phones given in the URL, as ?phones=1,2,3 or ?phone1=1&phone2=2
+    phones_param = request.args.get('phones', '')
+    if phones_param:
+        phone_ids = [int(value) for value in phones_param.split(',') if value.strip().isdigit()]
+    else:
+        phone_ids = _selected_phone_ids(request.args, [f'phone{i}' for i in range(1, max_phones + 1)])
 
-    # If both phones provided in URL, perform comparison
-    if phone1_id and phone2_id:
-        comparison_engine = PhoneComparison()
+    # If at least two phones provided in URL, perform comparison
+    if 2 <= len(phone_ids) <= max_phones:
+        comparison_engine = get_comparison_engine()
         user_id = current_user.id if current_user.is_authenticated else None
-        comparison_data = comparison_engine.compare_phones(phone1_id, phone2_id, user_id)
+        comparison_data = comparison_engine.compare(phone_ids, user_id)
 
         if comparison_data:
             return render_template('phone/compare_result.html',
                                  comparison=comparison_data)
 
-    # Get all active phones for selection
-    phones = Phone.query.filter_by(is_active=True).order_by(Phone.model_name).all()
-    brands = Brand.query.filter_by(is_active=True).order_by(Brand.name).all()
+    # Only the phones already chosen are loaded; the picker searches the rest through the API
+    selected_phones = get_phones_by_ids(phone_ids[:max_phones], active_only=True)
 
     return render_template('phone/compare.html',
-                         phones=phones,
-                         brands=brands,
-                         phone1_id=phone1_id,
-                         phone2_id=phone2_id)
+                         selected_phones=selected_phones,
+                         max_phones=max_phones)
 
 @bp.route('/compare/history')
 @login_required
 def comparison_history():
     """View comparison history"""
-    comparison_engine = PhoneComparison()
+    comparison_engine = get_comparison_engine()
     comparisons = comparison_engine.get_user_comparisons(current_user.id, limit=20)
 
     return render_template('phone/comparison_history.html',
@@ -126,7 +128,7 @@ def comparison_history():
 @login_required
 def save_comparison(comparison_id):
     """Save a comparison"""
-    comparison_engine = PhoneComparison()
+    comparison_engine = get_comparison_engine()
     if comparison_engine.save_comparison(comparison_id):
         flash('Comparison saved successfully.', 'success')
     else:
@@ -143,12 +145,15 @@ def search():
     if not query:
         return redirect(url_for('user.browse'))
 
-    # Search in model name
-    phones = Phone.query.filter(
-        Phone.is_active == True,
-        Phone.model_name.ilike(f'%{query}%')
-    ).paginate(page=page, per_page=12, error_out=False)
+    # Search model name, brand, processor and OS
+    per_page = 12
+    page = max(page, 1)
+    phone_ids = search_phones(query, limit=None)
+    phones = get_phones_by_ids(phone_ids[(page - 1) * per_page:page * per_page])
 
     return render_template('phone/search_results.html',
                          phones=phones,
+                         total=len(phone_ids),
+                         page=page,
+                         pages=-(-len(phone_ids) // per_page),
                          query=query)
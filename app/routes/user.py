@@ -2,11 +2,12 @@
 User Routes
 Main user-facing pages and functionality
 """
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models import Brand, Phone, PhoneSpecification, UserPreference, Recommendation, Comparison
-from app.modules import AIRecommendationEngine
+from app.modules import get_recommendation_engine
+from app.modules.catalog import paginate_phone_listing, phone_listing_query
 from app.utils.helpers import parse_json_field
 import json
 
@@ -125,7 +126,7 @@ def preferences():
 @login_required
 def recommendations():
     """Show AI recommendations for current user"""
-    ai_engine = AIRecommendationEngine()
+    ai_engine = get_recommendation_engine()
 
     # Get recommendations
     recommendations = ai_engine.get_recommendations(current_user.id, top_n=5)
@@ -160,7 +161,7 @@ def recommendation_wizard():
         }
 
         # Get AI recommendations
-        ai_engine = AIRecommendationEngine()
+        ai_engine = get_recommendation_engine()
         recommendations = ai_engine.get_recommendations(
             current_user.id if current_user.is_authenticated else None,
             criteria=criteria,
@@ -186,32 +187,21 @@ def browse():
     has_5g = request.args.get('has_5g', type=bool)
     sort_by = request.args.get('sort_by', 'created_at')
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
 
     # Build query
-    query = Phone.query.filter_by(is_active=True)
+    query = phone_listing_query(
+        brand_ids=[brand_id] if brand_id else None,
+        min_price=min_price,
+        max_price=max_price
+    )
 
-    if brand_id:
-        query = query.filter_by(brand_id=brand_id)
-
-    if min_price:
-        query = query.filter(Phone.price >= min_price)
-
-    if max_price:
-        query = query.filter(Phone.price <= max_price)
-
-    # Apply sorting
-    if sort_by == 'price_asc':
-        query = query.order_by(Phone.price.asc())
-    elif sort_by == 'price_desc':
-        query = query.order_by(Phone.price.desc())
-    elif sort_by == 'name':
-        query = query.order_by(Phone.model_name.asc())
-    else:  # created_at
-        query = query.order_by(Phone.created_at.desc())
-
-    # Paginate
+    # Paginate by page number, or by cursor when one is given
     per_page = 12
-    phones = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        phones = paginate_phone_listing(query, sort_by, page=page, per_page=per_page, cursor=cursor)
+    except ValueError:
+        abort(400)
 
     # Get all brands for filter
     brands = Brand.query.filter_by(is_active=True).all()
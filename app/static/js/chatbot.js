@@ -62,7 +62,15 @@ $(document).ready(function() {
         // Show typing indicator
         showTypingIndicator();
 
-        // Send to API
+        // Stream the reply where the browser can read a response body as it arrives
+        if (window.fetch && window.ReadableStream && window.TextDecoder) {
+            streamMessage(message);
+        } else {
+            postChatMessage(message);
+        }
+    }
+
+    function postChatMessage(message) {
         $.ajax({
             url: '/api/chat',
             type: 'POST',
@@ -97,6 +105,97 @@ $(document).ready(function() {
         });
     }
 
+    function streamMessage(message) {
+        var reply = null;
+        var cards = null;
+        var finished = false;
+
+        // Server-Sent Events: the intent first, then one event per phone, then the full message
+        function handleEvent(block) {
+            var event = 'message';
+            var data = '';
+
+            block.split('\n').forEach(function(line) {
+                if (line.indexOf('event:') === 0) {
+                    event = line.slice(6).trim();
+                } else if (line.indexOf('data:') === 0) {
+                    data += line.slice(5).trim();
+                }
+            });
+
+            if (!data) {
+                return;
+            }
+            data = JSON.parse(data);
+
+            if (event === 'intent') {
+                // Keep the typing dots inside the reply until its text arrives
+                hideTypingIndicator();
+                reply = $(typingIndicatorHtml()).removeClass('typing-indicator').appendTo('#chat-messages');
+                cards = $('<div class="phone-recommendations mt-2"></div>').appendTo('#chat-messages');
+
+                if (data.quick_replies && data.quick_replies.length > 0) {
+                    appendQuickReplies(data.quick_replies);
+                }
+                scrollToBottom();
+            } else if (event === 'phone') {
+                cards.append(phoneCardHtml(data));
+                scrollToBottom();
+            } else if (event === 'message') {
+                finished = true;
+                reply.find('.message-content').text(data.response);
+                if (cards.children().length === 0) {
+                    cards.remove();
+                }
+                scrollToBottom();
+            }
+        }
+
+        fetch('/api/chat/stream', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                message: message,
+                session_id: sessionId
+            })
+        }).then(function(response) {
+            if (!response.ok || !response.body) {
+                throw new Error('Chat stream failed');
+            }
+
+            var reader = response.body.getReader();
+            var decoder = new TextDecoder();
+            var buffer = '';
+
+            function read() {
+                return reader.read().then(function(result) {
+                    if (result.done) {
+                        if (!finished) {
+                            throw new Error('Chat stream ended early');
+                        }
+                        return;
+                    }
+
+                    buffer += decoder.decode(result.value, { stream: true });
+                    var events = buffer.split('\n\n');
+                    buffer = events.pop();
+                    events.forEach(handleEvent);
+
+                    return read();
+                });
+            }
+
+            return read();
+        }).catch(function() {
+            hideTypingIndicator();
+            if (reply) {
+                reply.remove();
+            }
+            appendMessage('Sorry, I could not process your request. Please try again later.', 'bot');
+        });
+    }
+
     function appendMessage(message, type) {
         var messageClass = type === 'user' ? 'user-message' : 'bot-message';
         var messageHtml = `
@@ -113,18 +212,7 @@ $(document).ready(function() {
         var cardsHtml = '<div class="phone-recommendations mt-2">';
 
         phones.forEach(function(phone) {
-            cardsHtml += `
-                <div class="card mb-2" style="max-width: 100%;">
-                    <div class="card-body p-2">
-                        <h6 class="card-title mb-1">${escapeHtml(phone.name)}</h6>
-                        <p class="card-text mb-1 small">
-                            <strong class="text-primary">RM ${phone.price.toFixed(2)}</strong>
-                            ${phone.match_score ? `<span class="badge bg-success ms-2">${phone.match_score}% Match</span>` : ''}
-                        </p>
-                        <a href="/phone/${phone.id}" class="btn btn-sm btn-primary" target="_blank">View Details</a>
-                    </div>
-                </div>
-            `;
+            cardsHtml += phoneCardHtml(phone);
         });
 
         cardsHtml += '</div>';
@@ -132,6 +220,21 @@ $(document).ready(function() {
         scrollToBottom();
     }
 
+    function phoneCardHtml(phone) {
+        return `
+            <div class="card mb-2" style="max-width: 100%;">
+                <div class="card-body p-2">
+                    <h6 class="card-title mb-1">${escapeHtml(phone.name)}</h6>
+                    <p class="card-text mb-1 small">
+                        <strong class="text-primary">RM ${phone.price.toFixed(2)}</strong>
+                        ${phone.match_score ? `<span class="badge bg-success ms-2">${phone.match_score}% Match</span>` : ''}
+                    </p>
+                    <a href="/phone/${phone.id}" class="btn btn-sm btn-primary" target="_blank">View Details</a>
+                </div>
+            </div>
+        `;
+    }
+
     function appendQuickReplies(replies) {
         var repliesHtml = '<div class="quick-replies mt-2 mb-2">';
 
@@ -153,7 +256,12 @@ $(document).ready(function() {
     }
 
     function showTypingIndicator() {
-        var typingHtml = `
+        $('#chat-messages').append(typingIndicatorHtml());
+        scrollToBottom();
+    }
+
+    function typingIndicatorHtml() {
+        return `
             <div class="chat-message bot-message typing-indicator">
                 <div class="message-content">
                     <span class="typing-dot"></span>
@@ -162,8 +270,6 @@ $(document).ready(function() {
                 </div>
             </div>
         `;
-        $('#chat-messages').append(typingHtml);
-        scrollToBottom();
     }
 
     function hideTypingIndicator() {
@@ -81,6 +81,95 @@ $(document).ready(function() {
         }
     });
 
+    // Compare page phone picker: search as you type, or browse every phone when empty
+    var pickerPhones = null;
+
+    function loadPickerPhones() {
+        // Fetched once per page; the browser revalidates it by ETag
+        if (!pickerPhones) {
+            pickerPhones = $.getJSON('/api/phones/picker');
+        }
+        return pickerPhones;
+    }
+
+    function showPickerResults(picker, phones, grouped) {
+        var results = picker.find('.phone-picker-results').empty();
+        var brand = null;
+
+        if (phones.length === 0) {
+            results.append($('<div class="list-group-item text-muted"></div>').text('No phones found'));
+        }
+
+        phones.forEach(function(phone) {
+            if (grouped && phone.brand !== brand) {
+                brand = phone.brand;
+                results.append($('<div class="list-group-item list-group-item-secondary small fw-bold"></div>').text(brand));
+            }
+
+            var label = phone.name + ' - ' + formatPrice(phone.price);
+            $('<button type="button" class="list-group-item list-group-item-action"></button>')
+                .text(grouped ? label : label + ' (' + phone.brand + ')')
+                .data('phone', phone)
+                .appendTo(results);
+        });
+
+        results.show();
+    }
+
+    function browsePickerPhones(input) {
+        loadPickerPhones().done(function(data) {
+            if (!input.val().trim()) {
+                showPickerResults(input.closest('.phone-picker'), data.phones, true);
+            }
+        });
+    }
+
+    var pickerTimer = null;
+
+    $('.phone-picker-input').on('focus', function() {
+        if (!$(this).val().trim()) {
+            browsePickerPhones($(this));
+        }
+    });
+
+    $('.phone-picker-input').on('input', function() {
+        var input = $(this);
+        var picker = input.closest('.phone-picker');
+        var query = input.val().trim();
+
+        // Typing replaces the chosen phone
+        picker.find('input[type="hidden"]').val('');
+        clearTimeout(pickerTimer);
+
+        if (!query) {
+            browsePickerPhones(input);
+            return;
+        }
+
+        pickerTimer = setTimeout(function() {
+            $.getJSON('/api/phones/search', { q: query, limit: 10 }, function(data) {
+                // Skip answers to a query the user has typed past
+                if (input.val().trim() === query) {
+                    showPickerResults(picker, data.phones, false);
+                }
+            });
+        }, 200);
+    });
+
+    $('.phone-picker-results').on('mousedown', '.list-group-item-action', function(event) {
+        event.preventDefault();
+        var phone = $(this).data('phone');
+        var picker = $(this).closest('.phone-picker');
+
+        picker.find('input[type="hidden"]').val(phone.id);
+        picker.find('.phone-picker-input').val(phone.name + ' - ' + formatPrice(phone.price));
+        picker.find('.phone-picker-results').hide();
+    });
+
+    $('.phone-picker-input').on('blur', function() {
+        $(this).closest('.phone-picker').find('.phone-picker-results').hide();
+    });
+
     // Image lazy loading
     if ('IntersectionObserver' in window) {
         const imageObserver = new IntersectionObserver((entries, observer) => {
@@ -0,0 +1,191 @@
+"""
+Cache Backends
+Size-bounded LRU caches with hit/miss counters, in-process or on Redis
+"""
+from collections import OrderedDict
+import json
+import threading
+
+class BaseCache:
+    """Interface shared by the cache backends"""
+
+    backend = None
+
+    def generation(self, catalog_version):
+        """
+        Version to key catalog-derived entries on
+
+        An in-process cache only holds entries built by this process, so
+        the process's own catalog version tells them apart.
+        """
+        return catalog_version
+
+    def invalidate(self):
+        """Make entries built before a catalog write unreachable"""
+
+    def stats(self):
+        """Get the size, hit and miss counts of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class LRUCache(BaseCache):
+    """Thread-safe in-process LRU cache"""
+
+    backend = 'memory'
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a cached value, or None on a miss"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Cache a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisLRUCache(BaseCache):
+    """
+    LRU cache stored on a Redis-compatible server
+
+    Values are stored as JSON, so they must be JSON-serializable. Recency
+    is tracked in a sorted set scored by a shared counter, which is trimmed
+    to maxsize on every write. Hit and miss counters are shared by every
+    process using the namespace.
+
+    Entries outlive the processes that wrote them, whose catalog versions
+    restart at 0, so catalog-derived entries are keyed on a generation
+    counter kept on the server instead. invalidate() bumps it after every
+    catalog write, in whichever process made it.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, client, namespace, maxsize=1024):
+        self.maxsize = maxsize
+        self._client = client
+        self._namespace = namespace
+        self._recency_key = f'{namespace}:lru'
+        self._hits_key = f'{namespace}:hits'
+        self._misses_key = f'{namespace}:misses'
+        self._clock_key = f'{namespace}:clock'
+        self._generation_key = f'{namespace}:generation'
+
+    @property
+    def hits(self):
+        return int(self._client.get(self._hits_key) or 0)
+
+    @property
+    def misses(self):
+        return int(self._client.get(self._misses_key) or 0)
+
+    def _key(self, key):
+        return f'{self._namespace}:{key}'
+
+    def generation(self, catalog_version):
+        return int(self._client.get(self._generation_key) or 0)
+
+    def invalidate(self):
+        self._client.incr(self._generation_key)
+
+    def get(self, key):
+        data = self._client.get(self._key(key))
+        if data is None:
+            self._client.incr(self._misses_key)
+            return None
+
+        pipe = self._client.pipeline()
+        pipe.zadd(self._recency_key, {key: self._client.incr(self._clock_key)})
+        pipe.incr(self._hits_key)
+        pipe.execute()
+        return json.loads(data)
+
+    def set(self, key, value):
+        pipe = self._client.pipeline()
+        pipe.set(self._key(key), json.dumps(value))
+        pipe.zadd(self._recency_key, {key: self._client.incr(self._clock_key)})
+        pipe.execute()
+
+        overflow = self._client.zcard(self._recency_key) - self.maxsize
+        if overflow > 0:
+            evicted = self._client.zrange(self._recency_key, 0, overflow - 1)
+            pipe = self._client.pipeline()
+            pipe.zremrangebyrank(self._recency_key, 0, overflow - 1)
+            pipe.delete(*(self._key(k.decode() if isinstance(k, bytes) else k) for k in evicted))
+            pipe.execute()
+
+    def clear(self):
+        keys = list(self._client.scan_iter(f'{self._namespace}:*'))
+        if keys:
+            self._client.delete(*keys)
+
+    def __len__(self):
+        return self._client.zcard(self._recency_key)
+
+
+def create_cache(backend='memory', maxsize=1024, redis_url=None, namespace='dialsmart'):
+    """
+    Create a cache for the configured backend
+
+    Args:
+        backend: 'memory' or 'redis'
+        maxsize: Maximum number of entries
+        redis_url: Server URL for the redis backend
+        namespace: Key prefix for the redis backend
+
+    Returns:
+        LRUCache or RedisLRUCache
+
+    Raises:
+        RuntimeError: If the redis backend is requested but the redis package is not installed
+        ValueError: If the backend is unknown
+    """
+    if backend == 'memory':
+        return LRUCache(maxsize=maxsize)
+
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('The redis cache backend requires the redis package') from e
+
+        return RedisLRUCache(redis.Redis.from_url(redis_url), namespace, maxsize=maxsize)
+
+    raise ValueError(f'Unknown cache backend: {backend}')
@@ -4,6 +4,7 @@ Common utility functions used across the application
 """
 import os
 import json
+import re
 from werkzeug.utils import secure_filename
 from flask import current_app
 from datetime import datetime
@@ -54,6 +55,23 @@ def format_date(date):
         return date.strftime('%d %b %Y')
     return date
 
+# Capacities like "8GB" or "1 TB", and wired wattages (not "15W wireless")
+_CAPACITY_RE = re.compile(r'(\d+)\s*(GB|TB)\b', re.IGNORECASE)
+_WATTS_RE = re.compile(r'(\d+(?:\.\d+)?)\s*W\b(?!\s*(?i:fast\s+)?(?i:reverse\s+)?(?i:wireless))')
+
+def parse_gb_options(options):
+    """Parse an options string like "8GB, 12GB, 1TB" into a list of GB integers"""
+    values = []
+    for amount, unit in _CAPACITY_RE.findall(options or ''):
+        amount = int(amount)
+        values.append(amount * 1024 if unit.upper() == 'TB' else amount)
+    return values
+
+def parse_charging_watts(value):
+    """Parse the first wired wattage in a charging description like "45W Fast Charging" """
+    match = _WATTS_RE.search(value or '')
+    return int(float(match.group(1))) if match else None
+
 def calculate_match_score(user_prefs, phone, phone_specs):
     """
     Calculate how well a phone matches user preferences
@@ -78,17 +96,13 @@ def calculate_match_score(user_prefs, phone, phone_specs):
     if phone_specs:
         # RAM match (weight: 10)
         max_score += 10
-        if phone_specs.ram_options:
-            ram_values = [int(r.replace('GB', '')) for r in phone_specs.ram_options.split(',') if 'GB' in r]
-            if ram_values and max(ram_values) >= user_prefs.min_ram:
-                score += 10
+        if phone_specs.max_ram_gb and phone_specs.max_ram_gb >= user_prefs.min_ram:
+            score += 10
 
         # Storage match (weight: 10)
         max_score += 10
-        if phone_specs.storage_options:
-            storage_values = [int(s.replace('GB', '')) for s in phone_specs.storage_options.split(',') if 'GB' in s]
-            if storage_values and max(storage_values) >= user_prefs.min_storage:
-                score += 10
+        if phone_specs.max_storage_gb and phone_specs.max_storage_gb >= user_prefs.min_storage:
+            score += 10
 
         # Camera match (weight: 15)
         max_score += 15
@@ -129,12 +143,8 @@ def generate_recommendation_reasoning(match_score, user_prefs, phone, phone_spec
 
     if phone_specs:
         # Performance
-        if phone_specs.ram_options:
-            ram_values = [int(r.replace('GB', '')) for r in phone_specs.ram_options.split(',') if 'GB' in r]
-            if ram_values:
-                max_ram = max(ram_values)
-                if max_ram >= user_prefs.min_ram:
-                    reasons.append(f"Excellent performance with up to {max_ram}GB RAM")
+        if phone_specs.max_ram_gb and phone_specs.max_ram_gb >= user_prefs.min_ram:
+            reasons.append(f"Excellent performance with up to {phone_specs.max_ram_gb}GB RAM")
 
         # Camera
         if phone_specs.rear_camera_main and phone_specs.rear_camera_main >= user_prefs.min_camera:
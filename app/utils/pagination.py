@@ -0,0 +1,166 @@
+"""
+Keyset Pagination
+Cursor-based paging that seeks past the last row instead of using OFFSET
+"""
+from flask import current_app, request, url_for
+from sqlalchemy import tuple_
+from datetime import datetime
+import base64
+import json
+import threading
+import time
+
+# Cached COUNT(*) results: key -> (expires_at, count)
+_count_cache = {}
+_count_lock = threading.Lock()
+_COUNT_CACHE_SIZE = 256
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, items, per_page, next_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+def keyset_order(*columns, descending=False):
+    """
+    Build a keyset ordering from columns that together are unique
+
+    The last column should be the primary key so that ties on the
+    others still have a well-defined next row.
+    """
+    return tuple((column, descending) for column in columns)
+
+def encode_cursor(values):
+    """Encode the sort values of the last row into an opaque cursor string"""
+    payload = [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor created by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(data)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    if not isinstance(payload, list):
+        raise ValueError('Invalid cursor')
+
+    # Cursors come from the client, so only accept what encode_cursor writes
+    return [_decode_cursor_value(value) for value in payload]
+
+def _decode_cursor_value(value):
+    """One sort value of a cursor: a scalar, or a datetime as {'dt': isoformat}"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+
+    if isinstance(value, dict) and value.keys() == {'dt'} and isinstance(value['dt'], str):
+        try:
+            return datetime.fromisoformat(value['dt'])
+        except ValueError as e:
+            raise ValueError('Invalid cursor') from e
+
+    raise ValueError('Invalid cursor')
+
+def keyset_order_by(order):
+    """ORDER BY clauses for a keyset ordering"""
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+def keyset_query(query, order, cursor=None):
+    """
+    Order a query by a keyset and seek past the row a cursor points at
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the ordering
+    """
+    columns = [column for column, _ in order]
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+
+        # Row-value comparison lets the database seek straight into the index
+        if order[0][1]:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+
+    return query.order_by(*keyset_order_by(order))
+
+def keyset_paginate(query, order, cursor=None, per_page=20, with_total=False, count_key=None):
+    """
+    Fetch one page of a query ordered by a keyset
+
+    Args:
+        query: Unordered SQLAlchemy query
+        order: Ordering from keyset_order
+        cursor: Cursor from a previous page's next_cursor, or None for the first page
+        per_page: Number of items per page
+        with_total: Also return the (cached) total number of rows
+        count_key: Extra value for the count cache key, such as a data version
+
+    Returns:
+        KeysetPage
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the ordering
+    """
+    total = cached_count(query, count_key) if with_total else None
+
+    rows = keyset_query(query, order, cursor).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column, _ in order])
+
+    return KeysetPage(rows, per_page, next_cursor=next_cursor, total=total)
+
+def cached_count(query, count_key=None):
+    """
+    Count the rows of a query, caching the result for PAGINATION_COUNT_TTL seconds
+
+    Args:
+        query: SQLAlchemy query to count
+        count_key: Extra value for the cache key, such as a data version
+
+    Returns:
+        Number of rows
+    """
+    statement = query.statement.compile()
+    key = (str(statement), repr(sorted(statement.params.items())), count_key)
+    now = time.monotonic()
+
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    count = query.order_by(None).count()
+    ttl = current_app.config['PAGINATION_COUNT_TTL']
+
+    with _count_lock:
+        if len(_count_cache) >= _COUNT_CACHE_SIZE:
+            # Drop the entry closest to expiring
+            del _count_cache[min(_count_cache, key=lambda k: _count_cache[k][0])]
+        _count_cache[key] = (now + ttl, count)
+
+    return count
+
+def next_page_url(page):
+    """URL of the current page with the cursor moved to page.next_cursor"""
+    args = request.args.to_dict()
+    args['cursor'] = page.next_cursor
+    args.pop('page', None)
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
@@ -0,0 +1,53 @@
+"""
+Schema Helpers
+Bring tables created by an older version of the models up to date
+"""
+from sqlalchemy import inspect
+
+def add_missing_columns(db, table, names=None):
+    """
+    Add model columns (and their single-column indexes) missing from an existing table
+
+    db.create_all creates missing tables but never alters existing ones,
+    so columns added to a model later are added here.
+
+    Args:
+        db: Flask-SQLAlchemy extension
+        table: SQLAlchemy Table of the model
+        names: Optional column names to check, default every column
+
+    Returns:
+        List of the column names added
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        return []
+
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = [name for name in (names or table.c.keys()) if name not in existing]
+
+    for name in added:
+        column = table.c[name]
+        db.session.execute(db.text(
+            f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+        ))
+        for index in table.indexes:
+            if index.columns.keys() == [name]:
+                index.create(db.session.connection())
+    db.session.commit()
+
+    return added
+
+def add_missing_indexes(db, table):
+    """
+    Create model indexes missing from an existing table
+
+    db.create_all skips the indexes of tables that already exist, so
+    indexes added to a model later are created here.
+
+    Args:
+        db: Flask-SQLAlchemy extension
+        table: SQLAlchemy Table of the model
+    """
+    for index in table.indexes:
+        index.create(db.engine, checkfirst=True)
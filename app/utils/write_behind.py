@@ -0,0 +1,246 @@
+"""
+Write-Behind Queue
+Buffers history rows in memory and inserts them in batches from a background thread
+"""
+from sqlalchemy import insert
+from datetime import datetime
+import atexit
+import os
+import queue
+import threading
+import time
+
+class WriteBehindWriter:
+    """
+    Batched background inserts for append-only history tables
+
+    Rows are queued in memory and inserted by a worker thread with one
+    executemany per table, whenever WRITE_BEHIND_BATCH_SIZE rows are
+    waiting or WRITE_BEHIND_FLUSH_INTERVAL seconds have passed. The queue
+    holds at most WRITE_BEHIND_QUEUE_SIZE rows; when it is full the
+    WRITE_BEHIND_FULL_POLICY decides what happens:
+
+        'block': wait up to WRITE_BEHIND_ENQUEUE_TIMEOUT seconds in all for
+            room, then insert the rows left over synchronously on a
+            connection of their own, so no row is ever lost
+        'drop': discard the row and count it in stats()
+
+    Pending rows are flushed when the process exits. With
+    WRITE_BEHIND_ENABLED off (as in testing) every row is inserted
+    synchronously in the caller's session.
+    """
+
+    def __init__(self, db, app=None):
+        self.db = db
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._worker = None
+        self._pid = None
+        self._exit_hook = False
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+
+        # Batches taken from the queue and not yet committed. Moving rows from
+        # the queue to here and reading both happen under this lock, so
+        # pending() never misses a row between the two.
+        self._in_flight = []
+        self._in_flight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'written': 0, 'batches': 0, 'dropped': 0, 'failed': 0, 'overflowed': 0}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the queue settings from the app config"""
+        self.app = app
+        self.enabled = app.config['WRITE_BEHIND_ENABLED']
+        self.batch_size = app.config['WRITE_BEHIND_BATCH_SIZE']
+        self.flush_interval = app.config['WRITE_BEHIND_FLUSH_INTERVAL']
+        self.queue_size = app.config['WRITE_BEHIND_QUEUE_SIZE']
+        self.full_policy = app.config['WRITE_BEHIND_FULL_POLICY']
+        self.enqueue_timeout = app.config['WRITE_BEHIND_ENQUEUE_TIMEOUT']
+
+        if self.full_policy not in ('block', 'drop'):
+            raise ValueError(f'Unknown write-behind full policy: {self.full_policy}')
+
+        if not self._exit_hook:
+            atexit.register(self.flush)
+            self._exit_hook = True
+
+    def enqueue(self, model, rows):
+        """
+        Queue rows for insertion into a model's table
+
+        Args:
+            model: SQLAlchemy model class
+            rows: List of column dictionaries. created_at is filled in
+                now when the model has it and the row does not.
+        """
+        if 'created_at' in model.__table__.c:
+            now = datetime.utcnow()
+            rows = [row if 'created_at' in row else dict(row, created_at=now) for row in rows]
+
+        if not rows:
+            return
+
+        if not self.enabled:
+            self._insert({model: rows})
+            return
+
+        self._ensure_worker()
+
+        # One deadline for the whole call, not one timeout per row
+        deadline = time.monotonic() + self.enqueue_timeout
+        overflow = []
+        for row in rows:
+            try:
+                if self.full_policy == 'block':
+                    self._queue.put((model, row), timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    self._queue.put_nowait((model, row))
+            except queue.Full:
+                overflow.append(row)
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+        if overflow:
+            if self.full_policy == 'block':
+                # Backpressure: the caller pays for the write instead of losing it,
+                # without committing or rolling back the caller's session
+                self._count('overflowed', len(overflow))
+                self._insert_apart({model: overflow})
+            else:
+                self._count('dropped', len(overflow))
+
+    def pending(self, model=None):
+        """
+        Rows not committed yet, optionally only those of one model
+
+        This includes rows the worker has taken from the queue and is still
+        inserting. A row may be committed just after it is returned here,
+        so callers that also query the table should expect to see it twice.
+        """
+        if self._queue is None:
+            return []
+
+        with self._in_flight_lock:
+            items = [item for batch in self._in_flight for item in batch]
+            with self._queue.mutex:
+                items.extend(self._queue.queue)
+
+        return [row for item_model, row in items if model is None or item_model is model]
+
+    def flush(self):
+        """Insert every queued row now and wait until they are written"""
+        if self._queue is None:
+            return
+
+        if self._worker is not None and self._worker.is_alive() and self._pid == os.getpid():
+            self._wake.set()
+            self._queue.join()
+            return
+
+        # No worker in this process, drain the queue here
+        with self.app.app_context():
+            self._write_batch(self._drain(None))
+
+    def stats(self):
+        """Get queue depth and write counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize() if self._queue is not None else 0
+        stats['enabled'] = self.enabled
+        return stats
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use, and again after a fork"""
+        if self._worker is not None and self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._worker is not None and self._pid == os.getpid():
+                return
+
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+            with self.app.app_context():
+                while not self._queue.empty():
+                    self._write_batch(self._drain(self.batch_size))
+
+    def _drain(self, limit):
+        """Take up to limit queued rows (all of them for None), keeping them visible to pending()"""
+        items = []
+        with self._in_flight_lock:
+            while limit is None or len(items) < limit:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items:
+                self._in_flight.append(items)
+        return items
+
+    def _write_batch(self, items):
+        """Insert queued (model, row) items as one batch"""
+        if not items:
+            return
+
+        groups = {}
+        for model, row in items:
+            groups.setdefault(model, []).append(row)
+
+        started = time.perf_counter()
+        try:
+            self._insert(groups)
+            self._count('written', len(items))
+            self._count('batches', 1)
+        except Exception:
+            self.app.logger.exception(
+                'Write-behind batch of %d rows failed after %.3fs', len(items), time.perf_counter() - started
+            )
+            self._count('failed', len(items))
+        finally:
+            with self._in_flight_lock:
+                self._in_flight = [batch for batch in self._in_flight if batch is not items]
+            for _ in items:
+                self._queue.task_done()
+
+    def _insert(self, groups):
+        """Insert {model: rows} in one transaction of the current session"""
+        session = self.db.session
+        try:
+            self._execute(session, groups)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def _insert_apart(self, groups):
+        """Insert {model: rows} in one transaction on a connection of its own, leaving the session alone"""
+        with self.db.engine.begin() as connection:
+            self._execute(connection, groups)
+
+    @staticmethod
+    def _execute(executor, groups):
+        """One executemany per table and key set, on a session or connection"""
+        for model, rows in groups.items():
+            by_keys = {}
+            for row in rows:
+                by_keys.setdefault(tuple(sorted(row)), []).append(row)
+            for key_rows in by_keys.values():
+                executor.execute(insert(model), key_rows)
+
+    def _count(self, name, amount):
+        with self._stats_lock:
+            self._stats[name] += amount
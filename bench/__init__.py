@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Speed and accuracy checks run by hand, outside the application package
+"""
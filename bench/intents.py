@@ -0,0 +1,213 @@
+"""
+Intent Benchmark
+Labelled chatbot messages for comparing intent detectors on speed and accuracy
+"""
+from app.modules.intents import IntentMatcher
+import argparse
+import time
+
+# Keyword table and first-match loop used by ChatbotEngine before IntentMatcher
+LEGACY_INTENTS = {
+    'greeting': ['hello', 'hi', 'hey', 'good morning', 'good afternoon'],
+    'budget_query': ['budget', 'price', 'cost', 'cheap', 'affordable', 'expensive', 'rm'],
+    'recommendation': ['recommend', 'suggest', 'find', 'looking for', 'need', 'want'],
+    'comparison': ['compare', 'difference', 'vs', 'versus', 'better'],
+    'specification': ['specs', 'specification', 'camera', 'battery', 'ram', 'storage', 'screen'],
+    'brand_query': ['brand', 'samsung', 'apple', 'iphone', 'xiaomi', 'huawei'],
+    'help': ['help', 'how', 'what can you do'],
+    'usage_type': ['gaming', 'photography', 'camera', 'business', 'work', 'social media', 'entertainment']
+}
+
+def legacy_detect_intent(message):
+    """Substring loop returning the first matching intent in dict order"""
+    message_lower = message.lower()
+
+    for intent, keywords in LEGACY_INTENTS.items():
+        for keyword in keywords:
+            if keyword in message_lower:
+                return intent
+
+    return 'general'
+
+# (message, expected intent) pairs the keyword weights were tuned on
+TUNING_CORPUS = (
+    ('hi', 'greeting'),
+    ('Hello there', 'greeting'),
+    ('hey', 'greeting'),
+    ('Good morning!', 'greeting'),
+    ('good evening dialsmart', 'greeting'),
+    ('Show me budget options', 'budget_query'),
+    ('Budget options', 'budget_query'),
+    ('phones under RM2000', 'budget_query'),
+    ('Find me a phone under RM2000', 'budget_query'),
+    ('anything cheap?', 'budget_query'),
+    ('cheapest phones you have', 'budget_query'),
+    ('what is the price range for phones between rm1000 and rm1500', 'budget_query'),
+    ('affordable phones please', 'budget_query'),
+    ('my budget is rm800', 'budget_query'),
+    ('Find a phone', 'recommendation'),
+    ('can you recommend a phone for me', 'recommendation'),
+    ('what would you suggest?', 'recommendation'),
+    ('I am looking for a new phone', 'recommendation'),
+    ('I need a new phone with 5G', 'recommendation'),
+    ('recommended phones with 8gb ram', 'recommendation'),
+    ('Compare phones', 'comparison'),
+    ('iPhone 15 vs Galaxy S24', 'comparison'),
+    ('what is the difference between the pixel and the galaxy', 'comparison'),
+    ('compare samsung and xiaomi', 'comparison'),
+    ('redmi note 13 versus poco x6', 'comparison'),
+    ('which is better, iphone or samsung', 'comparison'),
+    ('which is better for photos', 'usage_type'),
+    ('Best phones for gaming', 'usage_type'),
+    ('what is the best camera phone under RM2000', 'usage_type'),
+    ('I need a phone with good camera', 'usage_type'),
+    ('good phone for photography', 'usage_type'),
+    ('a phone for business use', 'usage_type'),
+    ('phone for work and emails', 'usage_type'),
+    ('best for social media', 'usage_type'),
+    ('I watch a lot of videos', 'usage_type'),
+    ('entertainment and movies', 'usage_type'),
+    ('gaming phone under rm1500', 'usage_type'),
+    ('Show me Samsung phones', 'brand_query'),
+    ('Popular brands', 'brand_query'),
+    ('do you have any xiaomi models', 'brand_query'),
+    ('latest iphones', 'brand_query'),
+    ('huawei phones please', 'brand_query'),
+    ('what brands do you sell', 'brand_query'),
+    ('show me the specs', 'specification'),
+    ('full specifications please', 'specification'),
+    ('phones with a big battery', 'specification'),
+    ('how much ram do I need', 'specification'),
+    ('which has more storage', 'specification'),
+    ('help', 'help'),
+    ('what can you do', 'help'),
+    ('how does this work', 'help'),
+    ('thanks', 'general'),
+    ('this is nice', 'general'),
+    ('ok', 'general'),
+    ('which one ships fastest', 'general'),
+    ('is this available in stores', 'general'),
+    ('tell me something', 'general'),
+)
+
+# Written after the weights were set and never used to change them, so its
+# accuracy is what to expect of messages nobody has looked at
+HELD_OUT_CORPUS = (
+    ('hey there!', 'greeting'),
+    ('Hi, anyone here?', 'greeting'),
+    ('good afternoon', 'greeting'),
+    ('hello dialsmart team', 'greeting'),
+    ('what can I get for rm1200', 'budget_query'),
+    ('is the s24 too expensive?', 'budget_query'),
+    ('Cheap phone with good battery', 'budget_query'),
+    ('how much does the pixel 8 cost', 'budget_query'),
+    ('prices of phones below rm900', 'budget_query'),
+    ('my budget is tight', 'budget_query'),
+    ('suggest something for my mum', 'recommendation'),
+    ('I want a small phone', 'recommendation'),
+    ('recommend me something new', 'recommendation'),
+    ('looking for a replacement phone', 'recommendation'),
+    ('help me find a good phone', 'recommendation'),
+    ('what do you recommend for students', 'recommendation'),
+    ('galaxy a55 vs redmi note 13 pro', 'comparison'),
+    ('compare the pixel 8 and iphone 15', 'comparison'),
+    ('is the oneplus better than the poco', 'comparison'),
+    ('difference between 128gb and 256gb models', 'comparison'),
+    ('good phone for mobile gaming', 'usage_type'),
+    ('which one takes the best photos', 'usage_type'),
+    ('phone for watching movies on the train', 'usage_type'),
+    ('I use my phone for work calls all day', 'usage_type'),
+    ('best camera for instagram and social media', 'usage_type'),
+    ('any good gaming phones', 'usage_type'),
+    ('what apple phones do you have', 'brand_query'),
+    ('show me huawei', 'brand_query'),
+    ('list xiaomi phones', 'brand_query'),
+    ('which brand is most reliable', 'brand_query'),
+    ('samsung foldables', 'brand_query'),
+    ('screen size of the galaxy s24', 'specification'),
+    ('does it have 12gb ram', 'specification'),
+    ('battery capacity of the redmi note 13', 'specification'),
+    ('tell me the specs of the pixel 8', 'specification'),
+    ('how do I compare phones here', 'help'),
+    ('can you help me', 'help'),
+    ('how does the recommendation work', 'help'),
+    ('thank you!', 'general'),
+    ('cool', 'general'),
+    ('do you deliver to penang', 'general'),
+    ('what is 5g', 'general'),
+)
+
+def run_intent_benchmark(repeat=200, corpus=HELD_OUT_CORPUS):
+    """
+    Time and score the legacy loop and the compiled matcher on a labelled corpus
+
+    The compiled matcher is timed cold, with every memo cleared before
+    each message, which is what a new process or an unseen message costs;
+    warm with its message cache off, once its token memos have filled;
+    and with the message cache on. The detectors take turns, one pass
+    over the corpus each, and the fastest pass of each is kept, which
+    evens out a noisy machine.
+
+    Args:
+        repeat: Number of passes over the corpus for timing
+        corpus: Sequence of (message, expected intent)
+
+    Returns:
+        Dictionary keyed by detector name with accuracy, microseconds per
+        message, and the misclassified (message, expected, got) triples
+    """
+    cold = IntentMatcher()
+
+    def cold_detect(message):
+        cold.clear()
+        return cold.detect(message)
+
+    detectors = {
+        'legacy': legacy_detect_intent,
+        'compiled, cold': cold_detect,
+        'compiled, warm': IntentMatcher(cache_size=0).detect,
+        'compiled, repeated messages cached': IntentMatcher().detect
+    }
+    messages = [message for message, _ in corpus]
+
+    fastest = dict.fromkeys(detectors, float('inf'))
+    for _ in range(repeat):
+        for name, detect in detectors.items():
+            started = time.perf_counter()
+            for message in messages:
+                detect(message)
+            fastest[name] = min(fastest[name], time.perf_counter() - started)
+
+    results = {}
+    for name, detect in detectors.items():
+        errors = [
+            (message, expected, got)
+            for message, expected in corpus
+            for got in [detect(message)]
+            if got != expected
+        ]
+
+        results[name] = {
+            'accuracy': 1 - len(errors) / len(corpus),
+            'us_per_message': fastest[name] / len(corpus) * 1e6,
+            'errors': errors
+        }
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare chatbot intent detectors on labelled message corpora')
+    parser.add_argument('--repeat', type=int, default=200, help='Passes over each corpus for timing')
+    parser.add_argument('--verbose', action='store_true', help='Print every misclassified message')
+    args = parser.parse_args()
+
+    for split, corpus in (('tuning', TUNING_CORPUS), ('held-out', HELD_OUT_CORPUS)):
+        print(f"{split} ({len(corpus)} messages)")
+        for name, result in run_intent_benchmark(repeat=args.repeat, corpus=corpus).items():
+            print(f"  {name}: {result['accuracy']:.1%} accurate, {result['us_per_message']:.2f} us/message")
+            if args.verbose:
+                for message, expected, got in result['errors']:
+                    print(f"      {message!r}: expected {expected}, got {got}")
+
+if __name__ == '__main__':
+    main()
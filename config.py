@@ -27,9 +27,43 @@ class Config:
     # Pagination
     ITEMS_PER_PAGE = 12
     ADMIN_ITEMS_PER_PAGE = 20
+    PAGINATION_COUNT_TTL = 60  # Seconds to cache totals in cursor mode
+    SEARCH_MAX_LIMIT = 50  # Most results /api/phones/search returns at once
+
+    # Catalog import settings
+    CATALOG_CSV_PATH = os.path.join(BASE_DIR, 'fyp_phoneDataset.csv')
+    CATALOG_IMPORT_BATCH_SIZE = 500
 
     # AI Model settings
     AI_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'recommendation_model.pkl')
+    RECOMMENDATION_BATCH_LIMIT = 1000  # Max users/criteria per batch request
+    RECOMMENDATION_MAX_TOP_N = 50  # Larger top_n requests are capped to this
+    SIMILAR_PHONES_K = 10  # Neighbours precomputed per phone
+
+    # Write-behind queue for history rows ('block' waits, then writes in the request; 'drop' discards)
+    WRITE_BEHIND_ENABLED = True
+    WRITE_BEHIND_BATCH_SIZE = 200
+    WRITE_BEHIND_FLUSH_INTERVAL = 1.0  # Seconds
+    WRITE_BEHIND_QUEUE_SIZE = 10000
+    WRITE_BEHIND_FULL_POLICY = 'block'
+    WRITE_BEHIND_ENQUEUE_TIMEOUT = 0.05  # Seconds
+
+    # Recommendation result cache ('memory', or 'redis' with the redis package)
+    RECOMMENDATION_CACHE_BACKEND = os.environ.get('RECOMMENDATION_CACHE_BACKEND') or 'memory'
+    RECOMMENDATION_CACHE_SIZE = 1024
+    RECOMMENDATION_CACHE_REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+
+    # Most phones compared side by side at once
+    COMPARE_MAX_PHONES = 4
+
+    # Comparison tables cached per set of phones and catalog version
+    COMPARISON_CACHE_SIZE = 512
+    COMPARISON_CACHE_WARM_PAIRS = 50  # Most compared pairs precomputed at startup (0 to skip)
+
+    # Chatbot conversation context, kept in memory per chat session
+    CHAT_CONTEXT_TTL = 1800  # Seconds since the session's last message
+    CHAT_CONTEXT_MAX_SESSIONS = 10000
+    CHAT_CONTEXT_MAX_BYTES = 32 * 1024 * 1024
 
     # Malaysian Ringgit price ranges
     PRICE_RANGES = {
@@ -59,6 +93,8 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WRITE_BEHIND_ENABLED = False  # Write history synchronously
+    COMPARISON_CACHE_WARM_PAIRS = 0
 
 # Configuration dictionary
 config = {
@@ -3,6 +3,7 @@ DialSmart Application Entry Point
 Run this file to start the DialSmart web application
 """
 import os
+import click
 from app import create_app, db
 from app.models import User, Brand, Phone, PhoneSpecification
 
@@ -25,6 +26,12 @@ def init_db():
     """Initialize the database"""
     print("Creating database tables...")
     db.create_all()
+
+    # create_all skips indexes of tables that already exist
+    from app.utils.schema import add_missing_indexes
+    for table in db.metadata.sorted_tables:
+        add_missing_indexes(db, table)
+
     print("Database tables created successfully!")
 
 @app.cli.command()
@@ -284,6 +291,85 @@ def seed_data():
     print("Email: user@dialsmart.my")
     print("Password: password123")
 
+@app.cli.command()
+@click.argument('csv_path', required=False)
+@click.option('--sync', is_flag=True, help='Update changed phones and deactivate removed ones')
+def import_catalog(csv_path, sync):
+    """Import phones from the dataset CSV"""
+    from app.modules.catalog_import import CatalogImporter
+    from app.modules.similarity import rebuild_similarity_index, update_similarity_index
+
+    csv_path = csv_path or app.config['CATALOG_CSV_PATH']
+    importer = CatalogImporter(batch_size=app.config['CATALOG_IMPORT_BATCH_SIZE'])
+
+    if sync:
+        print(f"Syncing catalog with {csv_path}...")
+        stats = importer.sync_csv(csv_path)
+        print(f"Inserted {stats['inserted']}, updated {stats['updated']}, "
+              f"deactivated {stats['deactivated']}, unchanged {stats['unchanged']} phones "
+              f"({stats['skipped']} duplicate, {stats['invalid']} invalid rows)")
+    else:
+        print(f"Importing catalog from {csv_path}...")
+        stats = importer.import_csv(csv_path)
+        print(f"Imported {stats['inserted']} phones "
+              f"({stats['skipped']} already present, {stats['invalid']} invalid rows)")
+
+    rate = stats['rows'] / stats['elapsed'] if stats['elapsed'] else 0
+    print(f"Processed {stats['rows']} rows in {stats['elapsed']:.3f}s ({rate:,.0f} rows/s)")
+
+    # The similar-phones index is only updated here and by build-similarity-index
+    if sync and stats['changed_ids']:
+        print(f"Updated similar phones of {update_similarity_index(stats['changed_ids'])} phones")
+    elif not sync and stats['inserted']:
+        print(f"Indexed similar phones of {rebuild_similarity_index()} phones")
+
+@app.cli.command()
+def backfill_spec_columns():
+    """Fill the parsed RAM, storage and charging columns of all phones"""
+    from app.modules.catalog import backfill_spec_columns as backfill
+    from app.modules.similarity import rebuild_similarity_index
+
+    print("Backfilling parsed specification columns...")
+    updated = backfill()
+    print(f"Updated {updated} phone specifications")
+
+    # RAM and storage are similarity features
+    if updated:
+        print(f"Indexed similar phones of {rebuild_similarity_index()} phones")
+
+@app.cli.command()
+def build_similarity_index():
+    """Recompute the similar-phones index for the whole catalog"""
+    import time
+    from app.modules.similarity import rebuild_similarity_index
+
+    print("Building similar-phones index...")
+    start = time.perf_counter()
+    indexed = rebuild_similarity_index()
+    print(f"Indexed {indexed} phones in {time.perf_counter() - start:.3f}s")
+
+@app.cli.command()
+@click.option('--verbose', is_flag=True, help='Print the plan of every query')
+def check_query_plans(verbose):
+    """Fail if any phone listing query falls back to a full table scan"""
+    import sys
+    from app.modules.query_plans import check_listing_query_plans
+
+    results = check_listing_query_plans()
+    failures = [result for result in results if result['full_scans']]
+
+    for result in results:
+        status = 'FULL SCAN' if result['full_scans'] else 'ok'
+        if verbose or result['full_scans']:
+            print(f"[{status}] {result['name']}")
+            for detail in result['plan']:
+                print(f"    {detail}")
+
+    print(f"{len(results) - len(failures)}/{len(results)} listing queries use an index")
+
+    if failures:
+        sys.exit(1)
+
 if __name__ == '__main__':
     # Run the application
     app.run(
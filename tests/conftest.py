@@ -0,0 +1,70 @@
+"""
+Test Fixtures
+Testing application with the dataset CSV imported into an in-memory database
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, db
+from app.modules.catalog_import import CatalogImporter
+import pytest
+import uuid
+
+@pytest.fixture(scope='session')
+def app():
+    """Application on TestingConfig with the full CSV catalog imported once"""
+    app = create_app('testing')
+
+    with app.app_context():
+        CatalogImporter(batch_size=app.config['CATALOG_IMPORT_BATCH_SIZE']).import_csv(
+            app.config['CATALOG_CSV_PATH']
+        )
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_user(app):
+    """Factory for users with a unique email"""
+    from app.models import User
+
+    def make(**fields):
+        user = User(email=f'{uuid.uuid4().hex}@test.my', full_name='Test User', **fields)
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return make
+
+@pytest.fixture
+def admin_client(client, make_user):
+    """Test client logged in as a new admin user"""
+    admin = make_user(is_admin=True)
+    client.post('/auth/login', data={'email': admin.email, 'password': 'password'})
+    return client
+
+class QueryCounter:
+    """Number of SQL statements sent to the database"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager counting the SQL statements run inside it"""
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', counter)
+
+    return counting
@@ -0,0 +1,122 @@
+"""
+Cache Tests
+LRU eviction and counters of both backends, and recommendation entries dropped after catalog writes
+"""
+from app.modules import get_recommendation_engine
+from app.modules.ai_engine import get_recommendation_cache
+from app.modules.catalog import invalidate_catalog
+from app.utils.cache import LRUCache, RedisLRUCache
+import fnmatch
+import pytest
+
+class MemoryRedis:
+    """The few Redis commands RedisLRUCache uses, on plain dicts"""
+
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return value.encode() if isinstance(value, str) else value
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.sorted_sets.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.sorted_sets.get(key, {}))
+
+    def zrange(self, key, start, end):
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])
+        return [member.encode() for member, _ in members[start:end + 1]]
+
+    def zremrangebyrank(self, key, start, end):
+        for member in self.zrange(key, start, end):
+            del self.sorted_sets[key][member.decode()]
+
+    def scan_iter(self, pattern):
+        return [key for key in [*self.values, *self.sorted_sets] if fnmatch.fnmatch(key, pattern)]
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+@pytest.fixture(params=['memory', 'redis'])
+def cache(request):
+    if request.param == 'memory':
+        return LRUCache(maxsize=2)
+    return RedisLRUCache(MemoryRedis(), 'test', maxsize=2)
+
+def test_least_recently_used_is_evicted(cache):
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+
+    cache.set('c', 3)
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+def test_hits_and_misses_are_counted(cache):
+    cache.set('a', [1, 'x'])
+    cache.get('a')
+    cache.get('a')
+    cache.get('missing')
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3, abs=1e-4)
+
+def test_redis_generation_survives_restarts_and_follows_invalidation():
+    client = MemoryRedis()
+    cache = RedisLRUCache(client, 'test')
+    assert cache.generation(catalog_version=5) == 0
+
+    cache.invalidate()
+
+    # A restarted worker restarts its catalog version, not the shared generation
+    restarted = RedisLRUCache(client, 'test')
+    assert restarted.generation(catalog_version=0) == 1
+
+def test_catalog_write_invalidates_recommendations(app, make_user):
+    engine = get_recommendation_engine()
+    cache = get_recommendation_cache()
+    user = make_user()
+    criteria = {'min_budget': 1200, 'max_budget': 2400}
+
+    engine.get_recommendations(user.id, criteria=criteria, top_n=3)
+    hits = cache.hits
+    engine.get_recommendations(user.id, criteria=criteria, top_n=3)
+    assert cache.hits == hits + 1
+
+    invalidate_catalog([])
+    misses = cache.misses
+    result = engine.get_recommendations(user.id, criteria=criteria, top_n=3)
+
+    assert cache.misses == misses + 1
+    assert len(result) == 3
+
+def test_catalog_write_bumps_shared_generation(app, monkeypatch):
+    from app.modules.services import get_services
+
+    shared = RedisLRUCache(MemoryRedis(), 'test')
+    monkeypatch.setattr(get_services(), 'recommendation_cache', shared)
+
+    invalidate_catalog([1])
+
+    assert shared.generation(catalog_version=0) == 1
@@ -0,0 +1,54 @@
+"""
+Catalog Fetch Tests
+Phones load with their specifications and brand without one query per phone
+"""
+from app.models import Brand, Phone
+from app.modules.catalog import get_catalog_phones, get_phones_by_ids
+
+def test_catalog_listing_is_one_query(app, count_queries):
+    with count_queries() as queries:
+        phones = get_catalog_phones(order_by=Phone.price)
+        details = [(phone.brand.name, phone.specifications.ram_options) for phone in phones]
+
+    assert len(details) > 600
+    assert queries.count == 1
+
+def test_get_phones_by_ids_is_one_query_in_requested_order(app, count_queries):
+    phone_ids = [phone_id for (phone_id,) in Phone.query.with_entities(Phone.id).order_by(Phone.id.desc()).limit(20)]
+    requested = phone_ids[::3] + phone_ids[1::3] + [10 ** 9]
+
+    with count_queries() as queries:
+        phones = get_phones_by_ids(requested)
+        details = [(phone.brand.name, phone.specifications.battery_capacity) for phone in phones]
+
+    assert queries.count == 1
+    assert [phone.id for phone in phones] == requested[:-1]
+    assert len(details) == len(requested) - 1
+
+def test_recommendations_do_not_query_per_phone(app, make_user, count_queries):
+    from app.modules import get_recommendation_engine
+
+    engine = get_recommendation_engine()
+    user = make_user()
+    criteria = {'min_budget': 100, 'max_budget': 10000}
+    engine.get_recommendations(user.id, criteria=criteria, top_n=5)
+
+    # Budgets differ so neither call is served from the recommendation cache
+    with count_queries() as few:
+        top_5 = engine.get_recommendations(user.id, criteria=dict(criteria, max_budget=10001), top_n=5)
+    with count_queries() as many:
+        top_50 = engine.get_recommendations(user.id, criteria=dict(criteria, max_budget=10002), top_n=50)
+
+    assert len(top_5) == 5
+    assert len(top_50) == 50
+    assert many.count == few.count
+
+def test_brand_page_shows_catalog_stats(app, client):
+    brand = Brand.query.join(Phone).filter(Phone.is_active == True).first()
+    phones = Phone.query.filter_by(brand_id=brand.id, is_active=True).all()
+
+    response = client.get(f'/phone/brand/{brand.id}')
+
+    assert response.status_code == 200
+    assert f'{len(phones)} Models'.encode() in response.data
+    assert f'RM {max(phone.price for phone in phones):,.0f}'.encode() in response.data
@@ -0,0 +1,35 @@
+"""
+Chatbot Conversation Tests
+Follow-up messages read only the context of the same user's session
+"""
+from app.modules.chatbot import ChatbotEngine
+
+def test_session_context_is_per_user(app, make_user):
+    chatbot = ChatbotEngine()
+    first, second = make_user(), make_user()
+
+    chatbot.process_message(first.id, 'phones under RM2000', session_id='shared')
+    reply = chatbot.process_message(second.id, 'with 5G', session_id='shared')
+
+    # The second user's bare follow-up has no earlier turn to continue
+    assert 'phones' not in reply.get('metadata', {})
+    assert chatbot.contexts.get((second.id, 'shared')) is None
+
+    chatbot.process_message(first.id, 'with 5G', session_id='shared')
+    criteria = chatbot.contexts.get((first.id, 'shared')).criteria
+    assert (criteria.max_budget, criteria.requires_5g) == (2000, True)
+
+def test_streamed_turn_is_saved_when_client_disconnects(app, make_user):
+    chatbot = ChatbotEngine()
+    user = make_user()
+
+    events = chatbot.stream_message(user.id, 'phones under RM2000', session_id='closed')
+    for event, _ in events:
+        if event == 'message':
+            break
+
+    # Flask closes the generator at the yield it is paused on when the client goes away
+    events.close()
+
+    history = chatbot.get_chat_history(user.id, session_id='closed')
+    assert [turn.message for turn in history] == ['phones under RM2000']
@@ -0,0 +1,85 @@
+"""
+Intent Matcher Tests
+Word boundaries, phrases, and the token and message memos of IntentMatcher
+"""
+from app.modules.intents import IntentMatcher
+from bench.intents import HELD_OUT_CORPUS, TUNING_CORPUS, legacy_detect_intent
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+@pytest.fixture(params=[0, 1024], ids=['uncached', 'cached'])
+def matcher(request):
+    return IntentMatcher(cache_size=request.param)
+
+@pytest.mark.parametrize('message, expected', [
+    ('hi', 'greeting'),
+    ('is this phone good', 'general'),  # 'hi' inside 'this'
+    ('anything under RM2000?', 'budget_query'),  # 'rm' at the start of 'rm2000'
+    ('good morning!', 'greeting'),
+    ('good\tmorning', 'greeting'),
+    ('how does this work', 'help'),
+    ('recommended phones for photography', 'usage_type'),
+    ('samsung vs apple', 'comparison'),
+    ('best camera phone under RM2000', 'usage_type'),
+    ('', 'general')
+])
+def test_detect(matcher, message, expected):
+    assert matcher.detect(message) == expected
+
+def test_phrase_consumes_its_keywords(matcher):
+    # 'how does' scores 2.0 for help, a 'how' of its own adds SUPPORT_WEIGHT
+    assert matcher.rank('how does the battery last') == [('help', 0.7273), ('specification', 0.2727)]
+    assert matcher.rank('how does the battery last, how') == [('help', 0.7368), ('specification', 0.2632)]
+
+def test_phrase_words_apart_are_not_the_phrase(matcher):
+    assert matcher.detect('social life and media') == 'general'
+    assert matcher.detect('social media phone') == 'usage_type'
+
+def test_rank_agrees_with_detect(matcher):
+    for message in ['samsung battery price', 'compare the specs', 'hello, need a cheap phone', 'what can you do']:
+        ranked = matcher.rank(message)
+        assert ranked[0][0] == matcher.detect(message)
+        assert abs(sum(confidence for _, confidence in ranked) - 1.0) < 1e-3
+
+def test_results_survive_vocabulary_reset():
+    matcher = IntentMatcher(cache_size=0, vocabulary_size=5)
+    reference = IntentMatcher(cache_size=0)
+
+    messages = [f'word{i} samsung vs apple price{i}' for i in range(20)] + ['hi there', 'how does this work']
+    for message in messages * 2:
+        assert matcher.rank(message) == reference.rank(message)
+    assert len(matcher._results) <= 5
+
+def test_clear_forgets_everything():
+    matcher = IntentMatcher()
+    assert matcher.detect('samsung vs apple') == 'comparison'
+
+    matcher.clear()
+    assert not matcher._results and not matcher._message_results and not matcher._significant
+    assert matcher.detect('samsung vs apple') == 'comparison'
+
+def test_shared_between_threads():
+    # A small vocabulary makes the memos reset while other threads read them
+    matcher = IntentMatcher(cache_size=8, vocabulary_size=16)
+    reference = IntentMatcher(cache_size=0)
+
+    messages = [message for message, _ in TUNING_CORPUS + HELD_OUT_CORPUS]
+    messages += [f'word{i} samsung vs apple price{i}' for i in range(50)]
+    expected = [reference.rank(message) for message in messages]
+
+    def rank_all(_):
+        return [matcher.rank(message) for message in messages]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for ranked in pool.map(rank_all, range(16)):
+            assert ranked == expected
+
+def test_accuracy_on_tuning_and_held_out_messages():
+    matcher = IntentMatcher(cache_size=0)
+
+    def accuracy(detect, corpus):
+        return sum(detect(message) == expected for message, expected in corpus) / len(corpus)
+
+    assert accuracy(matcher.detect, TUNING_CORPUS) == 1.0
+    assert accuracy(matcher.detect, HELD_OUT_CORPUS) >= 0.9
+    assert accuracy(matcher.detect, HELD_OUT_CORPUS) > accuracy(legacy_detect_intent, HELD_OUT_CORPUS)
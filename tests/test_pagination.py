@@ -0,0 +1,43 @@
+"""
+Keyset Pagination Tests
+Cursor round trips, and forged cursors rejected as ValueError rather than database errors
+"""
+from datetime import datetime
+from app.models import Phone
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_order, keyset_query
+import base64
+import json
+import pytest
+
+def forge(payload):
+    """Cursor string for an arbitrary JSON payload"""
+    data = json.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30), 'Galaxy', 1999.0, 42, None]
+    assert decode_cursor(encode_cursor(values)) == values
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 json!',
+    forge({'dt': '2024-05-01'}),
+    forge([{'x': 1}, 1]),
+    forge([[1], 1]),
+    forge([{'dt': 5}, 1]),
+    forge([{'dt': 'yesterday'}, 1]),
+    forge([{'dt': '2024-05-01', 'x': 1}, 1])
+])
+def test_forged_cursor_is_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+@pytest.mark.parametrize('values', [[], [1], [datetime(2024, 5, 1), 1, 2]])
+def test_cursor_must_match_ordering(app, values):
+    order = keyset_order(Phone.created_at, Phone.id, descending=True)
+    with pytest.raises(ValueError):
+        keyset_query(Phone.query, order, encode_cursor(values))
+
+@pytest.mark.parametrize('payload', [[{'x': 1}, 1], [[1], 1]])
+def test_forged_cursor_is_bad_request(client, payload):
+    response = client.post('/api/phones/filter', json={'sort_by': 'price_low', 'cursor': forge(payload)})
+    assert response.status_code == 400
@@ -0,0 +1,44 @@
+"""
+Query Plan Tests
+Every listing query is answered from an index on the imported catalog
+"""
+from app.modules.query_plans import check_listing_query_plans
+import pytest
+
+INDEXED_TABLES = ('phones', 'phone_specifications')
+
+@pytest.fixture(scope='module')
+def plans(app):
+    return check_listing_query_plans()
+
+def test_every_listing_query_is_explained(plans):
+    names = [result['name'] for result in plans]
+
+    for family in ('browse', 'browse by brand', 'api filter', 'admin phones', 'admin users', 'admin logs'):
+        assert any(name.startswith(family) for name in names)
+    assert all(result['plan'] for result in plans)
+
+@pytest.mark.parametrize('table', INDEXED_TABLES)
+def test_no_full_scan_of_catalog_tables(plans, table):
+    scans = [
+        f"{result['name']}: {detail}"
+        for result in plans
+        for detail in result['full_scans']
+        if detail.split()[1] == table
+    ]
+    assert scans == []
+
+def test_no_full_scan_at_all(plans):
+    assert [(result['name'], result['full_scans']) for result in plans if result['full_scans']] == []
+
+@pytest.mark.parametrize('filter_name, index', [
+    ('RAM', 'ix_phone_specifications_max_ram_gb'),
+    ('storage', 'ix_phone_specifications_max_storage_gb'),
+    ('battery', 'ix_phone_specifications_battery_capacity')
+])
+def test_spec_filters_use_their_index(plans, filter_name, index):
+    filtered = [result for result in plans if f', {filter_name}, ' in result['name']]
+
+    assert filtered
+    for result in filtered:
+        assert any(f'USING INDEX {index} ' in detail for detail in result['plan']), result['name']
@@ -0,0 +1,41 @@
+"""
+Recommendation Engine Tests
+Batch recommendations for mixed user IDs and criteria sets, and top_n checks of the API
+"""
+from app.models import Recommendation
+from app.modules import get_recommendation_engine
+from app.modules.entities import ChatCriteria
+import pytest
+
+def test_batch_mixes_user_ids_dicts_and_chat_criteria(app, make_user):
+    user = make_user()
+    items = [user.id, {'min_budget': 1000, 'max_budget': 2000}, ChatCriteria(min_budget=2000, max_budget=4000),
+             10 ** 9]
+
+    saved_before = Recommendation.query.count()
+    results = get_recommendation_engine().get_recommendations_batch(items, top_n=3)
+
+    assert [len(result) for result in results[:3]] == [3, 3, 3]
+    assert results[3] == []
+    assert all(2000 <= rec['phone'].price <= 4000 for rec in results[2])
+
+    # Only the user ID's recommendations are saved to history
+    assert Recommendation.query.filter_by(user_id=user.id).count() == 3
+    assert Recommendation.query.count() == saved_before + 3
+
+@pytest.mark.parametrize('top_n', [0, -1, '3', True, None, 2.5])
+@pytest.mark.parametrize('url, body', [
+    ('/api/recommendations', {'criteria': {'min_budget': 1000, 'max_budget': 3000}}),
+    ('/api/recommendations/batch', {'items': [{'min_budget': 1000, 'max_budget': 3000}]})
+])
+def test_invalid_top_n_is_bad_request(admin_client, url, body, top_n):
+    response = admin_client.post(url, json=dict(body, top_n=top_n))
+    assert response.status_code == 400
+
+def test_batch_top_n_is_capped(app, admin_client):
+    items = [{'min_budget': 100, 'max_budget': 10000}, {'min_budget': 100, 'max_budget': 10000}]
+    response = admin_client.post('/api/recommendations/batch', json={'items': items, 'top_n': 10 ** 6})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [len(result['recommendations']) for result in results] == [app.config['RECOMMENDATION_MAX_TOP_N']] * 2
@@ -0,0 +1,69 @@
+"""
+Schema Upgrade Tests
+Columns added to models since a database was created are added on startup
+"""
+from contextlib import contextmanager
+from sqlalchemy import inspect
+from app import create_app, db, history_writer
+from app.models import Phone, PhoneSpecification
+from config import TestingConfig, config
+import sqlite3
+
+def create_old_table(path, model, missing, row):
+    """Create a model's table without some of its columns, holding one row"""
+    columns = [column for column in model.__table__.columns if column.name not in missing]
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE {} ({})'.format(model.__tablename__, ', '.join(
+        f'{column.name} {column.type.compile(db.engine.dialect)}' for column in columns
+    )))
+    connection.execute('INSERT INTO {} ({}) VALUES ({})'.format(
+        model.__tablename__, ', '.join(row), ', '.join('?' for _ in row)
+    ), list(row.values()))
+    connection.commit()
+    connection.close()
+
+@contextmanager
+def upgraded_app(app, path, monkeypatch):
+    """Start the application on an old database file, restoring the shared writer afterwards"""
+    class UpgradeConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    monkeypatch.setitem(config, 'upgrade', UpgradeConfig)
+    try:
+        upgraded = create_app('upgrade')
+        with upgraded.app_context():
+            yield upgraded
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        history_writer.init_app(app)
+
+def test_startup_adds_phone_source_columns(app, tmp_path, monkeypatch):
+    path = tmp_path / 'old.db'
+
+    # A phones table from before source_url and content_hash
+    create_old_table(path, Phone, ('source_url', 'content_hash'),
+                     {'id': 1, 'brand_id': 1, 'model_name': 'Old', 'price': 999, 'is_active': 1})
+
+    with upgraded_app(app, path, monkeypatch):
+        inspector = inspect(db.engine)
+        assert {'source_url', 'content_hash'} <= {column['name'] for column in inspector.get_columns('phones')}
+        assert 'ix_phones_source_url' in {index['name'] for index in inspector.get_indexes('phones')}
+        assert db.session.get(Phone, 1).source_url is None
+
+def test_startup_adds_and_fills_parsed_spec_columns(app, tmp_path, monkeypatch):
+    path = tmp_path / 'old.db'
+    parsed = ('min_ram_gb', 'max_ram_gb', 'max_storage_gb', 'charging_watts')
+
+    create_old_table(path, Phone, (), {'id': 1, 'brand_id': 1, 'model_name': 'Old', 'price': 999, 'is_active': 1})
+    create_old_table(path, PhoneSpecification, parsed, {
+        'id': 1, 'phone_id': 1, 'ram_options': '8GB, 12GB', 'storage_options': '256GB, 1TB',
+        'charging_speed': '67W wired'
+    })
+
+    with upgraded_app(app, path, monkeypatch):
+        indexes = {index['name'] for index in inspect(db.engine).get_indexes('phone_specifications')}
+        assert {'ix_phone_specifications_max_ram_gb', 'ix_phone_specifications_battery_capacity'} <= indexes
+
+        specs = db.session.get(PhoneSpecification, 1)
+        assert (specs.min_ram_gb, specs.max_ram_gb, specs.max_storage_gb, specs.charging_watts) == (8, 12, 1024, 67)
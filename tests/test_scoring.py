@@ -0,0 +1,71 @@
+"""
+Match Scoring Tests
+Vectorized scores against calculate_match_score, and top-N selection
+"""
+from types import SimpleNamespace
+from app.modules.catalog import get_catalog_snapshot, get_phones_by_ids
+from app.modules.scoring import calculate_match_scores, preference_matrix, preference_vector, top_n_indices
+from app.utils.helpers import calculate_match_score
+import numpy as np
+import pytest
+
+PREFERENCE_SETS = [
+    dict(min_budget=500, max_budget=5000, min_ram=4, min_storage=64, min_camera=12, min_battery=3000,
+         requires_5g=False, min_screen_size=5.5, max_screen_size=7.0),
+    dict(min_budget=1000, max_budget=2000, min_ram=8, min_storage=128, min_camera=48, min_battery=5000,
+         requires_5g=True, min_screen_size=6.0, max_screen_size=6.8),
+    dict(min_budget=3000, max_budget=7000, min_ram=12, min_storage=256, min_camera=50, min_battery=4500,
+         requires_5g=True, min_screen_size=6.5, max_screen_size=7.5),
+    dict(min_budget=100, max_budget=800, min_ram=2, min_storage=32, min_camera=8, min_battery=4000,
+         requires_5g=False, min_screen_size=6.0, max_screen_size=7.0),
+    dict(min_budget=1500, max_budget=1499, min_ram=6, min_storage=512, min_camera=200, min_battery=6000,
+         requires_5g=True, min_screen_size=7.0, max_screen_size=8.0)
+]
+
+@pytest.fixture(scope='module')
+def catalog(app):
+    snapshot = get_catalog_snapshot()
+    phones = get_phones_by_ids(snapshot.phone_ids.tolist())
+    assert [phone.id for phone in phones] == snapshot.phone_ids.tolist()
+    return snapshot, phones
+
+@pytest.mark.parametrize('fields', PREFERENCE_SETS)
+def test_scores_match_scalar_function(catalog, fields):
+    snapshot, phones = catalog
+    prefs = SimpleNamespace(**fields)
+
+    expected = [calculate_match_score(prefs, phone, phone.specifications) for phone in phones]
+    scores = calculate_match_scores(snapshot, preference_vector(prefs))
+
+    assert len(phones) > 600
+    assert scores.tolist() == expected
+
+def test_preference_matrix_scores_every_set_at_once(catalog):
+    snapshot, _ = catalog
+    prefs_list = [SimpleNamespace(**fields) for fields in PREFERENCE_SETS]
+
+    matrix = calculate_match_scores(snapshot, preference_matrix(prefs_list))
+
+    assert matrix.shape == (len(prefs_list), len(snapshot))
+    for row, prefs in zip(matrix, prefs_list):
+        assert row.tolist() == calculate_match_scores(snapshot, preference_vector(prefs)).tolist()
+
+def test_top_n_breaks_ties_by_position():
+    scores = np.array([50.0, 90.0, 70.0, 90.0, 70.0, 70.0, 10.0])
+
+    assert top_n_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_n_indices(scores, 5).tolist() == [1, 3, 2, 4, 5]
+    assert top_n_indices(scores, 20).tolist() == [1, 3, 2, 4, 5, 0, 6]
+
+def test_top_n_min_score():
+    scores = np.array([50.0, 90.0, 70.0, 90.0, 70.0, 70.0, 10.0])
+
+    assert top_n_indices(scores, 10, min_score=70).tolist() == [1, 3, 2, 4, 5]
+    assert top_n_indices(scores, 2, min_score=70).tolist() == [1, 3]
+    assert top_n_indices(scores, 3, min_score=95).tolist() == []
+
+def test_top_n_non_positive():
+    scores = np.array([50.0, 90.0])
+
+    assert top_n_indices(scores, 0).tolist() == []
+    assert top_n_indices(scores, -1).tolist() == []
@@ -0,0 +1,70 @@
+"""
+Phone Search Tests
+Matching, ranking and paging of the phone search index on both backends
+"""
+from app import db
+from app.models import Phone
+from app.modules.catalog import invalidate_catalog
+from app.modules.search import PhoneSearchIndex, fts5_available
+import pytest
+
+QUERIES = ['samsung galaxy', 'galaxy s2', 'galxy', 'redmi note', 'pixl 8', 'xiaom', 'snapdrgon 8 gen', 'android 14']
+
+@pytest.fixture(params=[
+    'memory',
+    pytest.param('fts5', marks=pytest.mark.skipif(not fts5_available(), reason='sqlite3 built without FTS5'))
+])
+def index(app, request):
+    return PhoneSearchIndex(use_fts5=request.param == 'fts5')
+
+def model_names(phone_ids):
+    return [db.session.get(Phone, phone_id).model_name for phone_id in phone_ids]
+
+def test_prefix_matches_partly_typed_words(index):
+    assert model_names(index.search('iphon 15 pro m')) == ['iPhone 15 Pro Max']
+    assert all(name.startswith('Xiaomi') for name in model_names(index.search('xiaom')))
+
+def test_typos_are_corrected(index):
+    assert model_names(index.search('galxy s24', limit=1)) == model_names(index.search('galaxy s24', limit=1))
+    assert 'Google Pixel 8' in model_names(index.search('pixl 8'))
+    assert index.search('qwertyuiop') == []
+
+def test_index_follows_catalog_changes(index):
+    phone = db.session.get(Phone, index.search('galaxy s24', limit=1)[0])
+    original = phone.model_name
+
+    try:
+        phone.model_name = 'Zephyrion One'
+        db.session.commit()
+        invalidate_catalog([phone.id])
+        assert index.search('zephyr') == [phone.id]
+        assert phone.id not in index.search(original, limit=None)
+
+        phone.is_active = False
+        db.session.commit()
+        invalidate_catalog([phone.id])
+        assert index.search('zephyrion') == []
+    finally:
+        phone.model_name, phone.is_active = original, True
+        db.session.commit()
+        invalidate_catalog([phone.id])
+
+@pytest.mark.skipif(not fts5_available(), reason='sqlite3 built without FTS5')
+def test_backends_rank_the_same(app):
+    fts, memory = PhoneSearchIndex(use_fts5=True), PhoneSearchIndex(use_fts5=False)
+    for query in QUERIES:
+        assert fts.search(query, limit=None) == memory.search(query, limit=None), query
+
+@pytest.mark.parametrize('limit, expected', [('3', 3), ('-1', 1), ('0', 1), ('1000', 50)])
+def test_api_limit_is_clamped(client, limit, expected):
+    response = client.get(f'/api/phones/search?q=a&limit={limit}')
+    assert len(response.get_json()['phones']) == expected
+
+def test_search_page_links_every_page(client):
+    response = client.get('/phone/search?q=samsung&page=2')
+    assert response.status_code == 200
+
+    html = response.get_data(as_text=True)
+    assert 'class="pagination' in html
+    assert '/phone/search?q=samsung&amp;page=1' in html
+    assert 'page-item active' in html
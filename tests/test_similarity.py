@@ -0,0 +1,58 @@
+"""
+Similar Phones Tests
+Price-band fallback without an index, and the index kept up to date by admin phone edits
+"""
+from sqlalchemy import or_
+from app import db
+from app.models import Phone, PhoneSimilarity, PhoneSpecification
+from app.modules.catalog import get_catalog_snapshot, invalidate_catalog
+from app.modules.services import get_recommendation_engine
+from app.modules.similarity import rebuild_similarity_index, update_similarity_index
+
+def copy_phone(phone):
+    """Add an active phone with the same specifications as another one"""
+    fields = {column.name: getattr(phone, column.name) for column in Phone.__table__.columns if column.name != 'id'}
+    fields.update(model_name=f'{phone.model_name} (copy)', source_url=None, content_hash=None)
+    copy = Phone(**fields)
+    db.session.add(copy)
+    db.session.flush()
+
+    spec_fields = {
+        column.name: getattr(phone.specifications, column.name)
+        for column in PhoneSpecification.__table__.columns if column.name not in ('id', 'phone_id')
+    }
+    db.session.add(PhoneSpecification(phone_id=copy.id, **spec_fields))
+    db.session.commit()
+    return copy
+
+def test_empty_index_falls_back_to_price_band_without_building(app):
+    db.session.query(PhoneSimilarity).delete()
+    db.session.commit()
+
+    phone_id = int(get_catalog_snapshot().phone_ids[0])
+    price = db.session.get(Phone, phone_id).price
+    results = get_recommendation_engine().get_similar_phones(phone_id, top_n=3)
+
+    assert len(results) == 3
+    assert all(0.7 * price <= result['phone'].price <= 1.3 * price for result in results)
+    assert db.session.query(PhoneSimilarity).count() == 0
+
+def test_admin_delete_updates_index(app, admin_client):
+    rebuild_similarity_index()
+    original = db.session.get(Phone, int(get_catalog_snapshot().phone_ids[0]))
+
+    copy = copy_phone(original)
+    invalidate_catalog([copy.id])
+    update_similarity_index([copy.id])
+    assert copy.id in [result['phone'].id for result in get_recommendation_engine().get_similar_phones(original.id)]
+
+    response = admin_client.post(f'/admin/phones/delete/{copy.id}')
+
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Phone, copy.id) is None
+    assert db.session.query(PhoneSimilarity).filter(or_(
+        PhoneSimilarity.phone_id == copy.id, PhoneSimilarity.similar_phone_id == copy.id
+    )).count() == 0
+    neighbours = db.session.query(PhoneSimilarity).filter_by(phone_id=original.id).count()
+    assert neighbours == app.config['SIMILAR_PHONES_K']
@@ -0,0 +1,104 @@
+"""
+Write-Behind Queue Tests
+Rows stay visible to pending() and chat history until their batch is committed, and overflow stays bounded
+"""
+from datetime import datetime
+from app import db
+from app.models import ChatHistory
+from app.modules import chatbot
+from app.utils.write_behind import WriteBehindWriter
+import threading
+import time
+import pytest
+
+def chat_row(user_id, message, session_id='s1'):
+    return {'user_id': user_id, 'message': message, 'response': 'ok', 'session_id': session_id,
+            'created_at': datetime.utcnow()}
+
+@pytest.fixture
+def held_writer(app):
+    """Enabled writer whose worker takes batches but waits for release before inserting them"""
+    writer = WriteBehindWriter(db, app)
+    writer.enabled = True
+    writer.flush_interval = 0.01
+
+    inserting = threading.Event()
+    release = threading.Event()
+    insert = writer._insert
+
+    def held_insert(groups):
+        inserting.set()
+        release.wait(5)
+        insert(groups)
+
+    writer._insert = held_insert
+    writer.inserting = inserting
+    yield writer, release
+
+    release.set()
+    writer.flush()
+
+def test_drained_rows_stay_pending_until_committed(held_writer, make_user):
+    writer, release = held_writer
+    user = make_user()
+
+    writer.enqueue(ChatHistory, [chat_row(user.id, 'first'), chat_row(user.id, 'second')])
+    assert writer.inserting.wait(5)
+
+    assert writer.stats()['queued'] == 0
+    assert [row['message'] for row in writer.pending(ChatHistory)] == ['first', 'second']
+
+    release.set()
+    writer.flush()
+
+    assert writer.pending(ChatHistory) == []
+    assert ChatHistory.query.filter_by(user_id=user.id).count() == 2
+
+def test_overflow_waits_once_and_leaves_the_session_alone(held_writer, make_user):
+    writer, release = held_writer
+    writer.queue_size = 1
+    writer.enqueue_timeout = 0.05
+    user = make_user()
+
+    unsaved = ChatHistory(**chat_row(user.id, 'unsaved'))
+    db.session.add(unsaved)
+
+    started = time.monotonic()
+    writer.enqueue(ChatHistory, [chat_row(user.id, f'row {i}') for i in range(20)])
+
+    # Per-row timeouts would wait about 18 x 50 ms for the rows that do not fit
+    assert time.monotonic() - started < 0.5
+    assert writer.stats()['overflowed'] >= 18
+    assert unsaved in db.session.new
+    db.session.expunge(unsaved)
+
+    release.set()
+    writer.flush()
+    assert ChatHistory.query.filter_by(user_id=user.id).count() == 20
+
+def test_chat_history_includes_in_flight_turns(held_writer, make_user, monkeypatch):
+    writer, release = held_writer
+    user = make_user()
+    monkeypatch.setattr(chatbot, 'history_writer', writer)
+
+    writer.enqueue(ChatHistory, [chat_row(user.id, 'hello')])
+    assert writer.inserting.wait(5)
+
+    history = chatbot.ChatbotEngine().get_chat_history(user.id, session_id='s1')
+    assert [chat.message for chat in history] == ['hello']
+
+def test_chat_history_shows_committed_pending_turn_once(app, make_user, monkeypatch):
+    user = make_user()
+    row = chat_row(user.id, 'hello')
+    db.session.add(ChatHistory(**row))
+    db.session.commit()
+
+    # Committed, but not yet removed from the writer's in-flight batches
+    class CommittingWriter:
+        def pending(self, model=None):
+            return [row]
+
+    monkeypatch.setattr(chatbot, 'history_writer', CommittingWriter())
+
+    history = chatbot.ChatbotEngine().get_chat_history(user.id, session_id='s1')
+    assert [chat.message for chat in history] == ['hello']